@@ -0,0 +1,276 @@
+"""
+Benchmarks of the visualizer update pipeline, runs headless under Qt's offscreen platform.
+
+    python benchmarks/bench_visualizer.py --output results.json
+    python benchmarks/bench_visualizer.py --baseline results.json
+
+Times (milliseconds, seconds) and allocations (bytes) are compared to the baseline. The exit code is 1
+if startup, an OBJ parse or the median of update / update_plot_data is worse than the baseline by more
+than --threshold, and by more than a small absolute difference. Stage means and allocations are only
+reported, they vary too much run to run, and tail percentiles aren't compared at all.
+Startup is measured in a fresh interpreter, with the slowest imports listed from python -X importtime.
+"""
+import os
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import argparse
+import json
+import pathlib
+import platform
+import re
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+repo_dir = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(repo_dir))
+# RocketSim loads its collision meshes relative to the working directory
+os.chdir(repo_dir)
+
+MODELS = ("models/field_simplified.obj", "models/Octane_decimated.obj")
+COMPARED_SUFFIXES = ("mean_ms", "p50_ms", "parse_ms", "cached_ms", "_s", "_bytes")
+# the metrics that fail the run when they regress, the rest of the compared ones are only printed
+GATED_KEYS = re.compile(r"startup\.\w+_s|obj_load\.\w+_parse_ms|update\.\w+_cars\.(update|update_plot_data)\.p50_ms")
+# differences smaller than this are noise whatever their ratio, e.g. a stage taking microseconds
+MIN_DELTA_MS = 0.05
+MIN_DELTA_BYTES = 1024
+
+
+def make_arena(n_cars, tick_rate=120):
+    import RocketSim
+
+    arena = RocketSim.Arena(RocketSim.SOCCAR, tick_rate)
+    for i in range(n_cars):
+        car = arena.add_car(RocketSim.BLUE if i % 2 else RocketSim.ORANGE)
+        car_state = car.get_state()
+        car_state.pos = RocketSim.Vec((i - n_cars / 2) * 400, -1000, 17)
+        car_state.boost = 100
+        car.set_state(car_state)
+
+    # keep the ball moving so nothing settles into a cheaper path
+    ball_state = arena.ball.get_state()
+    ball_state.pos = RocketSim.Vec(0, 0, 1000)
+    ball_state.vel = RocketSim.Vec(1500, 1000, 500)
+    ball_state.ang_vel = RocketSim.Vec(1, 2, 3)
+    arena.ball.set_state(ball_state)
+    return arena
+
+
+def percentiles_ms(durations):
+    durations = np.asarray(durations) * 1000
+    return {f"p{p}_ms": float(np.percentile(durations, p)) for p in (50, 95, 99)} | {"mean_ms": float(durations.mean())}
+
+
+def startup_child():
+    """Run in a fresh interpreter by bench_startup, prints its timings as json."""
+    # the arena loads RocketSim's collision meshes, that's not the visualizer's startup
+    arena = make_arena(2)
+
+    start = time.perf_counter()
+    from rocketsimvisualizer import Visualizer
+    results = {"import_s": time.perf_counter() - start}
+
+    v = Visualizer(arena, step_arena=True)
+    results["visualizer_init_s"] = time.perf_counter() - start - results["import_s"]
+    v.app.processEvents()
+    results["first_frame_s"] = time.perf_counter() - start
+
+    while v.pending_scene is not None:
+        time.sleep(0.001)
+        v.update()
+    results["scene_ready_s"] = time.perf_counter() - start
+    v.close()
+    print(json.dumps(results))
+
+
+def import_report(n_modules=15):
+    """Cumulative import times of the top level packages and our own modules, slowest first."""
+    output = subprocess.run([sys.executable, "-X", "importtime", "-c", "import rocketsimvisualizer"],
+                            capture_output=True, text=True, check=True,
+                            env=os.environ | {"PYTHONPATH": str(repo_dir)}).stderr
+    times = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        if "." not in name or name.startswith("rocketsimvisualizer."):
+            times[name] = int(cumulative) / 1000
+    # keyed by module name, so they're reported but never compared to the baseline
+    return dict(sorted(times.items(), key=lambda item: -item[1])[:n_modules])
+
+
+def bench_startup():
+    # a fresh interpreter, so nothing is imported yet
+    output = subprocess.run([sys.executable, __file__, "--startup-child"], capture_output=True, text=True,
+                            check=True, env=os.environ | {"PYTHONPATH": str(repo_dir)}).stdout
+    results = json.loads(output.splitlines()[-1])
+    results["import_ms_report"] = import_report()
+    for name, value in results["import_ms_report"].items():
+        print(f"import {name:<40} {value:8.1f} ms", file=sys.stderr)
+    return results
+
+
+def bench_obj_load(repeats):
+    from rocketsimvisualizer.models import obj
+
+    models_dir = repo_dir / "rocketsimvisualizer"
+    results = {}
+    for model in MODELS:
+        filename = models_dir / model
+        name = pathlib.Path(model).stem
+
+        durations = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            obj.OBJ(filename, use_cache=False)
+            durations.append(time.perf_counter() - start)
+        results[f"{name}_parse_ms"] = float(np.median(durations) * 1000)
+
+        obj.OBJ(filename)  # make sure the cache exists
+        durations = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            obj.OBJ(filename)
+            durations.append(time.perf_counter() - start)
+        results[f"{name}_cached_ms"] = float(np.median(durations) * 1000)
+    return results
+
+
+def bench_update(n_cars, n_frames, warmup=20):
+    from rocketsimvisualizer import Visualizer
+
+    v = Visualizer(make_arena(n_cars), step_arena=True, overwrite_controls=True)
+    for _ in range(warmup):
+        v.update()
+
+    update_durations = []
+    for _ in range(n_frames):
+        start = time.perf_counter()
+        v.update()
+        update_durations.append(time.perf_counter() - start)
+    stages = v.profiler.stats()["stages_ms"]
+
+    plot_durations = []
+    for _ in range(n_frames):
+        start = time.perf_counter()
+        v.update_plot_data()
+        plot_durations.append(time.perf_counter() - start)
+
+    results = {
+        "update": percentiles_ms(update_durations),
+        "update_plot_data": percentiles_ms(plot_durations),
+        # stages not used by this setup (paint, export, ...) are left out
+        "stages": {stage: {"mean_ms": stats["mean"], "p99_ms": stats["p99"]}
+                   for stage, stats in stages.items() if stats["p99"] > 0},
+    }
+
+    # allocations are traced separately, tracemalloc slows everything down
+    tracemalloc.start()
+    start_size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    for _ in range(n_frames):
+        v.update()
+    end_size, peak_size = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    results["allocations"] = {
+        "retained_per_frame_bytes": max(end_size - start_size, 0) / n_frames,
+        "peak_bytes": peak_size - start_size,
+    }
+
+    v.close()
+    v.w.close()
+    return results
+
+
+def flatten(results, prefix=""):
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def min_delta(key):
+    if key.endswith("_bytes"):
+        return MIN_DELTA_BYTES
+    return MIN_DELTA_MS / 1000 if key.endswith("_s") else MIN_DELTA_MS
+
+
+def compare(results, baseline, threshold):
+    """Prints how every compared metric changed from the baseline, returns the gated ones that regressed."""
+    current = flatten(results)
+    previous = flatten(baseline)
+    regressions = []
+    for key, value in current.items():
+        if not key.endswith(COMPARED_SUFFIXES) or key not in previous:
+            continue
+        previous_value = previous[key]
+        if previous_value <= 0:
+            continue
+        ratio = value / previous_value
+        is_gated = GATED_KEYS.fullmatch(key) is not None
+        is_worse = ratio > threshold and value - previous_value > min_delta(key)
+        is_regression = is_gated and is_worse
+        label = "REGRESSION" if is_regression else "worse" if is_worse else ""
+        print(f"{label:<11}{key:<60} {previous_value:12.4f} -> {value:12.4f} ({ratio:5.2f}x)"
+              f"{'' if is_gated else '  (not gated)'}")
+        if is_regression:
+            regressions.append(key)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the visualizer update pipeline without a display.")
+    parser.add_argument("--frames", type=int, default=300, help="frames per benchmark")
+    parser.add_argument("--cars", type=int, nargs="+", default=[0, 1, 2, 4, 6, 8], help="car counts to benchmark")
+    parser.add_argument("--repeats", type=int, default=5, help="repeats of the OBJ loads")
+    parser.add_argument("--output", help="file to write the results to as json")
+    parser.add_argument("--baseline", help="results json to compare against")
+    parser.add_argument("--threshold", type=float, default=1.2, help="ratio to the baseline counted as a regression")
+    parser.add_argument("--startup-child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.startup_child:
+        startup_child()
+        return
+
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "frames": args.frames,
+        },
+        "startup": bench_startup(),
+        "obj_load": bench_obj_load(args.repeats),
+        "update": {},
+    }
+    for n_cars in args.cars:
+        results["update"][f"{n_cars}_cars"] = bench_update(n_cars, args.frames)
+        print(f"{n_cars} cars: update p50 {results['update'][f'{n_cars}_cars']['update']['p50_ms']:.3f} ms",
+              file=sys.stderr)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} metrics regressed more than {args.threshold}x", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,17 @@
 from inputs import get_gamepad
 import math
 import threading
+import time
 
 class XboxController(object):
     MAX_TRIG_VAL = math.pow(2, 8)
     MAX_JOY_VAL = math.pow(2, 15)
 
-    def __init__(self):
+    def __init__(self, on_event=None):
+        # called from the monitor thread with (timestamp, state) after every batch of events,
+        # state is a read() taken right after the batch so it's never half updated
+        self.on_event = on_event
+        self._lock = threading.Lock()
 
         self.LeftJoystickY = 0
         self.LeftJoystickX = 0
@@ -35,11 +40,10 @@ class XboxController(object):
 
 
     def read(self): # return the buttons/triggers that you care about in this methode
-        x = self.LeftJoystickX
-        y = self.LeftJoystickY
-        a = self.A
-        b = self.X # b=1, x=2
-        rb = self.RightBumper
+        with self._lock:
+            return self._read()
+
+    def _read(self):
         return {
             "leftX": self.LeftJoystickX,
             "leftY": self.LeftJoystickY,
@@ -59,47 +63,55 @@ class XboxController(object):
     def _monitor_controller(self):
         while True:
             events = get_gamepad()
-            for event in events:
-                if event.code == 'ABS_Y':
-                    self.LeftJoystickY = event.state / XboxController.MAX_JOY_VAL # normalize between -1 and 1
-                elif event.code == 'ABS_X':
-                    self.LeftJoystickX = event.state / XboxController.MAX_JOY_VAL # normalize between -1 and 1
-                elif event.code == 'ABS_RY':
-                    self.RightJoystickY = event.state / XboxController.MAX_JOY_VAL # normalize between -1 and 1
-                elif event.code == 'ABS_RX':
-                    self.RightJoystickX = event.state / XboxController.MAX_JOY_VAL # normalize between -1 and 1
-                elif event.code == 'ABS_Z':
-                    self.LeftTrigger = event.state / XboxController.MAX_TRIG_VAL # normalize between 0 and 1
-                elif event.code == 'ABS_RZ':
-                    self.RightTrigger = event.state / XboxController.MAX_TRIG_VAL # normalize between 0 and 1
-                elif event.code == 'BTN_TL':
-                    self.LeftBumper = event.state
-                elif event.code == 'BTN_TR':
-                    self.RightBumper = event.state
-                elif event.code == 'BTN_SOUTH':
-                    self.A = event.state
-                elif event.code == 'BTN_NORTH':
-                    self.Y = event.state #previously switched with X
-                elif event.code == 'BTN_WEST':
-                    self.X = event.state #previously switched with Y
-                elif event.code == 'BTN_EAST':
-                    self.B = event.state
-                elif event.code == 'BTN_THUMBL':
-                    self.LeftThumb = event.state
-                elif event.code == 'BTN_THUMBR':
-                    self.RightThumb = event.state
-                elif event.code == 'BTN_SELECT':
-                    self.Back = event.state
-                elif event.code == 'BTN_START':
-                    self.Start = event.state
-                elif event.code == 'BTN_TRIGGER_HAPPY1':
-                    self.LeftDPad = event.state
-                elif event.code == 'BTN_TRIGGER_HAPPY2':
-                    self.RightDPad = event.state
-                elif event.code == 'BTN_TRIGGER_HAPPY3':
-                    self.UpDPad = event.state
-                elif event.code == 'BTN_TRIGGER_HAPPY4':
-                    self.DownDPad = event.state
+            timestamp = time.perf_counter()
+            with self._lock:
+                for event in events:
+                    self._handle_event(event)
+                state = self._read()
+            if self.on_event is not None:
+                self.on_event(timestamp, state)
+
+    def _handle_event(self, event):
+        if event.code == 'ABS_Y':
+            self.LeftJoystickY = event.state / XboxController.MAX_JOY_VAL # normalize between -1 and 1
+        elif event.code == 'ABS_X':
+            self.LeftJoystickX = event.state / XboxController.MAX_JOY_VAL # normalize between -1 and 1
+        elif event.code == 'ABS_RY':
+            self.RightJoystickY = event.state / XboxController.MAX_JOY_VAL # normalize between -1 and 1
+        elif event.code == 'ABS_RX':
+            self.RightJoystickX = event.state / XboxController.MAX_JOY_VAL # normalize between -1 and 1
+        elif event.code == 'ABS_Z':
+            self.LeftTrigger = event.state / XboxController.MAX_TRIG_VAL # normalize between 0 and 1
+        elif event.code == 'ABS_RZ':
+            self.RightTrigger = event.state / XboxController.MAX_TRIG_VAL # normalize between 0 and 1
+        elif event.code == 'BTN_TL':
+            self.LeftBumper = event.state
+        elif event.code == 'BTN_TR':
+            self.RightBumper = event.state
+        elif event.code == 'BTN_SOUTH':
+            self.A = event.state
+        elif event.code == 'BTN_NORTH':
+            self.Y = event.state #previously switched with X
+        elif event.code == 'BTN_WEST':
+            self.X = event.state #previously switched with Y
+        elif event.code == 'BTN_EAST':
+            self.B = event.state
+        elif event.code == 'BTN_THUMBL':
+            self.LeftThumb = event.state
+        elif event.code == 'BTN_THUMBR':
+            self.RightThumb = event.state
+        elif event.code == 'BTN_SELECT':
+            self.Back = event.state
+        elif event.code == 'BTN_START':
+            self.Start = event.state
+        elif event.code == 'BTN_TRIGGER_HAPPY1':
+            self.LeftDPad = event.state
+        elif event.code == 'BTN_TRIGGER_HAPPY2':
+            self.RightDPad = event.state
+        elif event.code == 'BTN_TRIGGER_HAPPY3':
+            self.UpDPad = event.state
+        elif event.code == 'BTN_TRIGGER_HAPPY4':
+            self.DownDPad = event.state
 
 
 
@@ -1 +1,9 @@
+import os
+import sys
+
+# with no display GLX can't make a GL context, headless rendering goes through EGL instead (see glcontext.py).
+# PyOpenGL picks how it loads its functions on the first import of OpenGL, so it's set before anything imports it
+if sys.platform.startswith("linux") and not os.environ.get("DISPLAY"):
+    os.environ.setdefault("PYOPENGL_PLATFORM", "egl")
+
 from .visualizer import Visualizer
@@ -0,0 +1,75 @@
+from rocketsimvisualizer import glitems
+from rocketsimvisualizer.models import mesh
+from rocketsimvisualizer.transforms import MIRROR
+
+import numpy as np
+import pathlib
+
+current_dir = pathlib.Path(__file__).parent
+
+# RocketSim reads the meshes relative to the working directory, fall back to the ones next to the package
+ASSET_DIRECTORIES = (pathlib.Path("assets/soccar_field"), current_dir.parent / "assets/soccar_field")
+
+# the meshes are stored in units of 100 uu
+COLLISION_MESH_SCALE = 100
+
+SECTIONS = ("corner", "goal", "ramps_0", "ramps_1")
+
+
+def _transform(scale=(1, 1, 1), translation=(0, 0, 0)):
+    matrix = np.eye(4, dtype=np.float32)
+    matrix[:3, :3] *= np.asarray(scale, dtype=np.float32)
+    matrix[:3, 3] = translation
+    return matrix
+
+
+# every file holds one part of the field, mirrored into place like RocketSim builds the arena
+SECTION_TRANSFORMS = {
+    "corner": [_transform(), _transform((-1, 1, 1)), _transform((1, -1, 1)), _transform((-1, -1, 1))],
+    "goal": [_transform(translation=(0, -5120, 0)), _transform((1, -1, 1)) @ _transform(translation=(0, -5120, 0))],
+    "ramps_0": [_transform(), _transform((-1, 1, 1))],
+    "ramps_1": [_transform(), _transform((-1, 1, 1))],
+}
+
+
+def find_assets():
+    for directory in ASSET_DIRECTORIES:
+        if directory.is_dir():
+            return directory
+    raise FileNotFoundError(f"Couldn't find the soccar collision meshes in any of {[str(d) for d in ASSET_DIRECTORIES]}")
+
+
+def load_section(name, directory=None):
+    """
+    Memory maps the (N, 3) vertices and (F, 3) triangles of one section as stored,
+    in units of COLLISION_MESH_SCALE, nothing is parsed or copied.
+    """
+    directory = pathlib.Path(directory) if directory is not None else find_assets()
+    vertices = np.memmap(directory / f"soccar_{name}_vertices.bin", dtype="<f4", mode="r").reshape(-1, 3)
+    faces = np.memmap(directory / f"soccar_{name}_ids.bin", dtype="<i4", mode="r").reshape(-1, 3)
+    return vertices, faces
+
+
+def section_matrices(name):
+    """(N, 4, 4) display space model matrices of every copy of a section, scale included."""
+    display = _transform(MIRROR)
+    scale = _transform((COLLISION_MESH_SCALE,) * 3)
+    return np.stack([display @ transform @ scale for transform in SECTION_TRANSFORMS[name]])
+
+
+def collision_mesh_items(sections=SECTIONS, directory=None, color=(0.2, 0.9, 0.4, 0.08),
+                         edge_color=(0.2, 0.9, 0.4, 0.5)):
+    """
+    One item per section, drawing every copy of it from one set of buffers.
+    Copies out of view are culled, so a close up of a corner only draws that corner.
+    """
+    items = {}
+    for name in sections:
+        vertices, faces = load_section(name, directory)
+        buffers = glitems.MeshBuffers(vertices, faces, mesh.unique_edges(faces))
+        matrices = section_matrices(name)
+        item = glitems.GLInstancedMeshItem(buffers, cull=True, glOptions="translucent")
+        item.setData(matrices=matrices, colors=np.tile(color, (len(matrices), 1)),
+                     edge_colors=np.tile(edge_color, (len(matrices), 1)))
+        items[name] = item
+    return items
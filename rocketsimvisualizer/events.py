@@ -0,0 +1,268 @@
+from rocketsimvisualizer.replay import Replay
+from rocketsimvisualizer.snapshot import MAX_BALL_SPEED, MAX_CAR_SPEED, TELEPORT_MARGIN, ArenaSnapshot
+
+import numpy as np
+import math
+
+EVENT_KINDS = ("goal", "touch", "demo", "pickup", "supersonic_start", "supersonic_end")
+GOAL, TOUCH, DEMO, PICKUP, SUPERSONIC_START, SUPERSONIC_END = range(len(EVENT_KINDS))
+
+# car_id is -1 when no car is involved (or none could be told apart), value depends on the kind:
+# the scoring team for goals, the pad index for pickups, 0 otherwise
+event_dtype = np.dtype([
+    ("tick", np.int64),
+    ("kind", np.uint8),
+    ("car_id", np.int32),
+    ("value", np.int32),
+])
+
+# kind and tick packed into one sortable key, ticks stay far below 2 ** 40
+KIND_SHIFT = 40
+
+GOAL_LINE_Y = 5120
+# the ball radius is stored as RocketSim reports it, in bullet units
+BT_TO_UU = 50
+GRAVITY_Z = -650
+
+# a touch is a change of ball velocity beyond gravity of at least this much, with a car
+# within this distance of the ball's surface
+TOUCH_MIN_DV = 200
+TOUCH_REACH = 120
+# ticks after a touch during which the same car touching the ball again counts as the same touch
+TOUCH_COOLDOWN = 8
+
+
+class EventIndex:
+    """
+    Events sorted by tick in one structured array, grown by doubling like a list.
+
+    Lookups are binary searches: by tick over the events themselves, and by kind and tick over
+    a second ordering that's rebuilt on the first query after new events were added.
+    """
+
+    def __init__(self, capacity=256):
+        self._events = np.zeros(capacity, dtype=event_dtype)
+        self.n_events = 0
+        self._kind_keys = None
+        self._kind_rows = None
+
+    def __len__(self):
+        return self.n_events
+
+    @property
+    def events(self):
+        return self._events[:self.n_events]
+
+    def add(self, events):
+        if not len(events):
+            return
+        n = self.n_events + len(events)
+        if n > len(self._events):
+            grown = np.zeros(max(n, 2 * len(self._events)), dtype=event_dtype)
+            grown[:self.n_events] = self.events
+            self._events = grown
+
+        if self.n_events and events["tick"].min() < self._events[self.n_events - 1]["tick"]:
+            # older than what's indexed, e.g. from a source that went back in time
+            merged = np.concatenate([self.events, events])
+            self._events[:n] = merged[np.argsort(merged["tick"], kind="stable")]
+        else:
+            self._events[self.n_events:n] = events
+        self.n_events = n
+        self._kind_keys = None
+
+    def _by_kind(self):
+        if self._kind_keys is None:
+            events = self.events
+            # the events are sorted by tick already, a stable sort by kind keeps them sorted within a kind
+            self._kind_rows = np.argsort(events["kind"], kind="stable")
+            keys = (events["kind"].astype(np.int64) << KIND_SHIFT) | events["tick"]
+            self._kind_keys = keys[self._kind_rows]
+        return self._kind_keys, self._kind_rows
+
+    def _kind_key(self, kind, tick):
+        # ticks are whole, a fractional tick is rounded by the caller towards the events it excludes
+        return (EVENT_KINDS.index(kind) << KIND_SHIFT) | max(tick, 0)
+
+    def between(self, start, end, kind=None):
+        """Events from tick `start` up to but not including `end`, of one kind or all."""
+        if kind is None:
+            ticks = self.events["tick"]
+            return self.events[np.searchsorted(ticks, start):np.searchsorted(ticks, end)]
+        keys, rows = self._by_kind()
+        lo, hi = np.searchsorted(keys, (self._kind_key(kind, math.ceil(start)), self._kind_key(kind, math.ceil(end))))
+        return self.events[rows[lo:hi]]
+
+    def next(self, tick, kind=None):
+        """The first event after `tick`, or None."""
+        if kind is None:
+            i = np.searchsorted(self.events["tick"], tick, side="right")
+            return self.events[i] if i < self.n_events else None
+        keys, rows = self._by_kind()
+        i = np.searchsorted(keys, self._kind_key(kind, math.floor(tick)), side="right")
+        return self.events[rows[i]] if i < len(keys) and keys[i] >> KIND_SHIFT == EVENT_KINDS.index(kind) else None
+
+    def previous(self, tick, kind=None):
+        """The last event before `tick`, or None."""
+        if kind is None:
+            i = np.searchsorted(self.events["tick"], tick) - 1
+            return self.events[i] if i >= 0 else None
+        keys, rows = self._by_kind()
+        i = np.searchsorted(keys, self._kind_key(kind, math.ceil(tick))) - 1
+        return self.events[rows[i]] if i >= 0 and keys[i] >> KIND_SHIFT == EVENT_KINDS.index(kind) else None
+
+    def counts(self):
+        """Number of events of every kind."""
+        counts = np.bincount(self.events["kind"], minlength=len(EVENT_KINDS))
+        return dict(zip(EVENT_KINDS, counts.tolist()))
+
+    def save(self, filename):
+        np.save(filename, self.events)
+
+    @classmethod
+    def load(cls, filename):
+        events = np.load(filename)
+        index = cls(capacity=max(len(events), 1))
+        index.add(events)
+        return index
+
+
+class EventDetector:
+    """
+    Finds goals, ball touches, demos, boost pickups and supersonic transitions from the differences
+    between consecutive snapshots, and adds them to `index`.
+
+    Nothing is read from the arena but the snapshot, so it works the same on a live arena, a feed
+    from another process or a replay. A call is a few numpy ops over the cars and pads.
+
+    Snapshots any number of ticks apart are compared, events between them are dated to the later one
+    and touches are only told apart as finely as the snapshots come. Call `reset` after a jump.
+    """
+
+    def __init__(self, index=None, tick_rate=120):
+        self.index = EventIndex() if index is None else index
+        self.tick_rate = tick_rate
+
+        # the fields of the previous snapshot that are compared, copying the whole snapshot costs more
+        self.last_tick = None
+        self.last_ball_pos = np.zeros(3, dtype=np.float32)
+        self.last_ball_vel = np.zeros(3, dtype=np.float32)
+        self.last_car_ids = None
+        self.last_car_pos = None
+        self.last_supersonic = None
+        self.last_pads_active = None
+
+        # the car that touched the ball last, credited with the next goal
+        self.last_touch_id = -1
+        self.last_touch_tick = -TOUCH_COOLDOWN
+        # tick each car last started standing perfectly still, -1 while it's moving
+        self.still_since = np.zeros(0, dtype=np.int64)
+
+    def reset(self):
+        """Forgets the previous snapshot, the next one is only compared to the ones after it."""
+        self.last_tick = None
+
+    def update(self, snapshot):
+        """Compares `snapshot` to the previous one, returns how many events were found."""
+        tick = snapshot.tick_count
+        if tick == self.last_tick:
+            # the same state again, e.g. while paused
+            return 0
+        if self.last_tick is None or tick < self.last_tick:
+            # nothing to compare to, or the source went back in time
+            self.remember(snapshot)
+            return 0
+        ticks = tick - self.last_tick
+        dt = ticks / self.tick_rate
+
+        # a reset puts the ball somewhere it can't have moved to, nothing happened in between
+        ball = snapshot.ball
+        ball_pos, ball_vel = ball["pos"], ball["vel"]
+        offset = ball_pos - self.last_ball_pos
+        if np.dot(offset, offset) > (MAX_BALL_SPEED * dt + TELEPORT_MARGIN) ** 2:
+            self.remember(snapshot)
+            return 0
+
+        events = []
+        cars = snapshot.cars
+
+        radius = float(ball["radius"]) * BT_TO_UU
+        dv = ball_vel - self.last_ball_vel
+        dv[2] -= GRAVITY_Z * dt
+        if len(cars) and np.dot(dv, dv) > TOUCH_MIN_DV ** 2:
+            distances = np.linalg.norm(cars["pos"] - ball_pos, axis=1)
+            nearest = int(np.argmin(distances))
+            if distances[nearest] < radius + TOUCH_REACH:
+                car_id = int(cars["id"][nearest])
+                if car_id != self.last_touch_id or tick - self.last_touch_tick >= TOUCH_COOLDOWN:
+                    events.append((tick, TOUCH, car_id, 0))
+                self.last_touch_id, self.last_touch_tick = car_id, tick
+
+        goal_y = GOAL_LINE_Y + radius
+        if abs(ball_pos[1]) > goal_y and abs(self.last_ball_pos[1]) <= goal_y:
+            # the ball in the orange goal (positive y) is a goal for blue
+            events.append((tick, GOAL, self.last_touch_id, 0 if ball_pos[1] > 0 else 1))
+
+        car_ids = cars["id"]
+        if len(cars) and np.array_equal(car_ids, self.last_car_ids):
+            events += self.car_events(cars, tick, dt)
+
+        pads_active = snapshot.pads["is_active"]
+        if len(cars) and pads_active.shape == self.last_pads_active.shape:
+            picked_up = self.last_pads_active > pads_active
+            for pad in np.flatnonzero(picked_up).tolist() if picked_up.any() else ():
+                # whoever is closest to the pad took it
+                offsets = cars["pos"][:, :2] - snapshot.pads["pos"][pad, :2]
+                nearest = int(np.argmin((offsets * offsets).sum(axis=1)))
+                events.append((tick, PICKUP, int(car_ids[nearest]), pad))
+
+        self.remember(snapshot)
+        if events:
+            self.index.add(np.array(events, dtype=event_dtype))
+        return len(events)
+
+    def car_events(self, cars, tick, dt):
+        events = []
+
+        # a demolished car stays where it was until it respawns somewhere else, further away than it can drive.
+        # the demo is dated to when it stopped if it stood perfectly still up to the respawn
+        offsets = cars["pos"] - self.last_car_pos
+        moved = (offsets * offsets).sum(axis=1)
+        is_still = moved == 0
+        self.still_since[~is_still] = -1
+        self.still_since[is_still & (self.still_since < 0)] = self.last_tick
+        respawned = moved > (MAX_CAR_SPEED * dt + TELEPORT_MARGIN) ** 2
+        if respawned.any():
+            for i in np.flatnonzero(respawned).tolist():
+                demo_tick = self.still_since[i] if self.still_since[i] >= 0 else tick
+                events.append((demo_tick, DEMO, int(cars["id"][i]), 0))
+
+        changed = cars["is_supersonic"] != self.last_supersonic
+        if changed.any():
+            for i in np.flatnonzero(changed).tolist():
+                kind = SUPERSONIC_START if cars["is_supersonic"][i] else SUPERSONIC_END
+                events.append((tick, kind, int(cars["id"][i]), 0))
+        return events
+
+    def remember(self, snapshot):
+        cars = snapshot.cars
+        if self.last_car_ids is None or not np.array_equal(cars["id"], self.last_car_ids):
+            self.still_since = np.full(len(cars), -1, dtype=np.int64)
+        self.last_tick = snapshot.tick_count
+        self.last_ball_pos[:] = snapshot.ball["pos"]
+        self.last_ball_vel[:] = snapshot.ball["vel"]
+        self.last_car_ids = cars["id"].copy()
+        self.last_car_pos = cars["pos"].copy()
+        self.last_supersonic = cars["is_supersonic"].copy()
+        self.last_pads_active = snapshot.pads["is_active"].copy()
+
+
+def detect_replay(filename):
+    """Runs an EventDetector over every record of a replay file, returns its EventIndex."""
+    replay = Replay(filename)
+    detector = EventDetector(tick_rate=replay.tick_rate)
+    snapshot = ArenaSnapshot()
+    for i in range(replay.n_records):
+        replay.read(i, snapshot)
+        detector.update(snapshot)
+    return detector.index
@@ -0,0 +1,141 @@
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import os
+import pathlib
+import threading
+
+import numpy as np
+
+
+class FrameWriter(ABC):
+    """
+    Writes rendered frames on a pool of background threads.
+
+    Frames are rendered into buffers taken from a pool with `acquire` and handed back with `submit`,
+    the buffer returns to the pool once it's written. Rendering only waits on the writers when
+    `max_pending` frames are already queued, which bounds the memory used by a slow disk.
+    """
+
+    def __init__(self, max_workers=4, max_pending=16):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="FrameWriter")
+        self.pending = threading.Semaphore(max_pending)
+        self.free_buffers = []
+        self.free_buffers_lock = threading.Lock()
+        self.futures = []
+        self.n_frames = 0
+
+    def acquire(self, size):
+        """Returns an uninitialized (height, width, 4) RGBA buffer to render a frame into."""
+        self.pending.acquire()
+        width, height = size
+        with self.free_buffers_lock:
+            while self.free_buffers:
+                buffer = self.free_buffers.pop()
+                if buffer.shape == (height, width, 4):
+                    return buffer
+        return np.empty((height, width, 4), dtype=np.uint8)
+
+    def submit(self, buffer):
+        """Queues `buffer` to be written as the next frame. Rows are bottom to top, as read from OpenGL."""
+        frame_index = self.n_frames
+        self.n_frames += 1
+        self.futures.append(self.executor.submit(self._write_and_release, frame_index, buffer))
+        # surface errors from the writers without waiting on the frames still in flight
+        while self.futures and self.futures[0].done():
+            self.futures.pop(0).result()
+
+    def _write_and_release(self, frame_index, buffer):
+        try:
+            self.write_frame(frame_index, buffer)
+        finally:
+            with self.free_buffers_lock:
+                self.free_buffers.append(buffer)
+            self.pending.release()
+
+    @abstractmethod
+    def write_frame(self, frame_index, buffer):
+        """Writes one (height, width, 4) RGBA frame, called on a writer thread. Subclasses implement this."""
+
+    def close(self):
+        """Waits for every queued frame to be written."""
+        self.executor.shutdown(wait=True)
+        for future in self.futures:
+            future.result()
+        self.futures.clear()
+
+
+class ImageSequenceWriter(FrameWriter):
+    """
+    Writes every frame to its own image file in `directory`, encoded in parallel.
+    The format is picked by Qt from the extension of `pattern`.
+    """
+
+    def __init__(self, directory, pattern="frame_{:06d}.png", max_workers=4, max_pending=16):
+        super().__init__(max_workers=max_workers, max_pending=max_pending)
+        self.directory = pathlib.Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.pattern = pattern
+
+    def write_frame(self, frame_index, buffer):
+        from pyqtgraph.Qt import QtGui
+
+        height, width, _ = buffer.shape
+        image = QtGui.QImage(buffer.data, width, height, width * 4, QtGui.QImage.Format.Format_RGBA8888)
+        path = self.directory / self.pattern.format(frame_index)
+        if not image.mirrored(False, True).save(str(path)):
+            raise OSError(f"Couldn't write frame to {path}")
+
+
+class RawVideoWriter(FrameWriter):
+    """
+    Appends every frame as raw top to bottom RGBA pixels to one file, in order.
+    ffmpeg can encode it, e.g. for 1280x720 at 60 fps:
+    ffmpeg -f rawvideo -pix_fmt rgba -s 1280x720 -r 60 -i frames.rgba out.mp4
+    """
+
+    def __init__(self, filename, max_pending=16):
+        # a single writer keeps the frames in order
+        super().__init__(max_workers=1, max_pending=max_pending)
+        self.filename = pathlib.Path(filename)
+        self.file = open(self.filename, "wb")
+
+    def write_frame(self, frame_index, buffer):
+        self.file.write(np.ascontiguousarray(buffer[::-1]).data)
+
+    def close(self):
+        super().close()
+        self.file.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Renders a replay to an image sequence or a raw video, without a display.")
+    parser.add_argument("replay", help="replay file to render")
+    parser.add_argument("output", help="directory for an image sequence, or a .rgba file for raw video")
+    parser.add_argument("--fps", type=float, default=60)
+    parser.add_argument("--size", type=int, nargs=2, default=(1280, 720), metavar=("WIDTH", "HEIGHT"))
+    parser.add_argument("--start", type=float, default=0, help="seconds into the replay to start at")
+    parser.add_argument("--duration", type=float, default=None, help="seconds to render, until the end by default")
+    parser.add_argument("--speed", type=float, default=1)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    from rocketsimvisualizer import Visualizer
+    from rocketsimvisualizer.replay import ReplaySource
+
+    source = ReplaySource(args.replay, speed=args.speed)
+    source.skip(args.start)
+
+    if args.output.endswith(".rgba"):
+        writer = RawVideoWriter(args.output)
+    else:
+        writer = ImageSequenceWriter(args.output, max_workers=args.workers)
+
+    v = Visualizer(source=source, headless=True, window_size=args.size)
+    n_frames = None if args.duration is None else round(args.duration * args.fps)
+    v.export(writer, fps=args.fps, n_frames=n_frames)
+    print(f"Wrote {writer.n_frames} frames to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
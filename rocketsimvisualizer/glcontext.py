@@ -0,0 +1,106 @@
+from pyqtgraph.Qt import QtGui
+import OpenGL.platform
+
+from functools import lru_cache
+import ctypes
+
+# EGL_MESA_platform_surfaceless, a display that needs no window system and no device node
+EGL_PLATFORM_SURFACELESS_MESA = 0x31DD
+
+
+def egl_call(error):
+    return getattr(error.baseOperation, "__name__", error.baseOperation)
+
+
+class QtOffscreenContext:
+    """
+    A Qt GL context on an offscreen surface. Needs a Qt platform that can make GL contexts:
+    any with a display, but not the offscreen platform without one, whose contexts go through GLX.
+    """
+
+    def __init__(self):
+        self.context = QtGui.QOpenGLContext()
+        if not self.context.create() or not self.context.isValid():
+            platform = QtGui.QGuiApplication.platformName()
+            raise RuntimeError(f"Qt's {platform!r} platform couldn't create a GL context")
+        self.surface = QtGui.QOffscreenSurface()
+        self.surface.setFormat(self.context.format())
+        self.surface.create()
+
+    def makeCurrent(self):
+        if not self.context.makeCurrent(self.surface):
+            raise RuntimeError("Couldn't make the offscreen GL context current")
+
+    def doneCurrent(self):
+        self.context.doneCurrent()
+
+
+class EGLContext:
+    """
+    A surfaceless EGL context, rendered to through framebuffers only, with no window system at all.
+    Works wherever EGL can make a desktop GL context without a surface, e.g. Mesa's llvmpipe or a GPU driver.
+
+    PyOpenGL has to load its functions through EGL, it picks how on the first import of OpenGL:
+    importing rocketsimvisualizer sets PYOPENGL_PLATFORM=egl when there's no display, otherwise
+    it has to be set before anything imports OpenGL.
+    """
+
+    def __init__(self):
+        if type(OpenGL.platform.PLATFORM).__name__ != "EGLPlatform":
+            raise RuntimeError("PyOpenGL wasn't loaded for EGL, set PYOPENGL_PLATFORM=egl before OpenGL is imported")
+        from OpenGL import EGL
+
+        display = EGL.EGL_NO_DISPLAY
+        if bool(EGL.eglGetPlatformDisplayEXT):
+            try:
+                display = EGL.eglGetPlatformDisplayEXT(EGL_PLATFORM_SURFACELESS_MESA, EGL.EGL_DEFAULT_DISPLAY, None)
+            except EGL.EGLError:
+                pass
+        try:
+            if not display:
+                # EGLs without the surfaceless platform can still make surfaceless contexts on their default display
+                display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+            major, minor = EGL.EGLint(), EGL.EGLint()
+            EGL.eglInitialize(display, ctypes.pointer(major), ctypes.pointer(minor))
+
+            attributes = (EGL.EGLint * 5)(EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT,
+                                          EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT, EGL.EGL_NONE)
+            config, n_configs = EGL.EGLConfig(), EGL.EGLint()
+            EGL.eglChooseConfig(display, attributes, ctypes.pointer(config), 1, ctypes.pointer(n_configs))
+            if not n_configs.value:
+                raise RuntimeError("EGL has no config for desktop OpenGL")
+            EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+            self.context = EGL.eglCreateContext(display, config, EGL.EGL_NO_CONTEXT, None)
+        except EGL.EGLError as error:
+            raise RuntimeError(f"Couldn't create a surfaceless EGL context, {egl_call(error)} failed with {error.err!r}") from error
+        self.display = display
+
+    def makeCurrent(self):
+        from OpenGL import EGL
+
+        try:
+            EGL.eglMakeCurrent(self.display, EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE, self.context)
+        except EGL.EGLError as error:
+            raise RuntimeError(f"Couldn't make the EGL context current without a surface, {egl_call(error)} failed with {error.err!r}") from error
+
+    def doneCurrent(self):
+        from OpenGL import EGL
+
+        EGL.eglMakeCurrent(self.display, EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE, EGL.EGL_NO_CONTEXT)
+
+
+@lru_cache(maxsize=None)
+def offscreen_context():
+    """
+    A GL context to render without a window: Qt's if the platform can make one, otherwise
+    a surfaceless EGL one. Raises RuntimeError naming why neither could be made.
+
+    There's one per process, pyqtgraph compiles its shader programs once for every view.
+    """
+    try:
+        return QtOffscreenContext()
+    except RuntimeError as qt_error:
+        try:
+            return EGLContext()
+        except RuntimeError as egl_error:
+            raise RuntimeError(f"No OpenGL context can be made to render headless. {qt_error}; {egl_error}") from egl_error
@@ -0,0 +1,549 @@
+from OpenGL import GL
+from pyqtgraph.Qt import QtGui
+from pyqtgraph.opengl import shaders
+from pyqtgraph.opengl.GLGraphicsItem import GLGraphicsItem
+
+import numpy as np
+
+
+class GLBuffer:
+    """
+    A GL buffer object, the part of QOpenGLBuffer the items need, in plain GL calls.
+    Unlike Qt's it works under any current context, including the headless ones Qt doesn't know
+    about (see glcontext.py). The buffer is created on the first upload.
+    """
+
+    def __init__(self, target=GL.GL_ARRAY_BUFFER):
+        self.target = target
+        self.buffer_id = None
+        self.nbytes = 0
+
+    def upload(self, arr):
+        if self.buffer_id is None:
+            self.buffer_id = GL.glGenBuffers(1)
+        GL.glBindBuffer(self.target, self.buffer_id)
+        if self.nbytes != arr.nbytes:
+            GL.glBufferData(self.target, arr.nbytes, arr, GL.GL_STATIC_DRAW)
+            self.nbytes = arr.nbytes
+        else:
+            GL.glBufferSubData(self.target, 0, arr.nbytes, arr)
+        GL.glBindBuffer(self.target, 0)
+
+    def bind(self):
+        GL.glBindBuffer(self.target, self.buffer_id)
+
+    def release(self):
+        GL.glBindBuffer(self.target, 0)
+
+
+def es2_compat():
+    context = QtGui.QOpenGLContext.currentContext()
+    if context is None:
+        # a headless context, always a compatibility profile, the shaders compile as they are
+        return False
+    return context.hasExtension(b"GL_ARB_ES2_compatibility")
+
+
+def is_core_profile():
+    """Core forward compatible profiles (macOS) reject every line width but 1."""
+    context = QtGui.QOpenGLContext.currentContext()
+    if context is None:
+        return False
+    fmt = context.format()
+    return (fmt.profile() == QtGui.QSurfaceFormat.OpenGLContextProfile.CoreProfile
+            and not fmt.testOption(QtGui.QSurfaceFormat.FormatOption.DeprecatedFunctions))
+
+
+def column_major(matrices):
+    """(..., 4, 4) row-major numpy matrices to the column-major layout glUniformMatrix4fv expects"""
+    return np.ascontiguousarray(np.swapaxes(matrices, -1, -2), dtype=np.float32)
+
+
+def view_projection(item):
+    return np.array(item.mvpMatrix().copyDataTo(), dtype=np.float32).reshape(4, 4)
+
+
+def default_program():
+    """pyqtgraph's default shader program, a position, a color and one mvp matrix uniform"""
+    shader = shaders.getShaderProgram(None)
+    program = shader.program(es2_compat=es2_compat())
+    return program, GL.glGetAttribLocation(program, "a_color")
+
+
+def in_frustum(mvps, lo, hi):
+    """
+    Which of the (N, 4, 4) row-major mvp matrices put some of the box from `lo` to `hi` in view.
+    Conservative: a box is only culled when all its corners are outside the same clip plane.
+    """
+    corners = np.ones((8, 4), dtype=np.float32)
+    corners[:, :3] = np.where(np.indices((2, 2, 2)).reshape(3, 8).T, hi, lo)
+    clip = corners @ np.swapaxes(mvps, -1, -2)
+    xyz, w = clip[..., :3], clip[..., 3:]
+    outside = ((xyz < -w).all(axis=1) | (xyz > w).all(axis=1)).any(axis=1)
+    return ~outside
+
+
+class MeshBuffers:
+    """
+    GPU buffers of one mesh: vertex positions plus optional triangle and edge index buffers.
+    They're uploaded once on first draw and can be shared by any number of instances.
+    """
+
+    def __init__(self, vertices, faces=None, edges=None):
+        self.vertices = np.ascontiguousarray(vertices, dtype=np.float32)
+        self.faces = None if faces is None else np.ascontiguousarray(faces, dtype=np.uint32)
+        self.edges = None if edges is None else np.ascontiguousarray(edges, dtype=np.uint32)
+
+        self.vbo_position = GLBuffer(GL.GL_ARRAY_BUFFER)
+        self.ibo_faces = GLBuffer(GL.GL_ELEMENT_ARRAY_BUFFER)
+        self.ibo_edges = GLBuffer(GL.GL_ELEMENT_ARRAY_BUFFER)
+        self.is_uploaded = False
+
+    def upload(self):
+        if self.is_uploaded:
+            return
+        self.vbo_position.upload(self.vertices)
+        if self.faces is not None:
+            self.ibo_faces.upload(self.faces)
+        if self.edges is not None:
+            self.ibo_edges.upload(self.edges)
+        self.is_uploaded = True
+
+    def bind_position(self, loc=0):
+        self.vbo_position.bind()
+        GL.glVertexAttribPointer(loc, 3, GL.GL_FLOAT, False, 0, None)
+        self.vbo_position.release()
+
+    def draw_instances(self, loc_mvp, loc_color, mvps, colors, edges=False):
+        """
+        Draws the faces (or edges) once per instance, `mvps` are column-major (N, 4, 4) matrices.
+        The index buffer is bound once for all instances, only the uniforms change between draws.
+        """
+        ibo, mode, indices = ((self.ibo_edges, GL.GL_LINES, self.edges) if edges
+                              else (self.ibo_faces, GL.GL_TRIANGLES, self.faces))
+        if indices is None or not len(mvps):
+            return
+        ibo.bind()
+        for mvp, color in zip(mvps, colors):
+            GL.glUniformMatrix4fv(loc_mvp, 1, False, mvp)
+            GL.glVertexAttrib4f(loc_color, *color)
+            GL.glDrawElements(mode, indices.size, GL.GL_UNSIGNED_INT, None)
+        ibo.release()
+
+
+class GLCarsItem(GLGraphicsItem):
+    """
+    Draws every car from one set of shared mesh buffers with a per-car model matrix and color.
+
+    `lods` are MeshBuffers from finest to coarsest, a car uses lods[i] while its distance
+    to the camera is below lod_distances[i], past the last distance only its hitbox is drawn.
+    """
+
+    def __init__(self, lods, hitbox, lod_distances, parentItem=None, glOptions="opaque"):
+        super().__init__(parentItem=parentItem)
+        self.setGLOptions(glOptions)
+        self.lods = lods
+        self.hitbox = hitbox
+        self.lod_distances = np.asarray(lod_distances, dtype=np.float32)
+
+        self.matrices = np.zeros((0, 4, 4), dtype=np.float32)
+        self.hitbox_matrices = np.zeros((0, 4, 4), dtype=np.float32)
+        self.colors = np.zeros((0, 4), dtype=np.float32)
+        self.edge_colors = np.zeros((0, 4), dtype=np.float32)
+        self.hitbox_color = (1, 1, 1, 1)
+
+    def setData(self, **kwds):
+        """
+        ====================  ==================================================
+        matrices              (N, 4, 4) model matrix of each car
+        hitbox_matrices       (N, 4, 4) transform from the unit hitbox to each car's hitbox, in car space
+        colors                (N, 4) face color of each car
+        edge_colors           (N, 4) edge color of each car
+        hitbox_color          color of all hitboxes
+        lods                  MeshBuffers of the car from finest to coarsest
+        lod_distances         camera distance up to which each lod is used
+        ====================  ==================================================
+        """
+        if "lod_distances" in kwds:
+            self.lod_distances = np.asarray(kwds.pop("lod_distances"), dtype=np.float32)
+        for arg in ["matrices", "hitbox_matrices", "colors", "edge_colors", "hitbox_color", "lods"]:
+            if arg in kwds:
+                setattr(self, arg, kwds.pop(arg))
+        if kwds:
+            raise ValueError(f"Invalid keyword arguments: {list(kwds)}")
+        self.update()
+
+    def car_lods(self):
+        cam_pos = self.view().cameraPosition()
+        cam_pos = np.array([cam_pos.x(), cam_pos.y(), cam_pos.z()], dtype=np.float32)
+        distances = np.linalg.norm(self.matrices[:, :3, 3] - cam_pos, axis=1)
+        return np.searchsorted(self.lod_distances, distances, side="right")
+
+    def paint(self):
+        if not len(self.matrices):
+            return
+        self.setupGLState()
+
+        for lod in self.lods:
+            lod.upload()
+        self.hitbox.upload()
+
+        car_mvps = view_projection(self) @ self.matrices
+        hitbox_mvps = column_major(car_mvps @ self.hitbox_matrices)
+        car_mvps = column_major(car_mvps)
+        car_lods = self.car_lods()
+
+        program, loc_color = default_program()
+        GL.glEnableVertexAttribArray(0)
+        with program:
+            loc_mvp = GL.glGetUniformLocation(program, "u_mvp")
+
+            for i, lod in enumerate(self.lods):
+                is_lod = car_lods == i
+                if not is_lod.any():
+                    continue
+                lod.bind_position(0)
+                lod.draw_instances(loc_mvp, loc_color, car_mvps[is_lod], self.colors[is_lod])
+                lod.draw_instances(loc_mvp, loc_color, car_mvps[is_lod], self.edge_colors[is_lod], edges=True)
+
+            self.hitbox.bind_position(0)
+            hitbox_colors = np.broadcast_to(np.asarray(self.hitbox_color, dtype=np.float32), (len(hitbox_mvps), 4))
+            self.hitbox.draw_instances(loc_mvp, loc_color, hitbox_mvps, hitbox_colors, edges=True)
+        GL.glDisableVertexAttribArray(0)
+
+
+class GLInstancedMeshItem(GLGraphicsItem):
+    """
+    Draws one mesh any number of times from a single set of MeshBuffers,
+    with a model matrix, face color and edge color per instance.
+    With `cull`, instances whose bounding box is out of view are skipped.
+    The mesh may be None until it's known, nothing is drawn until then.
+    """
+
+    def __init__(self, mesh, draw_faces=True, draw_edges=True, cull=False, parentItem=None, glOptions="opaque"):
+        super().__init__(parentItem=parentItem)
+        self.setGLOptions(glOptions)
+        self.draw_faces = draw_faces
+        self.draw_edges = draw_edges
+        self.cull = cull
+        self.set_mesh(mesh)
+        self.n_drawn = 0
+
+        self.matrices = np.zeros((0, 4, 4), dtype=np.float32)
+        self.colors = np.zeros((0, 4), dtype=np.float32)
+        self.edge_colors = np.zeros((0, 4), dtype=np.float32)
+
+    def setData(self, **kwds):
+        """
+        ====================  ==================================================
+        mesh                  MeshBuffers drawn for every instance
+        matrices              (N, 4, 4) model matrix of each instance
+        colors                (N, 4) face color of each instance
+        edge_colors           (N, 4) edge color of each instance
+        ====================  ==================================================
+        """
+        if "mesh" in kwds:
+            self.set_mesh(kwds.pop("mesh"))
+        for arg in ["matrices", "colors", "edge_colors"]:
+            if arg in kwds:
+                setattr(self, arg, kwds.pop(arg))
+        if kwds:
+            raise ValueError(f"Invalid keyword arguments: {list(kwds)}")
+        self.update()
+
+    def set_mesh(self, mesh):
+        self.mesh = mesh
+        self.bounds = None
+        if self.cull and mesh is not None:
+            self.bounds = (mesh.vertices.min(axis=0), mesh.vertices.max(axis=0))
+
+    def paint(self):
+        if self.mesh is None or not len(self.matrices):
+            return
+        mvps = view_projection(self) @ self.matrices
+        colors, edge_colors = self.colors, self.edge_colors
+        if self.bounds is not None:
+            is_visible = in_frustum(mvps, *self.bounds)
+            mvps = mvps[is_visible]
+            colors = colors[is_visible] if len(colors) else colors
+            edge_colors = edge_colors[is_visible] if len(edge_colors) else edge_colors
+        self.n_drawn = len(mvps)
+        if not self.n_drawn:
+            return
+        mvps = column_major(mvps)
+
+        self.setupGLState()
+        self.mesh.upload()
+        program, loc_color = default_program()
+        GL.glEnableVertexAttribArray(0)
+        with program:
+            loc_mvp = GL.glGetUniformLocation(program, "u_mvp")
+            self.mesh.bind_position(0)
+            if self.draw_faces:
+                self.mesh.draw_instances(loc_mvp, loc_color, mvps, colors)
+            if self.draw_edges:
+                self.mesh.draw_instances(loc_mvp, loc_color, mvps, edge_colors, edges=True)
+        GL.glDisableVertexAttribArray(0)
+
+
+class GLStaticLinesItem(GLGraphicsItem):
+    """
+    Draws geometry that never changes, e.g. the stadium and the ground grid, as indexed lines
+    with a color per vertex. Everything is uploaded once and drawn in a single call.
+    """
+
+    def __init__(self, vertices, edges, colors, parentItem=None, glOptions="translucent"):
+        super().__init__(parentItem=parentItem)
+        self.setGLOptions(glOptions)
+        self.mesh = MeshBuffers(vertices, edges=edges)
+        self.colors = np.ascontiguousarray(colors, dtype=np.float32)
+        self.vbo_color = GLBuffer(GL.GL_ARRAY_BUFFER)
+
+    def paint(self):
+        if not len(self.mesh.edges):
+            return
+        self.setupGLState()
+        if not self.mesh.is_uploaded:
+            self.vbo_color.upload(self.colors)
+            self.mesh.upload()
+
+        program, loc_color = default_program()
+        GL.glEnableVertexAttribArray(0)
+        GL.glEnableVertexAttribArray(loc_color)
+        with program:
+            loc_mvp = GL.glGetUniformLocation(program, "u_mvp")
+            GL.glUniformMatrix4fv(loc_mvp, 1, False, column_major(view_projection(self)))
+            self.mesh.bind_position(0)
+            self.vbo_color.bind()
+            GL.glVertexAttribPointer(loc_color, 4, GL.GL_FLOAT, False, 0, None)
+            self.vbo_color.release()
+
+            self.mesh.ibo_edges.bind()
+            GL.glDrawElements(GL.GL_LINES, self.mesh.edges.size, GL.GL_UNSIGNED_INT, None)
+            self.mesh.ibo_edges.release()
+        GL.glDisableVertexAttribArray(loc_color)
+        GL.glDisableVertexAttribArray(0)
+
+
+class GLLinesItem(GLGraphicsItem):
+    """
+    Lines through `pos`, as separate segments ("lines") or one strip ("line_strip"), with one color
+    or a color per vertex. Positions and colors are only uploaded again after they were set.
+    """
+
+    def __init__(self, pos=None, color=(1, 1, 1, 1), mode="lines", width=1, parentItem=None, glOptions="opaque"):
+        super().__init__(parentItem=parentItem)
+        self.setGLOptions(glOptions)
+        if mode not in ("lines", "line_strip"):
+            raise ValueError(f"Unknown line mode {mode!r}, expected 'lines' or 'line_strip'")
+        self.mode = GL.GL_LINES if mode == "lines" else GL.GL_LINE_STRIP
+        self.width = width
+        self.vbo_position = GLBuffer(GL.GL_ARRAY_BUFFER)
+        self.vbo_color = GLBuffer(GL.GL_ARRAY_BUFFER)
+        self.pos = np.zeros((0, 3), dtype=np.float32)
+        self.color = None
+        self.is_pos_dirty = False
+        self.is_color_dirty = False
+        self.setData(pos=pos, color=color)
+
+    def setData(self, **kwds):
+        """
+        ====================  ==================================================
+        pos                   (N, 3) vertices
+        color                 (N, 4) color of each vertex, or one color for all
+        ====================  ==================================================
+        """
+        if "pos" in kwds:
+            pos = kwds.pop("pos")
+            if pos is not None:
+                self.pos = np.ascontiguousarray(pos, dtype=np.float32)
+                self.is_pos_dirty = True
+        if "color" in kwds:
+            self.color = np.ascontiguousarray(kwds.pop("color"), dtype=np.float32)
+            self.is_color_dirty = self.color.ndim == 2
+        if kwds:
+            raise ValueError(f"Invalid keyword arguments: {list(kwds)}")
+        self.update()
+
+    def paint(self):
+        if len(self.pos) < 2:
+            return
+        self.setupGLState()
+        if self.is_pos_dirty:
+            self.vbo_position.upload(self.pos)
+            self.is_pos_dirty = False
+        if self.is_color_dirty:
+            self.vbo_color.upload(self.color)
+            self.is_color_dirty = False
+
+        per_vertex = self.color.ndim == 2
+        set_width = self.width != 1 and not is_core_profile()
+        program, loc_color = default_program()
+        GL.glEnableVertexAttribArray(0)
+        with program:
+            loc_mvp = GL.glGetUniformLocation(program, "u_mvp")
+            GL.glUniformMatrix4fv(loc_mvp, 1, False, column_major(view_projection(self)))
+            self.vbo_position.bind()
+            GL.glVertexAttribPointer(0, 3, GL.GL_FLOAT, False, 0, None)
+            self.vbo_position.release()
+            if per_vertex:
+                GL.glEnableVertexAttribArray(loc_color)
+                self.vbo_color.bind()
+                GL.glVertexAttribPointer(loc_color, 4, GL.GL_FLOAT, False, 0, None)
+                self.vbo_color.release()
+            else:
+                GL.glVertexAttrib4f(loc_color, *self.color)
+
+            if set_width:
+                GL.glLineWidth(self.width)
+            GL.glDrawArrays(self.mode, 0, len(self.pos))
+            if set_width:
+                GL.glLineWidth(1)
+        if per_vertex:
+            GL.glDisableVertexAttribArray(loc_color)
+        GL.glDisableVertexAttribArray(0)
+
+
+# one texture lookup per fragment, written like pyqtgraph's own shaders so es2_compat applies to it too
+TEXTURE_SHADER = shaders.ShaderProgram("rsv_texture", [
+    shaders.VertexShader("""
+        uniform mat4 u_mvp;
+        attribute vec4 a_position;
+        attribute vec2 a_texcoord;
+        varying vec2 v_texcoord;
+        void main() {
+            v_texcoord = a_texcoord;
+            gl_Position = u_mvp * a_position;
+        }
+    """),
+    shaders.FragmentShader("""
+        #ifdef GL_ES
+        precision mediump float;
+        #endif
+        uniform sampler2D u_texture;
+        varying vec2 v_texcoord;
+        void main() {
+            gl_FragColor = texture2D(u_texture, v_texcoord);
+        }
+    """),
+])
+
+
+class GLTextureItem(GLGraphicsItem):
+    """
+    An (x, y, 4) uint8 RGBA image as a textured quad from (0, 0) to (x, y), one texel per unit,
+    like pyqtgraph's GLImageItem. The image is uploaded on the next paint after it was set.
+    """
+
+    def __init__(self, image, parentItem=None, glOptions="translucent"):
+        super().__init__(parentItem=parentItem)
+        self.setGLOptions(glOptions)
+        self.texture = None
+        self.vbo_quad = GLBuffer(GL.GL_ARRAY_BUFFER)
+        self.setData(image)
+
+    def setData(self, image):
+        self.image = image
+        self.is_dirty = True
+        self.update()
+
+    def upload(self):
+        if self.texture is None:
+            self.texture = GL.glGenTextures(1)
+        GL.glBindTexture(GL.GL_TEXTURE_2D, self.texture)
+        GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MIN_FILTER, GL.GL_NEAREST)
+        GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MAG_FILTER, GL.GL_NEAREST)
+        GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_WRAP_S, GL.GL_CLAMP_TO_EDGE)
+        GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_WRAP_T, GL.GL_CLAMP_TO_EDGE)
+        # texture rows are y, the image is indexed x first
+        x, y = self.image.shape[:2]
+        GL.glTexImage2D(GL.GL_TEXTURE_2D, 0, GL.GL_RGBA, x, y, 0, GL.GL_RGBA, GL.GL_UNSIGNED_BYTE,
+                        np.ascontiguousarray(self.image.transpose(1, 0, 2)))
+        GL.glBindTexture(GL.GL_TEXTURE_2D, 0)
+
+        # x, y, u, v of the corners, drawn as a strip
+        self.vbo_quad.upload(np.array([[0, 0, 0, 0], [x, 0, 1, 0], [0, y, 0, 1], [x, y, 1, 1]], dtype=np.float32))
+        self.is_dirty = False
+
+    def paint(self):
+        self.setupGLState()
+        if self.is_dirty:
+            self.upload()
+
+        program = TEXTURE_SHADER.program(es2_compat=es2_compat())
+        loc_texcoord = GL.glGetAttribLocation(program, "a_texcoord")
+        GL.glEnableVertexAttribArray(0)
+        GL.glEnableVertexAttribArray(loc_texcoord)
+        GL.glBindTexture(GL.GL_TEXTURE_2D, self.texture)
+        with program:
+            loc_mvp = GL.glGetUniformLocation(program, "u_mvp")
+            GL.glUniformMatrix4fv(loc_mvp, 1, False, column_major(view_projection(self)))
+            self.vbo_quad.bind()
+            GL.glVertexAttribPointer(0, 2, GL.GL_FLOAT, False, 4 * 4, None)
+            GL.glVertexAttribPointer(loc_texcoord, 2, GL.GL_FLOAT, False, 4 * 4, GL.GLvoidp(2 * 4))
+            self.vbo_quad.release()
+            GL.glDrawArrays(GL.GL_TRIANGLE_STRIP, 0, 4)
+        GL.glBindTexture(GL.GL_TEXTURE_2D, 0)
+        GL.glDisableVertexAttribArray(loc_texcoord)
+        GL.glDisableVertexAttribArray(0)
+
+
+class OffscreenRenderer:
+    """
+    Renders the items of a GLViewWidget into a framebuffer of its own and reads the pixels back,
+    in a single pass at any size and without the widget being on screen.
+
+    `context` is what's made current to render, anything with makeCurrent and doneCurrent:
+    by default the view itself, which then has to have been shown, or one from glcontext.py.
+    """
+
+    def __init__(self, view, context=None):
+        self.view = view
+        self.context = view if context is None else context
+        self.fbo = None
+        self.renderbuffers = None
+        self.size = None
+
+    def resize(self, width, height):
+        """(Re)allocates the color and depth/stencil buffers of the framebuffer, leaves it bound."""
+        if self.fbo is None:
+            self.fbo = GL.glGenFramebuffers(1)
+            self.renderbuffers = GL.glGenRenderbuffers(2)
+        GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, self.fbo)
+        attachments = ((GL.GL_RGBA8, GL.GL_COLOR_ATTACHMENT0), (GL.GL_DEPTH24_STENCIL8, GL.GL_DEPTH_STENCIL_ATTACHMENT))
+        for renderbuffer, (internal_format, attachment) in zip(self.renderbuffers, attachments):
+            GL.glBindRenderbuffer(GL.GL_RENDERBUFFER, renderbuffer)
+            GL.glRenderbufferStorage(GL.GL_RENDERBUFFER, internal_format, width, height)
+            GL.glFramebufferRenderbuffer(GL.GL_FRAMEBUFFER, attachment, GL.GL_RENDERBUFFER, renderbuffer)
+        GL.glBindRenderbuffer(GL.GL_RENDERBUFFER, 0)
+        status = GL.glCheckFramebufferStatus(GL.GL_FRAMEBUFFER)
+        if status != GL.GL_FRAMEBUFFER_COMPLETE:
+            raise RuntimeError(f"Couldn't create a {width}x{height} framebuffer to render into (status {status:#x})")
+        self.size = (width, height)
+
+    def render(self, out, hidden_items=()):
+        """
+        Renders into `out`, a (height, width, 4) uint8 array, as RGBA rows from bottom to top.
+        `hidden_items` are left out, e.g. text items, which paint on the widget itself.
+        """
+        height, width, _ = out.shape
+        self.context.makeCurrent()
+        # a QOpenGLWidget draws into a framebuffer of its own rather than 0, it's bound again afterwards
+        previous_fbo = GL.glGetIntegerv(GL.GL_FRAMEBUFFER_BINDING)
+
+        visible_items = [item for item in hidden_items if item.visible()]
+        for item in visible_items:
+            item.setVisible(False)
+        try:
+            if self.size != (width, height):
+                self.resize(width, height)
+            else:
+                GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, self.fbo)
+            GL.glViewport(0, 0, width, height)
+            self.view.paint(region=(0, 0, width, height), viewport=(0, 0, width, height))
+            GL.glReadPixels(0, 0, width, height, GL.GL_RGBA, GL.GL_UNSIGNED_BYTE, out)
+        finally:
+            GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, previous_fbo)
+            for item in visible_items:
+                item.setVisible(True)
+            self.context.doneCurrent()
@@ -0,0 +1,254 @@
+from rocketsimvisualizer import glitems
+from rocketsimvisualizer.models import mesh
+from rocketsimvisualizer.snapshot import ArenaSnapshot
+from rocketsimvisualizer.transforms import model_matrices, screen_to_ground
+from rocketsimvisualizer.visualizer import (KeyPressWindow, Visualizer, boost_pad_lines, boost_pads_item,
+                                            car_hitbox_mesh, car_lod_meshes, set_boost_pad_lines, stadium_edges)
+
+from pyqtgraph.Qt import QtCore
+import pyqtgraph as pg
+import pyqtgraph.opengl as gl
+
+import numpy as np
+import math
+
+# distance between the centers of two tiles, the field is 8192 x 10240 plus the goals
+TILE_SPACING = np.array([9000, 12800, 0], dtype=np.float32)
+
+# alpha of every arena when they're overlaid as ghosts
+GHOST_ALPHA = 0.35
+
+# mouse movement in pixels under which a press and release is a click rather than a drag
+CLICK_DISTANCE = 4
+
+
+class GridWindow(KeyPressWindow):
+    sigClicked = QtCore.pyqtSignal(float, float)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.press_pos = None
+
+    def mousePressEvent(self, event):
+        super().mousePressEvent(event)
+        self.press_pos = event.localPos()
+
+    def mouseReleaseEvent(self, event):
+        pos = event.localPos()
+        if self.press_pos is not None and (pos - self.press_pos).manhattanLength() < CLICK_DISTANCE:
+            self.sigClicked.emit(pos.x(), pos.y())
+        self.press_pos = None
+
+
+class SnapshotMirror:
+    """A source that copies a snapshot updated elsewhere, so a promoted view doesn't read its arena again."""
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+
+    def read(self, snapshot):
+        snapshot.copy_from(self.snapshot)
+        return True
+
+
+class GridVisualizer:
+    """
+    Shows many arenas at once in one view, either tiled next to each other or overlaid as ghosts.
+
+    Every kind of object is a single item for all arenas: the stadium is one mesh drawn once
+    per tile, all balls and all cars are instanced from shared buffers and all pads are one
+    line item, so a frame costs a few numpy ops over the moving objects whatever the arena count.
+    Clicking an arena opens it in a full Visualizer.
+    """
+
+    def __init__(self, arenas=(), sources=(), layout="tiles", tick_rate=120, tick_skip=2, step_arena=False,
+                 config_dict=None, car_lod_distances=(4000, 12000)):
+        self.inputs = [(arena, None) for arena in arenas] + [(None, source) for source in sources]
+        if not self.inputs:
+            raise ValueError("GridVisualizer needs at least one arena or source")
+        self.tick_rate = tick_rate
+        self.tick_skip = tick_skip
+        self.step_arena = step_arena
+        self.config_dict = config_dict
+
+        self.snapshots = [ArenaSnapshot() for _ in self.inputs]
+        self.read_snapshots()
+
+        n_arenas = len(self.inputs)
+        n_cols = math.ceil(math.sqrt(n_arenas))
+        n_rows = math.ceil(n_arenas / n_cols)
+        if layout == "tiles":
+            cells = np.array([(i % n_cols - (n_cols - 1) / 2, (n_rows - 1) / 2 - i // n_cols, 0)
+                              for i in range(n_arenas)], dtype=np.float32)
+            self.offsets = cells * TILE_SPACING
+            self.alpha = 1
+            gl_options = "opaque"
+            extent = max(n_cols * TILE_SPACING[0], n_rows * TILE_SPACING[1])
+        elif layout == "ghosts":
+            self.offsets = np.zeros((n_arenas, 3), dtype=np.float32)
+            self.alpha = GHOST_ALPHA
+            gl_options = "translucent"
+            extent = TILE_SPACING[1]
+        else:
+            raise ValueError(f"Unknown layout {layout!r}, expected 'tiles' or 'ghosts'")
+        self.layout = layout
+
+        self.app = pg.mkQApp()
+
+        self.w = GridWindow()
+        self.w.setWindowTitle(f"pyqtgraph visualizer - {n_arenas} arenas")
+        self.w.setGeometry(0, 50, 1280, 720)
+        self.w.setCameraPosition(pos=pg.Vector(0, 0, 0), distance=float(extent), elevation=60, azimuth=-90)
+        self.w.show()
+
+        self.default_edge_color = (1, 1, 1, 1)
+        self.blue_color = (0, 0.4, 0.8, self.alpha)
+        self.orange_color = (1, 0.2, 0.1, self.alpha)
+
+        # the stadium outline is uploaded once and drawn once per tile
+        stadium_outline = stadium_edges()
+        stadium = glitems.MeshBuffers(stadium_outline["vertices"], edges=stadium_outline["edges"])
+        self.stadium_mi = glitems.GLInstancedMeshItem(stadium, draw_faces=False)
+        tiles = self.offsets if layout == "tiles" else self.offsets[:1]
+        stadium_matrices = np.tile(np.eye(4, dtype=np.float32), (len(tiles), 1, 1))
+        stadium_matrices[:, :3, 3] = tiles
+        self.stadium_mi.setData(matrices=stadium_matrices,
+                                edge_colors=np.tile(self.default_edge_color, (len(tiles), 1)))
+        self.w.addItem(self.stadium_mi)
+
+        # unit sphere, scaled by each ball's radius
+        ball_md = gl.MeshData.sphere(rows=8, cols=16, radius=1)
+        ball = glitems.MeshBuffers(ball_md.vertexes(), ball_md.faces(), mesh.unique_edges(ball_md.faces()))
+        self.balls_mi = glitems.GLInstancedMeshItem(ball, glOptions=gl_options)
+        self.ball_matrices = np.zeros((n_arenas, 4, 4), dtype=np.float32)
+        self.balls_mi.setData(colors=np.tile((0.1, 0.1, 0.1, self.alpha), (n_arenas, 1)),
+                              edge_colors=np.tile(self.default_edge_color[:3] + (self.alpha,), (n_arenas, 1)))
+        self.w.addItem(self.balls_mi)
+
+        # pads of every arena in one line item
+        self.pads_mi = boost_pads_item()
+        self.w.addItem(self.pads_mi)
+        self.pad_counts = None
+        self.build_boost_pad_geometry()
+
+        self.cars_mi = glitems.GLCarsItem(car_lod_meshes(), car_hitbox_mesh(), car_lod_distances,
+                                          glOptions=gl_options)
+        self.cars_mi.setData(hitbox_color=self.default_edge_color[:3] + (self.alpha,))
+        self.w.addItem(self.cars_mi)
+
+        # full views of single arenas, opened by clicking on them
+        self.promoted = {}
+        self.w.sigClicked.connect(self.on_click)
+
+        self.update()
+
+    def read_snapshots(self):
+        for (arena, source), snapshot in zip(self.inputs, self.snapshots):
+            if arena is not None:
+                if self.step_arena:
+                    arena.step(self.tick_skip)
+                snapshot.update(arena)
+            else:
+                source.read(snapshot)
+
+    def build_boost_pad_geometry(self):
+        self.pad_counts = [len(snapshot.pads) for snapshot in self.snapshots]
+        pad_lines = [boost_pad_lines(snapshot.pads) + offset for snapshot, offset in zip(self.snapshots, self.offsets)]
+        pad_lines = np.concatenate(pad_lines)
+        self.pad_colors = set_boost_pad_lines(self.pads_mi, pad_lines, self.default_edge_color[:3] + (self.alpha,))
+        self.pads_active = np.ones(len(pad_lines), dtype=bool)
+
+    def update_boost_pad_data(self):
+        if [len(snapshot.pads) for snapshot in self.snapshots] != self.pad_counts:
+            self.build_boost_pad_geometry()
+
+        is_active = np.concatenate([snapshot.pads["is_active"] for snapshot in self.snapshots])
+        changed = is_active != self.pads_active
+        if not changed.any():
+            return
+        self.pads_active[:] = is_active
+        self.pad_colors[changed, :, 3] = np.where(is_active[changed], self.alpha, 0)[:, None]
+        self.pads_mi.setData(color=self.pad_colors.reshape(-1, 4))
+
+    def update_ball_data(self):
+        balls = np.stack([snapshot.ball for snapshot in self.snapshots])
+        model_matrices(balls["pos"], balls["rot"], out=self.ball_matrices)
+        self.ball_matrices[:, :3, :3] *= (balls["radius"] * 50)[:, None, None]
+        self.ball_matrices[:, :3, 3] += self.offsets
+        self.balls_mi.setData(matrices=self.ball_matrices)
+
+    def update_cars_data(self):
+        cars_data = np.concatenate([snapshot.cars for snapshot in self.snapshots])
+        car_offsets = np.repeat(self.offsets, [len(snapshot.cars) for snapshot in self.snapshots], axis=0)
+
+        car_matrices = model_matrices(cars_data["pos"], cars_data["rot"])
+        car_matrices[:, :3, 3] += car_offsets
+
+        hitbox_rot = cars_data["hitbox_size"][:, None, :] * np.eye(3, dtype=np.float32)
+        hitbox_matrices = model_matrices(cars_data["hitbox_offset"], hitbox_rot)
+
+        colors = np.where((cars_data["team"] == 0)[:, None], self.blue_color, self.orange_color).astype(np.float32)
+        edge_colors = np.where(cars_data["is_supersonic"][:, None], (0, 0, 0, self.alpha),
+                               self.default_edge_color[:3] + (self.alpha,)).astype(np.float32)
+
+        self.cars_mi.setData(matrices=car_matrices, hitbox_matrices=hitbox_matrices,
+                             colors=colors, edge_colors=edge_colors)
+
+    def update_plot_data(self):
+        self.update_boost_pad_data()
+        self.update_ball_data()
+        self.update_cars_data()
+
+    def update(self):
+        self.read_snapshots()
+        self.update_plot_data()
+
+        for i, v in list(self.promoted.items()):
+            if v.w.isVisible():
+                v.update()
+            else:
+                # closing the window only hides it, its threads, files and GL resources go with the visualizer
+                del self.promoted[i]
+                v.close()
+                v.w.deleteLater()
+
+    def arena_at(self, point):
+        """Index of the arena under a display space point on the ground, or None."""
+        if self.layout == "tiles":
+            distances = np.abs(self.offsets[:, :2] - point[:2]) / TILE_SPACING[:2]
+            inside = np.flatnonzero((distances <= 0.5).all(axis=1))
+            return int(inside[0]) if len(inside) else None
+
+        # overlaid, pick the arena with a ball or car closest to the point
+        positions = [np.concatenate([snapshot.ball["pos"][None], snapshot.cars["pos"]]) for snapshot in self.snapshots]
+        distances = [np.linalg.norm(pos[:, :2] * (-1, 1) - point[:2], axis=1).min() for pos in positions]
+        return int(np.argmin(distances))
+
+    def on_click(self, x, y):
+        point = screen_to_ground(self.w, x, y)
+        if point is None:
+            return
+        i = self.arena_at(point)
+        if i is not None:
+            self.promote(i)
+
+    def promote(self, i):
+        if i in self.promoted:
+            self.promoted[i].w.activateWindow()
+            return
+        v = Visualizer(source=SnapshotMirror(self.snapshots[i]), tick_rate=self.tick_rate,
+                       config_dict=self.config_dict)
+        v.w.setWindowTitle(f"pyqtgraph visualizer - arena {i}")
+        self.promoted[i] = v
+
+    def animation(self):
+        timer = QtCore.QTimer()
+        timer.timeout.connect(self.update)
+        timer.start(16)
+        self.app.aboutToQuit.connect(self.close)
+        self.app.exec()
+
+    def close(self):
+        for v in self.promoted.values():
+            v.close()
+        self.promoted.clear()
@@ -0,0 +1,197 @@
+from rocketsimvisualizer.snapshot import MAX_CAR_SPEED, TELEPORT_MARGIN
+
+import numpy as np
+
+# the floor from wall to wall and goal back to goal back, up to the ceiling
+FIELD_MIN = np.array([-4096, -6000, 0], dtype=np.float32)
+FIELD_MAX = np.array([4096, 6000, 2048], dtype=np.float32)
+
+LAYERS = ("blue", "orange", "ball")
+
+car_stats_dtype = np.dtype([
+    ("id", np.uint32),
+    ("team", np.uint8),
+    ("ticks", np.int64),
+    ("distance", np.float64),
+    ("supersonic_ticks", np.int64),
+    ("on_ground_ticks", np.int64),
+    ("boost_used", np.float64),
+    ("boost_collected", np.float64),
+])
+TOTAL_FIELDS = car_stats_dtype.names[2:]
+
+# colors from no time spent to the most time spent, transparent where nothing happened
+COLOR_STOPS = np.array([0, 0.25, 0.5, 0.75, 1], dtype=np.float32)
+COLORS = np.array([
+    [0, 0, 64, 0],
+    [20, 40, 180, 140],
+    [180, 40, 160, 180],
+    [250, 150, 30, 210],
+    [255, 255, 200, 240],
+], dtype=np.float32)
+
+
+class FieldStats:
+    """
+    Accumulates where the cars and the ball spend their time and per-car running stats,
+    one snapshot at a time.
+
+    Occupancy is a (layer, x, y, z) histogram of `bin_size` cells over the field, in ticks, so it
+    doesn't depend on the frame rate. A frame costs one np.add.at over the cars and the ball,
+    plus a few ops per car for the stats.
+
+    Frames many ticks apart, e.g. when stepping as fast as possible, are counted like any other.
+    Call `reset` after a jump (a seek in a replay), the frame after it isn't compared to the one before.
+    """
+
+    def __init__(self, bin_size=128, tick_rate=120):
+        self.bin_size = bin_size
+        self.tick_rate = tick_rate
+        self.shape = tuple(np.ceil((FIELD_MAX - FIELD_MIN) / bin_size).astype(int))
+        self.counts = np.zeros((len(LAYERS),) + self.shape, dtype=np.float32)
+        self.max_index = np.array(self.shape) - 1
+
+        # running totals per car, one row per car id in the order they showed up, see car_stats
+        self.car_ids = []
+        self.car_teams = []
+        self.totals = np.zeros((0, len(TOTAL_FIELDS)), dtype=np.float64)
+        self.car_rows = {}
+
+        # ids and rows of the cars in the previous counted frame, with their position and boost
+        self.last_car_ids = None
+        self.rows = None
+        self.last_pos = None
+        self.last_boost = None
+        self.last_tick_count = None
+
+    def reset(self):
+        """Forgets the previous frame, the next one is only remembered."""
+        self.last_tick_count = None
+        self.last_car_ids = None
+
+    def bin_indices(self, pos):
+        indices = ((pos - FIELD_MIN) / self.bin_size).astype(np.int64)
+        np.maximum(indices, 0, out=indices)
+        return np.minimum(indices, self.max_index, out=indices)
+
+    def add(self, snapshot):
+        last_tick_count = self.last_tick_count
+        if snapshot.tick_count == last_tick_count:
+            # the same state again: paused, or drawn more often than it's stepped. nothing happened,
+            # and the frame before it is still the one the next distances and boost deltas are taken from
+            return
+        self.last_tick_count = snapshot.tick_count
+        if last_tick_count is None:
+            return
+        ticks = snapshot.tick_count - last_tick_count
+        if ticks < 0:
+            # the source went back in time, distances and boost deltas would be made up
+            self.last_car_ids = None
+            return
+
+        cars = snapshot.cars
+        positions = np.concatenate([cars["pos"], snapshot.ball["pos"][None]])
+        layers = np.empty(len(positions), dtype=np.int64)
+        layers[:-1] = cars["team"]
+        layers[-1] = LAYERS.index("ball")
+        indices = self.bin_indices(positions)
+        np.add.at(self.counts, (layers, indices[:, 0], indices[:, 1], indices[:, 2]), ticks)
+
+        self.add_car_stats(cars, ticks)
+
+    def car_rows_of(self, car_ids, teams):
+        for car_id, team in zip(car_ids, teams):
+            if car_id not in self.car_rows:
+                self.car_rows[car_id] = len(self.car_ids)
+                self.car_ids.append(car_id)
+                self.car_teams.append(team)
+                self.totals = np.concatenate([self.totals, np.zeros((1, len(TOTAL_FIELDS)))])
+        return np.array([self.car_rows[car_id] for car_id in car_ids], dtype=np.int64)
+
+    def add_car_stats(self, cars, ticks):
+        car_ids = cars["id"].tolist()
+        is_same_cars = car_ids == self.last_car_ids
+        if not is_same_cars:
+            self.rows = self.car_rows_of(car_ids, cars["team"].tolist())
+        pos, boost = cars["pos"], cars["boost"]
+
+        # ticks, distance, supersonic ticks, on ground ticks, boost used, boost collected
+        delta = np.zeros((len(car_ids), len(TOTAL_FIELDS)))
+        delta[:, 0] = ticks
+        delta[:, 2] = cars["is_supersonic"]
+        delta[:, 3] = cars["is_on_ground"]
+        delta[:, 2:4] *= ticks
+        # distance and boost are differences to the previous frame, skipped for a frame when cars join or leave,
+        # and for a car further from where it was than it can drive: it respawned or its state was reset
+        if is_same_cars:
+            offset = pos - self.last_pos
+            distance = np.sqrt((offset * offset).sum(axis=1))
+            is_driven = distance <= MAX_CAR_SPEED * ticks / self.tick_rate + TELEPORT_MARGIN
+            delta[:, 1] = np.where(is_driven, distance, 0)
+            boost_delta = np.where(is_driven, boost - self.last_boost, 0)
+            np.maximum(-boost_delta, 0, out=delta[:, 4])
+            np.maximum(boost_delta, 0, out=delta[:, 5])
+        self.totals[self.rows] += delta
+        self.last_car_ids, self.last_pos, self.last_boost = car_ids, pos.copy(), boost.copy()
+
+    @property
+    def car_stats(self):
+        """Structured array of the running totals, one row per car."""
+        car_stats = np.zeros(len(self.car_ids), dtype=car_stats_dtype)
+        car_stats["id"] = self.car_ids
+        car_stats["team"] = self.car_teams
+        for i, field in enumerate(TOTAL_FIELDS):
+            car_stats[field] = self.totals[:, i]
+        return car_stats
+
+    def occupancy(self, layers=LAYERS):
+        """(x, y) seconds spent in every floor cell, summed over `layers` and height."""
+        indices = [LAYERS.index(layer) for layer in layers]
+        return self.counts[indices].sum(axis=(0, 3)) / self.tick_rate
+
+    def image(self, layers=LAYERS):
+        """
+        (x, y, 4) RGBA of the occupancy in display space (x mirrored), on a log scale
+        so the few cells where everything starts don't wash out the rest.
+        """
+        occupancy = np.log1p(self.occupancy(layers)[::-1])
+        peak = occupancy.max()
+        levels = occupancy / peak if peak > 0 else occupancy
+        image = np.empty(occupancy.shape + (4,), dtype=np.uint8)
+        for channel in range(4):
+            image[..., channel] = np.interp(levels, COLOR_STOPS, COLORS[:, channel])
+        return image
+
+    def summary(self):
+        """Per car stats in seconds, uu/s and boost amounts, keyed by car id."""
+        summary = {}
+        for row in self.car_stats:
+            seconds = row["ticks"] / self.tick_rate
+            summary[int(row["id"])] = {
+                "team": int(row["team"]),
+                "seconds": float(seconds),
+                "average_speed": float(row["distance"] / seconds) if seconds else 0.0,
+                "supersonic_seconds": float(row["supersonic_ticks"] / self.tick_rate),
+                "on_ground_seconds": float(row["on_ground_ticks"] / self.tick_rate),
+                "boost_used": float(row["boost_used"]),
+                "boost_collected": float(row["boost_collected"]),
+            }
+        return summary
+
+    def save(self, filename):
+        """Writes the histograms and per car stats to a .npz file, see load."""
+        np.savez_compressed(filename, counts=self.counts, car_stats=self.car_stats,
+                            bin_size=self.bin_size, tick_rate=self.tick_rate,
+                            field_min=FIELD_MIN, field_max=FIELD_MAX)
+
+    @classmethod
+    def load(cls, filename):
+        data = np.load(filename)
+        stats = cls(bin_size=int(data["bin_size"]), tick_rate=int(data["tick_rate"]))
+        stats.counts[:] = data["counts"]
+        car_stats = data["car_stats"]
+        stats.car_ids = car_stats["id"].tolist()
+        stats.car_teams = car_stats["team"].tolist()
+        stats.totals = np.column_stack([car_stats[field] for field in TOTAL_FIELDS]).astype(np.float64)
+        stats.car_rows = {car_id: i for i, car_id in enumerate(stats.car_ids)}
+        return stats
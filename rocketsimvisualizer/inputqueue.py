@@ -0,0 +1,86 @@
+import RocketSim
+
+from collections import deque
+import threading
+import time
+
+import numpy as np
+
+CONTROL_FIELDS = ("throttle", "steer", "pitch", "yaw", "roll", "jump", "boost", "handbrake")
+
+
+def make_controls(**values):
+    # CarControls ignores constructor arguments, fields have to be set one by one
+    controls = RocketSim.CarControls()
+    for field, value in values.items():
+        setattr(controls, field, value)
+    return controls
+
+
+def controls_from_gamepad(state):
+    """CarControls from a state dict of XboxController.read()."""
+    return make_controls(
+        throttle=state["RT"] or -state["LT"],
+        steer=state["leftX"],
+        roll=state["RB"] or -state["LB"],
+        pitch=-state["leftY"],
+        yaw=state["leftX"],
+        jump=state["A"],
+        handbrake=state["X"],
+        boost=state["B"],
+    )
+
+
+class InputQueue:
+    """
+    Timestamped car controls from any number of input threads, consumed by whatever steps the arena.
+
+    Every event is the full set of controls at the time it happened, so a consumer only needs
+    the newest event up to the tick it's about to step and can never see half of an update.
+    The delay between an event and the tick that applied it is kept for the last
+    `capacity` events.
+    """
+
+    def __init__(self, capacity=256):
+        self._events = deque()
+        self._lock = threading.Lock()
+        self.latencies = np.zeros(capacity, dtype=np.float64)
+        self.n_applied = 0
+
+    def push(self, controls, timestamp=None):
+        if timestamp is None:
+            timestamp = time.perf_counter()
+        with self._lock:
+            self._events.append((timestamp, controls))
+
+    def next_time(self):
+        """Timestamp of the oldest queued event, or None."""
+        with self._lock:
+            return self._events[0][0] if self._events else None
+
+    def pop_until(self, timestamp):
+        """Removes every event up to `timestamp` and returns the controls of the newest one, or None."""
+        with self._lock:
+            if not self._events or self._events[0][0] > timestamp:
+                return None
+            events = []
+            while self._events and self._events[0][0] <= timestamp:
+                events.append(self._events.popleft())
+
+        now = time.perf_counter()
+        for event_time, _ in events:
+            self.latencies[self.n_applied % len(self.latencies)] = now - event_time
+            self.n_applied += 1
+        return events[-1][1]
+
+    def clear(self):
+        with self._lock:
+            self._events.clear()
+
+    def latency_stats(self):
+        """Input to physics latency percentiles in milliseconds, over the latest applied events."""
+        n = min(self.n_applied, len(self.latencies))
+        if not n:
+            return {}
+        p50, p95, p99 = np.percentile(self.latencies[:n] * 1000, (50, 95, 99))
+        return {"p50": float(p50), "p95": float(p95), "p99": float(p99), "events": self.n_applied}
@@ -0,0 +1,103 @@
+import numpy as np
+
+
+def unique_edges(faces):
+    """
+    Returns the (E, 2) vertex index pairs of all distinct edges of (N, 3) triangle faces.
+    """
+    faces = np.asarray(faces, dtype=np.uint32)
+    edges = np.concatenate([faces[:, [0, 1]], faces[:, [1, 2]], faces[:, [2, 0]]])
+    edges.sort(axis=1)
+    # unique over packed 64 bit keys is much faster than over rows
+    keys = np.unique((edges[:, 0].astype(np.uint64) << np.uint64(32)) | edges[:, 1])
+    return np.stack([keys >> np.uint64(32), keys & np.uint64(0xFFFFFFFF)], axis=1).astype(np.uint32)
+
+
+def edge_lines(vertices, faces):
+    """
+    Returns the (2 * E, 3) vertex positions of all distinct edges, ready to be drawn as GL_LINES.
+    """
+    return np.asarray(vertices, dtype=np.float32)[unique_edges(faces).ravel()]
+
+
+def feature_edges(vertices, faces, angle=5.0):
+    """
+    Returns a dict with the "vertices" and (E, 2) "edges" that outline a triangle mesh: edges on a boundary
+    and edges between faces meeting at more than `angle` degrees. Edges inside flat regions, e.g. the
+    diagonals of a quad, are dropped. Vertices at the same position are merged first, so faces split
+    only by duplicated vertices still count as neighbors.
+    """
+    vertices, inverse = np.unique(np.asarray(vertices, dtype=np.float32), axis=0, return_inverse=True)
+    faces = inverse.ravel()[np.asarray(faces, dtype=np.int64)]
+    faces = faces[(faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2]) & (faces[:, 2] != faces[:, 0])]
+
+    corners = vertices[faces].astype(np.float64)
+    normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    normals /= np.maximum(np.linalg.norm(normals, axis=1), 1e-12)[:, None]
+
+    edges = np.concatenate([faces[:, [0, 1]], faces[:, [1, 2]], faces[:, [2, 0]]])
+    edges.sort(axis=1)
+    edge_faces = np.tile(np.arange(len(faces)), 3)
+    order = np.lexsort((edges[:, 1], edges[:, 0]))
+    edges, edge_faces = edges[order], edge_faces[order]
+    _, first, counts = np.unique(edges, axis=0, return_index=True, return_counts=True)
+
+    # boundary and non-manifold edges are always kept, shared ones only at a crease.
+    # the winding isn't consistent in every model, so faces facing opposite ways count as coplanar too
+    is_shared = counts == 2
+    cosines = np.einsum("ij,ij->i", normals[edge_faces[first[is_shared]]], normals[edge_faces[first[is_shared] + 1]])
+    keep = ~is_shared
+    keep[is_shared] = np.abs(cosines) < np.cos(np.radians(angle))
+
+    # drop the vertices only used by interior edges
+    edges = edges[first[keep]]
+    used, edges = np.unique(edges, return_inverse=True)
+    return {"vertices": vertices[used], "edges": edges.reshape(-1, 2).astype(np.uint32)}
+
+
+def grid_lines(size_x, size_y, spacing):
+    """
+    Returns the (2 * L, 3) end points of the lines of a `size_x` by `size_y` grid on z = 0 centered
+    on the origin, with lines every `spacing`, like GLGridItem draws.
+    """
+    x_values = np.arange(-size_x / 2, size_x / 2 + spacing * 0.001, spacing)
+    y_values = np.arange(-size_y / 2, size_y / 2 + spacing * 0.001, spacing)
+    lines = np.zeros((len(x_values) + len(y_values), 2, 3), dtype=np.float32)
+    lines[:len(x_values), :, 0] = x_values[:, None]
+    lines[:len(x_values), :, 1] = (y_values[0], y_values[-1])
+    lines[len(x_values):, :, 0] = (x_values[0], x_values[-1])
+    lines[len(x_values):, :, 1] = y_values[:, None]
+    return lines.reshape(-1, 3)
+
+
+def decimate(vertices, faces, cell_size):
+    """
+    Coarsens a triangle mesh by vertex clustering: vertices in the same `cell_size` grid cell
+    are merged into their average and triangles that collapse are dropped.
+    Returns a dict with the new "vertices" and "faces".
+    """
+    vertices = np.asarray(vertices, dtype=np.float32)
+    cells = np.floor(vertices / cell_size).astype(np.int64)
+    _, inverse, counts = np.unique(cells, axis=0, return_inverse=True, return_counts=True)
+    inverse = inverse.ravel()
+
+    new_vertices = np.zeros((len(counts), 3), dtype=np.float64)
+    np.add.at(new_vertices, inverse, vertices)
+    new_vertices /= counts[:, None]
+
+    new_faces = inverse[np.asarray(faces, dtype=np.int64)]
+    is_valid = ((new_faces[:, 0] != new_faces[:, 1]) & (new_faces[:, 1] != new_faces[:, 2])
+                & (new_faces[:, 2] != new_faces[:, 0]))
+    new_faces = new_faces[is_valid]
+
+    # drop duplicated triangles, keeping the winding of the first one
+    _, first = np.unique(np.sort(new_faces, axis=1), axis=0, return_index=True)
+    new_faces = new_faces[np.sort(first)]
+
+    return {"vertices": new_vertices.astype(np.float32), "faces": new_faces.astype(np.uint32)}
+
+
+def rotation_z(degrees):
+    angle = np.radians(degrees)
+    c, s = np.cos(angle), np.sin(angle)
+    return np.array([[c, -s, 0], [s, c, 0], [0, 0, 1]], dtype=np.float32)
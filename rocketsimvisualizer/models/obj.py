@@ -1,39 +1,188 @@
-# Code from https://www.pygame.org/wiki/OBJFileLoader
+import hashlib
+import json
+import os
+import pathlib
+import re
+
+import numpy as np
+
+CACHE_MAGIC = b"RSVMESH\x00"
+CACHE_VERSION = 1
+CACHE_SUFFIX = ".rsvcache"
+CACHE_ALIGN = 64
+
+_face_refs_re = re.compile(rb"/\S*")
+
+
+def cache_path(filename, tag):
+    filename = pathlib.Path(filename)
+    return filename.with_name(f"{filename.name}.{tag}{CACHE_SUFFIX}")
+
+
+def _file_digest(filename):
+    with open(filename, "rb") as file:
+        return hashlib.sha1(file.read()).hexdigest()
+
+
+def _source_info(filename):
+    stat = os.stat(filename)
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+
+def read_cache(filename, tag, key=None):
+    """
+    Returns a dict of read-only memory-mapped arrays cached for `filename` under `tag`,
+    or None if there is no cache or it is stale (source changed, other version or key).
+    """
+    path = cache_path(filename, tag)
+    try:
+        with open(path, "rb") as file:
+            if file.read(len(CACHE_MAGIC)) != CACHE_MAGIC:
+                return None
+            version, header_len = np.frombuffer(file.read(8), dtype="<u4")
+            if version != CACHE_VERSION:
+                return None
+            header = json.loads(file.read(int(header_len)))
+        source = _source_info(filename)
+    except (OSError, ValueError):
+        return None
+
+    if header["key"] != key or header["source"]["size"] != source["size"]:
+        return None
+
+    # mtime alone is not trusted to invalidate (checkouts touch files), fall back to the content hash
+    if header["source"]["mtime_ns"] != source["mtime_ns"]:
+        if header["source"]["sha1"] != _file_digest(filename):
+            return None
+
+    arrays = {}
+    for name, info in header["arrays"].items():
+        shape = tuple(info["shape"])
+        if 0 in shape:
+            arrays[name] = np.empty(shape, dtype=info["dtype"])
+        else:
+            arrays[name] = np.memmap(path, dtype=info["dtype"], mode="r", offset=info["offset"], shape=shape)
+    return arrays
+
+
+def write_cache(filename, tag, arrays, key=None):
+    """
+    Writes `arrays` (dict of name -> ndarray) to the cache of `filename` under `tag`.
+    Failing to write (e.g. read-only install) is not an error, the cache is only an optimization.
+    """
+    path = cache_path(filename, tag)
+    arrays = {name: np.ascontiguousarray(arr) for name, arr in arrays.items()}
+
+    source = _source_info(filename)
+    source["sha1"] = _file_digest(filename)
+    header = {"source": source, "key": key, "arrays": {}}
+
+    # offsets depend on the header length, so lay out the data until the header size is stable
+    header_len = 0
+    while True:
+        offset = len(CACHE_MAGIC) + 8 + header_len
+        for name, arr in arrays.items():
+            offset = -(-offset // CACHE_ALIGN) * CACHE_ALIGN
+            header["arrays"][name] = {"dtype": arr.dtype.str, "shape": list(arr.shape), "offset": offset}
+            offset += arr.nbytes
+        header_bytes = json.dumps(header).encode()
+        if len(header_bytes) <= header_len:
+            header_bytes = header_bytes.ljust(header_len)
+            break
+        header_len = len(header_bytes) + 32
+
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, "wb") as file:
+            file.write(CACHE_MAGIC)
+            file.write(np.array([CACHE_VERSION, header_len], dtype="<u4").tobytes())
+            file.write(header_bytes)
+            for name, arr in arrays.items():
+                file.seek(header["arrays"][name]["offset"])
+                file.write(arr.tobytes())
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def cached(filename, tag, compute, key=None):
+    """
+    Returns the arrays cached for `filename` under `tag`, calling `compute()` and caching its result if needed.
+    """
+    arrays = read_cache(filename, tag, key)
+    if arrays is None:
+        arrays = compute()
+        write_cache(filename, tag, arrays, key)
+    return arrays
+
+
+def _parse_floats(lines, n_cols):
+    if not lines:
+        return np.empty((0, n_cols), dtype=np.float32)
+    values = np.array(b" ".join(lines).split(), dtype=np.float32)
+    # extra components (w, vertex colors) are allowed as long as every line has the same count
+    return values.reshape(len(lines), -1)[:, :n_cols].copy()
+
+
+def _parse_faces(lines, n_vertices):
+    if not lines:
+        return np.empty((0, 3), dtype=np.uint32)
+
+    # keep only the vertex index of each v/vt/vn reference
+    data = _face_refs_re.sub(b"", b"\n".join(lines))
+    indices = np.array(data.split(), dtype=np.int64)
+
+    if len(indices) == 3 * len(lines):
+        faces = indices.reshape(-1, 3)
+    else:
+        # polygons, fan triangulate
+        sizes = np.array([len(line.split()) for line in lines])
+        starts = np.cumsum(sizes) - sizes
+        n_tris = sizes - 2
+        tri_starts = np.repeat(starts, n_tris)
+        fan = np.arange(n_tris.sum()) - np.repeat(np.cumsum(n_tris) - n_tris, n_tris)
+        faces = np.stack([indices[tri_starts], indices[tri_starts + fan + 1], indices[tri_starts + fan + 2]], axis=1)
+
+    # obj indices are 1-based, negative ones are relative to the end of the vertex list
+    faces = np.where(faces < 0, faces + n_vertices, faces - 1)
+    return faces.astype(np.uint32)
+
+
+def parse_obj(filename):
+    with open(filename, "rb") as file:
+        lines = file.read().splitlines()
+
+    vertices = [line[2:] for line in lines if line.startswith(b"v ")]
+    normals = [line[3:] for line in lines if line.startswith(b"vn ")]
+    texcoords = [line[3:] for line in lines if line.startswith(b"vt ")]
+    faces = [line[2:] for line in lines if line.startswith(b"f ")]
+
+    return {
+        "vertices": _parse_floats(vertices, 3),
+        "normals": _parse_floats(normals, 3),
+        "texcoords": _parse_floats(texcoords, 2),
+        "faces": _parse_faces(faces, len(vertices)),
+    }
+
+
 class OBJ:
-    def __init__(self, filename):
-        """Loads a Wavefront OBJ file. """
-        self.vertices = []
-        self.normals = []
-        self.texcoords = []
-        self.faces = []
-
-        for line in open(filename, 'r'):
-            if line.startswith('#'):
-                continue
-            values = line.split()
-            if not values:
-                continue
-            if values[0] == 'v':
-                v = list(map(float, values[1:4]))
-                self.vertices.append(v)
-            elif values[0] == 'vn':
-                v = list(map(float, values[1:4]))
-                self.normals.append(v)
-            elif values[0] == 'vt':
-                self.texcoords.append(map(float, values[1:3]))
-            elif values[0] == 'f':
-                face = []
-                texcoords = []
-                norms = []
-                for v in values[1:]:
-                    w = v.split('/')
-                    face.append(int(w[0]) - 1)
-                    if len(w) >= 2 and len(w[1]) > 0:
-                        texcoords.append(int(w[1]))
-                    else:
-                        texcoords.append(0)
-                    if len(w) >= 3 and len(w[2]) > 0:
-                        norms.append(int(w[2]))
-                    else:
-                        norms.append(0)
-                self.faces.append(face)
+    def __init__(self, filename, use_cache=True):
+        """
+        Loads a Wavefront OBJ file into contiguous float32 vertices/normals/texcoords
+        and (N, 3) uint32 triangle faces.
+        The parsed arrays are cached next to the model and memory-mapped on later loads.
+        """
+        self.filename = pathlib.Path(filename)
+
+        if use_cache:
+            arrays = cached(self.filename, "mesh", lambda: parse_obj(self.filename))
+        else:
+            arrays = parse_obj(self.filename)
+
+        self.vertices = arrays["vertices"]
+        self.normals = arrays["normals"]
+        self.texcoords = arrays["texcoords"]
+        self.faces = arrays["faces"]
@@ -0,0 +1,77 @@
+import time
+
+PACING_MODES = ("fixed", "adaptive", "max_speed")
+
+# weight of the newest frame in the running estimate of the time spent outside of stepping
+OVERHEAD_SMOOTHING = 0.1
+
+
+class FramePacer:
+    """
+    Decides how far to step the arena every frame of a render loop that steps it itself.
+
+    - "fixed" steps `tick_skip` ticks per frame, the game runs slow when frames take too long.
+    - "adaptive" steps as many ticks as the wall time since the last frame, so the simulation keeps
+      real time and a slow frame is followed by a bigger step rather than the game slowing down.
+      Only when it falls behind by more than `max_lag` seconds are ticks dropped.
+    - "max_speed" steps `tick_skip` ticks at a time for as long as it can while still rendering
+      `max_fps` frames per second.
+
+    The ticks actually stepped are read back from the arena's tick count, nothing downstream
+    should assume a frame is `tick_skip` ticks.
+    """
+
+    def __init__(self, tick_rate, tick_skip=2, mode="fixed", max_fps=60, max_lag=0.25):
+        if mode not in PACING_MODES:
+            raise ValueError(f"Unknown pacing mode {mode!r}, expected one of {PACING_MODES}")
+        self.tick_time = 1 / tick_rate
+        self.tick_skip = tick_skip
+        self.mode = mode
+        self.frame_time = 1 / max_fps
+        self.max_lag = max_lag
+
+        self.owed_time = 0.0
+        self.dropped_ticks = 0
+        self.overhead = 0.0
+        self.frame_start = None
+        self.step_end = None
+
+    def timer_interval(self, refresh_rate=60):
+        """Milliseconds between the frames of the render loop's timer."""
+        if self.mode == "fixed":
+            return 16
+        if self.mode == "adaptive":
+            return round(1000 / refresh_rate)
+        # render as soon as the previous frame is done, the stepping fills the frame
+        return 0
+
+    def begin_frame(self, now=None):
+        """Returns how many ticks to step, and the time until which to keep stepping them (or None)."""
+        if now is None:
+            now = time.perf_counter()
+        last_frame_start, self.frame_start = self.frame_start, now
+
+        if self.mode == "fixed":
+            return self.tick_skip, None
+
+        if self.mode == "adaptive":
+            if last_frame_start is None:
+                return self.tick_skip, None
+            self.owed_time += now - last_frame_start
+            if self.owed_time > self.max_lag:
+                dropped = int((self.owed_time - self.max_lag) / self.tick_time)
+                self.dropped_ticks += dropped
+                self.owed_time -= dropped * self.tick_time
+            # the epsilon keeps float error from turning 2 ticks worth into 1.999...
+            n_ticks = int(self.owed_time / self.tick_time + 1e-6)
+            self.owed_time -= n_ticks * self.tick_time
+            return n_ticks, None
+
+        # max_speed, leave room for everything else the previous frame did (updating items, painting)
+        if last_frame_start is not None and self.step_end is not None:
+            overhead = now - self.step_end
+            self.overhead += OVERHEAD_SMOOTHING * (overhead - self.overhead)
+        return self.tick_skip, now + max(self.frame_time - self.overhead, 0.0)
+
+    def end_stepping(self, now=None):
+        self.step_end = time.perf_counter() if now is None else now
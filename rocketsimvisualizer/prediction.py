@@ -0,0 +1,114 @@
+import RocketSim
+
+import numpy as np
+import threading
+
+
+class BallPredictor(threading.Thread):
+    """
+    Predicts where the ball goes over the next `duration` seconds on a worker thread,
+    by stepping a ball-only arena ahead from the ball's current state.
+
+    The latest path is kept and only recomputed when the real ball strays from it by more than
+    `pos_tolerance`/`vel_tolerance` (a touch, a state reset, a seek in a replay) or when less than half
+    of it is left, so most frames cost a lookup into the cached path and nothing else.
+    """
+
+    def __init__(self, game_mode=RocketSim.SOCCAR, tick_rate=120, duration=4.0, ticks_per_sample=4,
+                 pos_tolerance=20.0, vel_tolerance=50.0):
+        super().__init__(daemon=True)
+        self.game_mode = game_mode
+        self.tick_rate = tick_rate
+        self.ticks_per_sample = ticks_per_sample
+        self.n_samples = int(duration * tick_rate / ticks_per_sample) + 1
+        self.pos_tolerance = pos_tolerance
+        self.vel_tolerance = vel_tolerance
+
+        # (start tick, positions, velocities), replaced as a whole and never modified,
+        # so readers can hold on to it without a lock
+        self.prediction = None
+        self.n_predictions = 0
+
+        self._condition = threading.Condition()
+        self._request = None
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+        with self._condition:
+            self._condition.notify()
+
+    def expected_state(self, tick_count):
+        """Predicted position and velocity at `tick_count`, or None if it's not covered by the path."""
+        if self.prediction is None:
+            return None
+        start_tick, positions, velocities = self.prediction
+        if tick_count < start_tick:
+            return None
+        t = (tick_count - start_tick) / self.ticks_per_sample
+        i = int(t)
+        if i + 1 >= len(positions):
+            return None
+        alpha = t - i
+        return (positions[i] + alpha * (positions[i + 1] - positions[i]),
+                velocities[i] + alpha * (velocities[i + 1] - velocities[i]))
+
+    def is_valid(self, tick_count, pos, vel):
+        expected = self.expected_state(tick_count)
+        if expected is None:
+            return False
+        # refresh before the path runs out
+        start_tick, positions, _ = self.prediction
+        remaining = len(positions) - (tick_count - start_tick) / self.ticks_per_sample
+        if remaining < self.n_samples / 2:
+            return False
+        expected_pos, expected_vel = expected
+        return (np.linalg.norm(pos - expected_pos) <= self.pos_tolerance
+                and np.linalg.norm(vel - expected_vel) <= self.vel_tolerance)
+
+    def submit(self, tick_count, ball_data):
+        """Checks the real ball against the cached path, asks the worker for a new one if it diverged."""
+        if self.is_valid(tick_count, ball_data["pos"], ball_data["vel"]):
+            return
+        with self._condition:
+            # only the newest state matters if the worker is still busy
+            self._request = (tick_count, ball_data["pos"].copy(), ball_data["vel"].copy(), ball_data["ang_vel"].copy())
+            self._condition.notify()
+
+    def path(self, tick_count):
+        """Predicted positions from `tick_count` on, in RocketSim coordinates."""
+        if self.prediction is None:
+            return np.zeros((0, 3), dtype=np.float32)
+        start_tick, positions, _ = self.prediction
+        i = int(max(tick_count - start_tick, 0) / self.ticks_per_sample)
+        return positions[i:]
+
+    def run(self):
+        # arenas load their collision meshes on creation, do it here rather than on the caller's thread
+        arena = RocketSim.Arena(self.game_mode, self.tick_rate)
+        while True:
+            with self._condition:
+                while self._request is None and not self._stop_event.is_set():
+                    self._condition.wait()
+                if self._stop_event.is_set():
+                    return
+                tick_count, pos, vel, ang_vel = self._request
+                self._request = None
+
+            ball_state = arena.ball.get_state()
+            ball_state.pos = RocketSim.Vec(*pos.tolist())
+            ball_state.vel = RocketSim.Vec(*vel.tolist())
+            ball_state.ang_vel = RocketSim.Vec(*ang_vel.tolist())
+            arena.ball.set_state(ball_state)
+
+            positions = np.empty((self.n_samples, 3), dtype=np.float32)
+            velocities = np.empty((self.n_samples, 3), dtype=np.float32)
+            positions[0], velocities[0] = pos, vel
+            for i in range(1, self.n_samples):
+                arena.step(self.ticks_per_sample)
+                ball_state = arena.ball.get_state()
+                positions[i] = ball_state.pos.as_tuple()
+                velocities[i] = ball_state.vel.as_tuple()
+
+            self.prediction = (tick_count, positions, velocities)
+            self.n_predictions += 1
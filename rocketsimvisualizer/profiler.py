@@ -0,0 +1,109 @@
+import json
+import pathlib
+import time
+
+import numpy as np
+
+PERCENTILES = (50, 95, 99)
+
+
+class FrameProfiler:
+    """
+    Records how long each stage of a frame takes, for the last `capacity` frames in a ring buffer.
+
+    A frame starts with `begin_frame` and every `lap(stage)` after it charges the time since
+    the previous call to `stage`, so instrumenting a pipeline costs one clock read per stage.
+    """
+
+    def __init__(self, stages, capacity=1024):
+        self.stages = list(stages)
+        self.stage_indices = {stage: i for i, stage in enumerate(self.stages)}
+        self.capacity = capacity
+
+        self.durations = np.zeros((capacity, len(self.stages)), dtype=np.float64)
+        self.frame_times = np.zeros(capacity, dtype=np.float64)
+        self.tick_counts = np.zeros(capacity, dtype=np.int64)
+        self.n_frames = 0
+        self.row = self.durations[0]
+        self.last_time = time.perf_counter()
+
+    def begin_frame(self, tick_count=0):
+        i = self.n_frames % self.capacity
+        self.n_frames += 1
+        self.row = self.durations[i]
+        self.row[:] = 0
+        self.last_time = self.frame_times[i] = time.perf_counter()
+        self.tick_counts[i] = tick_count
+
+    def lap(self, stage):
+        now = time.perf_counter()
+        self.row[self.stage_indices[stage]] += now - self.last_time
+        self.last_time = now
+
+    def add(self, stage, duration):
+        """Charges `duration` seconds measured outside of the laps to `stage` of the current frame."""
+        self.row[self.stage_indices[stage]] += duration
+
+    def frames(self):
+        """Indices of the recorded frames, oldest first."""
+        n = min(self.n_frames, self.capacity)
+        return np.arange(self.n_frames - n, self.n_frames) % self.capacity
+
+    def stats(self):
+        frames = self.frames()
+        stats = {"frames": len(frames), "fps": 0.0, "tps": 0.0, "frame_time_ms": {}, "stages_ms": {}}
+        if len(frames) < 2:
+            return stats
+
+        frame_times = self.frame_times[frames]
+        elapsed = frame_times[-1] - frame_times[0]
+        if elapsed > 0:
+            stats["fps"] = (len(frames) - 1) / elapsed
+            stats["tps"] = float(self.tick_counts[frames[-1]] - self.tick_counts[frames[0]]) / elapsed
+
+        intervals = np.diff(frame_times) * 1000
+        stats["frame_time_ms"] = dict(zip((f"p{p}" for p in PERCENTILES),
+                                          np.percentile(intervals, PERCENTILES).tolist()))
+
+        # the newest frame is still in progress
+        durations = self.durations[frames[:-1]] * 1000
+        means = durations.mean(axis=0)
+        percentiles = np.percentile(durations, PERCENTILES, axis=0)
+        for i, stage in enumerate(self.stages):
+            stats["stages_ms"][stage] = {"mean": float(means[i])}
+            stats["stages_ms"][stage].update(zip((f"p{p}" for p in PERCENTILES), percentiles[:, i].tolist()))
+        return stats
+
+    def summary(self):
+        """Multi-line text of the stats, for an on-screen overlay."""
+        stats = self.stats()
+        frame_time = stats["frame_time_ms"]
+        lines = [f"fps {stats['fps']:6.1f}   tps {stats['tps']:6.1f}"]
+        if frame_time:
+            lines.append("frame ms " + " ".join(f"{name} {value:5.2f}" for name, value in frame_time.items()))
+        for stage, stage_stats in stats["stages_ms"].items():
+            lines.append(f"{stage:<10} {stage_stats['mean']:6.3f} ms  p99 {stage_stats['p99']:6.3f}")
+        return "\n".join(lines)
+
+    def dump(self, filename):
+        """Writes every recorded frame to a .csv file, or the stats and every frame to a .json file."""
+        filename = pathlib.Path(filename)
+        frames = self.frames()
+        frame_times = self.frame_times[frames] - (self.frame_times[frames[0]] if len(frames) else 0)
+
+        if filename.suffix == ".json":
+            data = {
+                "stats": self.stats(),
+                "stages": self.stages,
+                "frames": {
+                    "time": frame_times.tolist(),
+                    "tick_count": self.tick_counts[frames].tolist(),
+                    "durations_ms": (self.durations[frames] * 1000).tolist(),
+                },
+            }
+            with open(filename, "w") as file:
+                json.dump(data, file, indent=2)
+        else:
+            columns = np.column_stack([frame_times, self.tick_counts[frames], self.durations[frames] * 1000])
+            header = ",".join(["time", "tick_count"] + [f"{stage}_ms" for stage in self.stages])
+            np.savetxt(filename, columns, delimiter=",", header=header, comments="", fmt="%.6f")
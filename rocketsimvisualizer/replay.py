@@ -0,0 +1,358 @@
+from rocketsimvisualizer.snapshot import ArenaSnapshot, ball_dtype, car_dtype, pad_dtype
+
+from collections import OrderedDict
+import json
+import pathlib
+import time
+import zlib
+
+import numpy as np
+
+REPLAY_MAGIC = b"RSVREPLY"
+REPLAY_INDEX_MAGIC = b"RSVRINDX"
+REPLAY_VERSION = 1
+CHUNK_MAGIC = b"CHNK"
+CHUNK_ALIGN = 64
+
+pad_state_dtype = np.dtype([
+    ("is_active", np.bool_),
+    ("cooldown", np.float32),
+])
+
+# written in front of every chunk, so a replay that was never closed can still be indexed
+chunk_header_dtype = np.dtype([
+    ("magic", "S4"),
+    ("is_compressed", "<u4"),
+    ("first_tick", "<u8"),
+    ("last_tick", "<u8"),
+    ("n_records", "<u4"),
+    ("nbytes", "<u4"),  # size of the records that follow, compressed or not
+])
+
+index_dtype = np.dtype(chunk_header_dtype.descr + [("offset", "<u8")])
+
+trailer_dtype = np.dtype([
+    ("index_offset", "<u8"),
+    ("n_chunks", "<u8"),
+    ("magic", "S8"),
+])
+
+
+def record_dtype(max_cars, n_pads):
+    return np.dtype([
+        ("tick_count", np.uint64),
+        ("n_cars", np.uint32),
+        ("ball", ball_dtype),
+        ("cars", car_dtype, (max_cars,)),
+        ("pads", pad_state_dtype, (n_pads,)),
+    ])
+
+
+def _descr_from_json(descr):
+    # json turns the tuples of a dtype descr into lists
+    if isinstance(descr, str):
+        return descr
+    return [tuple([field[0], _descr_from_json(field[1])] + [tuple(shape) for shape in field[2:]])
+            for field in descr]
+
+
+def _padding(pos):
+    # bytes to skip after `pos` so the records of the chunk starting there are aligned
+    return -(pos + chunk_header_dtype.itemsize) % CHUNK_ALIGN
+
+
+def copy_fields(dst, src):
+    """
+    Copies the fields `dst` and `src` have in common, by name.
+    Replays written by older versions only lack the fields that were added since.
+    """
+    if dst.dtype == src.dtype:
+        np.copyto(dst, src)
+        return
+    for name in dst.dtype.names:
+        if name not in src.dtype.names:
+            continue
+        if dst.dtype[name].names is not None:
+            copy_fields(dst[name], src[name])
+        else:
+            dst[name] = src[name]
+
+
+class ReplayRecorder:
+    """
+    Appends snapshots to a replay file as fixed size records, one per call to `record`: a visualizer
+    stepping the arena records every tick, one watching an arena stepped elsewhere or a feed every frame.
+
+    Records are written in chunks of `chunk_size`, zlib compressed if `compress`, and an index of
+    the chunks is written at the end so playback can seek to any tick without reading the whole file.
+    The number of cars recorded is fixed by the first snapshot unless `max_cars` is given,
+    cars past it aren't recorded.
+    """
+
+    def __init__(self, filename, tick_rate=120, max_cars=None, chunk_size=1024, compress=True,
+                 compression_level=1):
+        self.filename = pathlib.Path(filename)
+        self.tick_rate = tick_rate
+        self.max_cars = max_cars
+        self.chunk_size = chunk_size
+        self.compress = compress
+        self.compression_level = compression_level
+
+        # opened on the first record, once the number of cars and pads is known
+        self.file = None
+        self.records = None
+        self.n_buffered = 0
+        self.last_tick = None
+        self.index = []
+
+    def _open(self, snapshot):
+        max_cars = len(snapshot.cars) if self.max_cars is None else self.max_cars
+        self.record_dtype = record_dtype(max_cars, len(snapshot.pads))
+        self.records = np.zeros(self.chunk_size, dtype=self.record_dtype)
+
+        header = {
+            "tick_rate": self.tick_rate,
+            "record_dtype": np.lib.format.dtype_to_descr(self.record_dtype),
+            "pads": {
+                "pos": snapshot.pads["pos"].tolist(),
+                "is_big": snapshot.pads["is_big"].tolist(),
+            },
+        }
+        header_bytes = json.dumps(header).encode()
+
+        self.file = open(self.filename, "wb")
+        self.file.write(REPLAY_MAGIC)
+        self.file.write(np.array([REPLAY_VERSION, len(header_bytes)], dtype="<u4").tobytes())
+        self.file.write(header_bytes)
+
+    def record(self, snapshot):
+        # the same state can be handed over more than once, e.g. when rendering faster than the arena steps
+        if self.last_tick is not None and snapshot.tick_count <= self.last_tick:
+            return
+        if self.file is None:
+            self._open(snapshot)
+
+        record = self.records[self.n_buffered]
+        n_cars = min(len(snapshot.cars), len(record["cars"]))
+        record["tick_count"] = snapshot.tick_count
+        record["n_cars"] = n_cars
+        record["ball"] = snapshot.ball
+        record["cars"][:n_cars] = snapshot.cars[:n_cars]
+        record["pads"]["is_active"] = snapshot.pads["is_active"]
+        record["pads"]["cooldown"] = snapshot.pads["cooldown"]
+
+        self.last_tick = snapshot.tick_count
+        self.n_buffered += 1
+        if self.n_buffered == self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Writes the buffered records as a chunk."""
+        if not self.n_buffered:
+            return
+        records = self.records[:self.n_buffered]
+        data = records.tobytes()
+        if self.compress:
+            data = zlib.compress(data, self.compression_level)
+
+        chunk_header = np.zeros((), dtype=chunk_header_dtype)
+        chunk_header["magic"] = CHUNK_MAGIC
+        chunk_header["is_compressed"] = self.compress
+        chunk_header["first_tick"] = records["tick_count"][0]
+        chunk_header["last_tick"] = records["tick_count"][-1]
+        chunk_header["n_records"] = self.n_buffered
+        chunk_header["nbytes"] = len(data)
+
+        self.file.write(bytes(_padding(self.file.tell())))
+        self.file.write(chunk_header.tobytes())
+        self.index.append(chunk_header.item() + (self.file.tell(),))
+        self.file.write(data)
+        self.file.flush()
+        self.n_buffered = 0
+
+    def close(self):
+        if self.file is None:
+            return
+        self.flush()
+        self.file.write(bytes(-self.file.tell() % CHUNK_ALIGN))
+        trailer = np.array((self.file.tell(), len(self.index), REPLAY_INDEX_MAGIC), dtype=trailer_dtype)
+        self.file.write(np.array(self.index, dtype=index_dtype).tobytes())
+        self.file.write(trailer.tobytes())
+        self.file.close()
+        self.file = None
+
+
+class Replay:
+    """
+    Read access to a replay file. The file is memory mapped, chunks are decompressed
+    when a record in them is first read and the most recent `cache_size` are kept.
+    """
+
+    def __init__(self, filename, cache_size=8):
+        self.filename = pathlib.Path(filename)
+        self.data = np.memmap(self.filename, dtype=np.uint8, mode="r")
+
+        if self.data[:len(REPLAY_MAGIC)].tobytes() != REPLAY_MAGIC:
+            raise ValueError(f"{self.filename} is not a replay")
+        version, header_len = self.data[len(REPLAY_MAGIC):len(REPLAY_MAGIC) + 8].view("<u4")
+        if version != REPLAY_VERSION:
+            raise ValueError(f"{self.filename} is a version {version} replay, expected version {REPLAY_VERSION}")
+        chunks_offset = len(REPLAY_MAGIC) + 8 + int(header_len)
+        header = json.loads(self.data[len(REPLAY_MAGIC) + 8:chunks_offset].tobytes())
+
+        self.tick_rate = header["tick_rate"]
+        self.record_dtype = np.lib.format.descr_to_dtype(_descr_from_json(header["record_dtype"]))
+        self.pads = np.zeros(len(header["pads"]["pos"]), dtype=pad_dtype)
+        self.pads["pos"] = header["pads"]["pos"]
+        self.pads["is_big"] = header["pads"]["is_big"]
+
+        self.index = self._read_index(chunks_offset)
+        self.chunk_starts = np.cumsum(self.index["n_records"]) - self.index["n_records"]
+        self.n_records = int(self.index["n_records"].sum())
+        if not self.n_records:
+            raise ValueError(f"{self.filename} has no records")
+
+        self.cache_size = cache_size
+        self.chunk_cache = OrderedDict()
+
+    def _read_index(self, chunks_offset):
+        trailer_offset = len(self.data) - trailer_dtype.itemsize
+        if trailer_offset >= chunks_offset:
+            trailer = self.data[trailer_offset:].view(trailer_dtype)[0]
+            if trailer["magic"] == REPLAY_INDEX_MAGIC:
+                index_offset = int(trailer["index_offset"])
+                return self.data[index_offset:trailer_offset].view(index_dtype).copy()
+
+        # not closed, the recording was interrupted, index the chunks that were fully written
+        index = []
+        pos = chunks_offset
+        while True:
+            pos += _padding(pos)
+            offset = pos + chunk_header_dtype.itemsize
+            if offset > len(self.data):
+                break
+            chunk_header = self.data[pos:offset].view(chunk_header_dtype)[0]
+            if chunk_header["magic"] != CHUNK_MAGIC or offset + chunk_header["nbytes"] > len(self.data):
+                break
+            index.append(chunk_header.item() + (offset,))
+            pos = offset + int(chunk_header["nbytes"])
+        return np.array(index, dtype=index_dtype)
+
+    @property
+    def first_tick(self):
+        return int(self.index["first_tick"][0])
+
+    @property
+    def last_tick(self):
+        return int(self.index["last_tick"][-1])
+
+    def chunk(self, i):
+        records = self.chunk_cache.get(i)
+        if records is not None:
+            self.chunk_cache.move_to_end(i)
+            return records
+
+        chunk_info = self.index[i]
+        offset = int(chunk_info["offset"])
+        data = self.data[offset:offset + int(chunk_info["nbytes"])]
+        if chunk_info["is_compressed"]:
+            records = np.frombuffer(zlib.decompress(data), dtype=self.record_dtype)
+        else:
+            records = data.view(self.record_dtype)
+
+        self.chunk_cache[i] = records
+        if len(self.chunk_cache) > self.cache_size:
+            self.chunk_cache.popitem(last=False)
+        return records
+
+    def record(self, i):
+        chunk_index = np.searchsorted(self.chunk_starts, i, side="right") - 1
+        return self.chunk(chunk_index)[i - self.chunk_starts[chunk_index]]
+
+    def search(self, tick):
+        """Returns the index of the last record at or before `tick` (the first record if there's none)."""
+        chunk_index = max(np.searchsorted(self.index["first_tick"], tick, side="right") - 1, 0)
+        records = self.chunk(chunk_index)
+        i = max(np.searchsorted(records["tick_count"], tick, side="right") - 1, 0)
+        return int(self.chunk_starts[chunk_index] + i)
+
+    def read(self, i, snapshot):
+        """Fills `snapshot` with record `i`."""
+        record = self.record(i)
+        n_cars = int(record["n_cars"])
+        if len(snapshot.cars) != n_cars:
+            snapshot.cars = np.zeros(n_cars, dtype=car_dtype)
+        if len(snapshot.pads) != len(self.pads):
+            snapshot.pads = self.pads.copy()
+
+        snapshot.tick_count = int(record["tick_count"])
+        copy_fields(snapshot.ball, record["ball"])
+        copy_fields(snapshot.cars, record["cars"][:n_cars])
+        copy_fields(snapshot.pads, record["pads"])
+
+
+class ReplaySource:
+    """
+    Plays a replay back in real time, scaled by `speed`.
+    Can be passed to a Visualizer as its source, states in between records are interpolated.
+    """
+
+    def __init__(self, filename, speed=1.0):
+        self.replay = Replay(filename)
+        self.tick = float(self.replay.first_tick)
+        self.speed = speed
+        self.is_paused = False
+        self.last_time = None
+        # jumps made with seek, skip or step, anything following the playback compares it to know when to start over
+        self.n_seeks = 0
+
+        # the two records around the current tick
+        self.prev_index = None
+        self.prev_snapshot = ArenaSnapshot()
+        self.next_snapshot = ArenaSnapshot()
+
+    def seek(self, tick):
+        self._move_to(tick)
+        self.n_seeks += 1
+
+    def advance(self, ticks):
+        """Plays `ticks` further, as playback does, unlike a seek it's no jump."""
+        self._move_to(self.tick + ticks)
+
+    def _move_to(self, tick):
+        self.tick = float(min(max(tick, self.replay.first_tick), self.replay.last_tick))
+
+    def skip(self, seconds):
+        self.seek(self.tick + seconds * self.replay.tick_rate)
+
+    def step(self, n_records=1):
+        """Pauses and moves `n_records` records forward (or back if negative)."""
+        self.is_paused = True
+        i = min(max(self.replay.search(self.tick) + n_records, 0), self.replay.n_records - 1)
+        self.seek(self.replay.record(i)["tick_count"])
+
+    def toggle_pause(self):
+        self.is_paused = not self.is_paused
+
+    def read(self, snapshot):
+        now = time.perf_counter()
+        if self.last_time is not None and not self.is_paused:
+            self.advance((now - self.last_time) * self.speed * self.replay.tick_rate)
+        self.last_time = now
+
+        i = self.replay.search(self.tick)
+        if i != self.prev_index:
+            self.prev_index = i
+            self.replay.read(i, self.prev_snapshot)
+            if i + 1 < self.replay.n_records:
+                self.replay.read(i + 1, self.next_snapshot)
+            else:
+                self.next_snapshot.copy_from(self.prev_snapshot)
+
+        tick_span = self.next_snapshot.tick_count - self.prev_snapshot.tick_count
+        if tick_span > 0:
+            alpha = (self.tick - self.prev_snapshot.tick_count) / tick_span
+            snapshot.interpolate(self.prev_snapshot, self.next_snapshot, min(max(alpha, 0.0), 1.0))
+        else:
+            snapshot.copy_from(self.prev_snapshot)
+        return True
@@ -0,0 +1,104 @@
+from rocketsimvisualizer.snapshot import ArenaSnapshot
+
+import threading
+import time
+
+
+class SimulationThread(threading.Thread):
+    """
+    Steps an arena on its own thread at exactly `tick_rate` ticks per second of wall time
+    and publishes snapshots of it for a render loop to interpolate between.
+
+    Ticks that fall behind are caught up in a burst, but never more than `max_lag` seconds worth,
+    past that the simulation slows down instead of spiraling.
+    `pre_step(tick_time)` is called on this thread, holding `arena_lock`, before every tick
+    with the perf_counter time the tick is scheduled at,
+    and `on_tick(snapshot)` after every tick with a snapshot of the arena, so nothing is missed between publishes.
+    Anything else touching the arena while the thread runs should hold `arena_lock` too.
+    """
+
+    def __init__(self, arena, tick_rate, max_lag=0.25, pre_step=None, arena_lock=None, on_tick=None):
+        super().__init__(daemon=True)
+        self.arena = arena
+        self.tick_time = 1 / tick_rate
+        self.max_lag = max_lag
+        self.pre_step = pre_step
+        self.on_tick = on_tick
+        self.arena_lock = threading.RLock() if arena_lock is None else arena_lock
+
+        # latest and previous published snapshots, plus the one being written
+        self._lock = threading.Lock()
+        self._prev_snapshot = ArenaSnapshot()
+        self._snapshot = ArenaSnapshot()
+        self._back_snapshot = ArenaSnapshot()
+        # only used on this thread, for on_tick
+        self._tick_snapshot = ArenaSnapshot()
+        self._prev_time = self._time = time.perf_counter()
+
+        self._stop_event = threading.Event()
+        self.dropped_ticks = 0
+
+        with self.arena_lock:
+            self._snapshot.update(self.arena)
+        self._prev_snapshot.copy_from(self._snapshot)
+        self._tick_snapshot.copy_from(self._snapshot)
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _publish(self, snapshot_time):
+        # continue from the latest snapshot, the ball orientation may be integrated from it
+        self._back_snapshot.copy_from(self._snapshot)
+        with self.arena_lock:
+            self._back_snapshot.update(self.arena)
+        with self._lock:
+            self._prev_snapshot, self._snapshot, self._back_snapshot = (
+                self._snapshot, self._back_snapshot, self._prev_snapshot)
+            self._prev_time, self._time = self._time, snapshot_time
+
+    def run(self):
+        next_tick_time = time.perf_counter()
+        while not self._stop_event.is_set():
+            now = time.perf_counter()
+
+            # cap the backlog, dropping the ticks we can't catch up with
+            lag = now - next_tick_time
+            if lag > self.max_lag:
+                dropped = int((lag - self.max_lag) / self.tick_time)
+                self.dropped_ticks += dropped
+                next_tick_time += dropped * self.tick_time
+
+            stepped = False
+            while next_tick_time <= now:
+                with self.arena_lock:
+                    if self.pre_step is not None:
+                        self.pre_step(next_tick_time)
+                    self.arena.step(1)
+                    if self.on_tick is not None:
+                        self._tick_snapshot.update(self.arena)
+                if self.on_tick is not None:
+                    self.on_tick(self._tick_snapshot)
+                next_tick_time += self.tick_time
+                stepped = True
+
+            if stepped:
+                # the snapshot shows the arena as of the last tick's scheduled time
+                self._publish(next_tick_time - self.tick_time)
+
+            time.sleep(max(0.0, next_tick_time - time.perf_counter()))
+
+    def read_interpolated(self, out, render_time=None):
+        """
+        Fills `out` with the arena state at `render_time` (defaults to now), interpolated
+        between the two latest snapshots. Rendering is delayed by one publish interval so
+        there's always a newer snapshot to interpolate towards.
+        """
+        if render_time is None:
+            render_time = time.perf_counter()
+        with self._lock:
+            interval = self._time - self._prev_time
+            if interval <= 0:
+                out.copy_from(self._snapshot)
+                return
+            alpha = (render_time - interval - self._prev_time) / interval
+            out.interpolate(self._prev_snapshot, self._snapshot, min(max(alpha, 0.0), 1.0))
@@ -0,0 +1,244 @@
+import numpy as np
+import math
+
+ball_dtype = np.dtype([
+    ("pos", np.float32, 3),
+    ("vel", np.float32, 3),
+    ("ang_vel", np.float32, 3),
+    ("rot", np.float32, (3, 3)),  # rows are forward, right, up
+    ("radius", np.float32),
+])
+
+controls_dtype = np.dtype([
+    ("throttle", np.float32),
+    ("steer", np.float32),
+    ("pitch", np.float32),
+    ("yaw", np.float32),
+    ("roll", np.float32),
+    ("jump", np.bool_),
+    ("boost", np.bool_),
+    ("handbrake", np.bool_),
+])
+
+car_dtype = np.dtype([
+    ("id", np.uint32),
+    ("team", np.uint8),
+    ("pos", np.float32, 3),
+    ("vel", np.float32, 3),
+    ("ang_vel", np.float32, 3),
+    ("angles", np.float32, 3),  # yaw, pitch, roll
+    ("rot", np.float32, (3, 3)),  # rows are forward, right, up
+    ("boost", np.float32),
+    ("is_supersonic", np.bool_),
+    ("is_on_ground", np.bool_),
+    ("hitbox_size", np.float32, 3),
+    ("hitbox_offset", np.float32, 3),
+    ("controls", controls_dtype),  # last controls the car was stepped with
+])
+
+pad_dtype = np.dtype([
+    ("pos", np.float32, 3),
+    ("is_big", np.bool_),
+    ("is_active", np.bool_),
+    ("cooldown", np.float32),
+])
+
+# anything moving further than this between two snapshots was teleported (a state reset, a respawn)
+MAX_BALL_SPEED = 6000
+MAX_CAR_SPEED = 2300
+TELEPORT_MARGIN = 200
+
+
+def angles_to_rot(angles, out=None):
+    """
+    Converts (N, 3) yaw, pitch, roll angles into (N, 3, 3) rotation matrices
+    whose rows are the forward, right and up vectors, same as RocketSim's Angle::ToRotMat.
+    """
+    yaw, pitch, roll = angles[..., 0], angles[..., 1], angles[..., 2]
+    cy, sy = np.cos(yaw), np.sin(yaw)
+    cp, sp = np.cos(pitch), np.sin(pitch)
+    cr, sr = np.cos(roll), np.sin(roll)
+
+    if out is None:
+        out = np.empty(angles.shape[:-1] + (3, 3), dtype=np.float32)
+
+    out[..., 0, 0] = cp * cy
+    out[..., 0, 1] = cp * sy
+    out[..., 0, 2] = sp
+
+    out[..., 1, 0] = cy * sp * sr - cr * sy
+    out[..., 1, 1] = sy * sp * sr + cr * cy
+    out[..., 1, 2] = -cp * sr
+
+    out[..., 2, 0] = -cr * cy * sp - sr * sy
+    out[..., 2, 1] = -cr * sy * sp + sr * cy
+    out[..., 2, 2] = cp * cr
+    return out
+
+
+def integrate_rot(rot, ang_vel, dt):
+    """
+    Rotates `rot` (rows are forward, right, up) in place by the angular velocity `ang_vel` over `dt` seconds.
+    """
+    # plain floats, numpy call overhead dominates for a single 3x3 matrix
+    wx, wy, wz = (float(w) * dt for w in ang_vel)
+    angle = math.sqrt(wx * wx + wy * wy + wz * wz)
+    if angle < 1e-9:
+        return
+    kx, ky, kz = wx / angle, wy / angle, wz / angle
+    sin, cos = math.sin(angle), math.cos(angle)
+
+    new_rows = []
+    for x, y, z in rot.tolist():
+        # rodrigues' rotation of each basis vector
+        dot = (kx * x + ky * y + kz * z) * (1 - cos)
+        cx, cy, cz = ky * z - kz * y, kz * x - kx * z, kx * y - ky * x
+        new_rows.append([x * cos + cx * sin + kx * dot,
+                         y * cos + cy * sin + ky * dot,
+                         z * cos + cz * sin + kz * dot])
+
+    # re-orthonormalize so float error doesn't accumulate
+    (fx, fy, fz), _, (ux, uy, uz) = new_rows
+    norm = math.sqrt(fx * fx + fy * fy + fz * fz)
+    fx, fy, fz = fx / norm, fy / norm, fz / norm
+    rx, ry, rz = uy * fz - uz * fy, uz * fx - ux * fz, ux * fy - uy * fx
+    norm = math.sqrt(rx * rx + ry * ry + rz * rz)
+    rx, ry, rz = rx / norm, ry / norm, rz / norm
+    rot[:] = (fx, fy, fz), (rx, ry, rz), (fy * rz - fz * ry, fz * rx - fx * rz, fx * ry - fy * rx)
+
+
+def _cross(a, b):
+    # np.cross's axis handling costs more than the math itself for a handful of vectors
+    ax, ay, az = a[..., 0], a[..., 1], a[..., 2]
+    bx, by, bz = b[..., 0], b[..., 1], b[..., 2]
+    return np.stack([ay * bz - az * by, az * bx - ax * bz, ax * by - ay * bx], axis=-1)
+
+
+def _normalize(v):
+    return v / np.sqrt((v * v).sum(axis=-1, keepdims=True))
+
+
+def orthonormalize(rot):
+    """
+    Re-orthonormalizes (..., 3, 3) rotation matrices (rows are forward, right, up) in place,
+    keeping the forward direction and the plane of forward and up.
+    """
+    forward = _normalize(rot[..., 0, :])
+    right = _normalize(_cross(rot[..., 2, :], forward))
+    rot[..., 0, :] = forward
+    rot[..., 1, :] = right
+    rot[..., 2, :] = _cross(forward, right)
+    return rot
+
+
+class ArenaSnapshot:
+    """
+    State of the ball, cars and boost pads of an arena at one tick, stored in structured arrays.
+    The arrays are allocated once and refilled in place by `update`, they're only
+    reallocated when the number of cars or pads changes.
+    """
+
+    def __init__(self, n_cars=0, n_pads=0):
+        self.tick_count = 0
+        self.ball = np.zeros((), dtype=ball_dtype)
+        self.ball["rot"] = np.eye(3)
+        self.cars = np.zeros(n_cars, dtype=car_dtype)
+        self.pads = np.zeros(n_pads, dtype=pad_dtype)
+
+    def _resize_cars(self, cars):
+        self.cars = np.zeros(len(cars), dtype=car_dtype)
+        for i, car in enumerate(cars):
+            car_config = car.get_config()
+            self.cars[i]["id"] = car.id
+            self.cars[i]["team"] = car.team
+            self.cars[i]["hitbox_size"] = car_config.hitbox_size.as_tuple()
+            self.cars[i]["hitbox_offset"] = car_config.hitbox_pos_offset.as_tuple()
+
+    def _resize_pads(self, pads):
+        self.pads = np.zeros(len(pads), dtype=pad_dtype)
+        for i, pad in enumerate(pads):
+            self.pads[i]["pos"] = pad.get_pos().as_tuple()
+            self.pads[i]["is_big"] = pad.is_big
+
+    def copy_from(self, other):
+        self.tick_count = other.tick_count
+        np.copyto(self.ball, other.ball)
+        if self.cars.shape != other.cars.shape:
+            self.cars = other.cars.copy()
+        else:
+            np.copyto(self.cars, other.cars)
+        if self.pads.shape != other.pads.shape:
+            self.pads = other.pads.copy()
+        else:
+            np.copyto(self.pads, other.pads)
+
+    def interpolate(self, prev, current, alpha):
+        """
+        Fills this snapshot with the state `alpha` of the way from `prev` to `current`.
+        Positions, velocities and rotations are blended, everything else (the tick count, boost,
+        flags, pads) is that of `prev` until `current` is reached at alpha 1.
+        Cars are only blended if both snapshots have the same cars.
+        """
+        if alpha >= 1:
+            self.copy_from(current)
+            return
+
+        self.copy_from(prev)
+        blended = [(self.ball, current.ball)]
+        # the same ids in the same order, a car that left and one that joined aren't blended into each other
+        if np.array_equal(self.cars["id"], current.cars["id"]):
+            blended.append((self.cars, current.cars))
+        for data, next_data in blended:
+            for field in ("pos", "vel", "ang_vel", "rot"):
+                data[field] += alpha * (next_data[field] - data[field])
+            orthonormalize(data["rot"])
+
+    def update(self, arena):
+        elapsed_ticks = max(arena.tick_count - self.tick_count, 0)
+        self.tick_count = arena.tick_count
+
+        if not self.ball["radius"]:
+            self.ball["radius"] = arena.ball.get_radius()
+
+        ball_state = arena.ball.get_state()
+        self.ball["pos"] = ball_state.pos.as_tuple()
+        self.ball["vel"] = ball_state.vel.as_tuple()
+        self.ball["ang_vel"] = ball_state.ang_vel.as_tuple()
+
+        ball_rot_mat = getattr(ball_state, "rot_mat", None)
+        if ball_rot_mat is not None:
+            self.ball["rot"] = (ball_rot_mat.forward.as_tuple(), ball_rot_mat.right.as_tuple(),
+                                ball_rot_mat.up.as_tuple())
+        else:
+            # bindings without the ball orientation, integrate its spin over the ticks since the last update
+            integrate_rot(self.ball["rot"], self.ball["ang_vel"], elapsed_ticks * arena.tick_time)
+
+        cars = arena.get_cars()
+        if len(cars) != len(self.cars) or any(car.id != car_id for car, car_id in zip(cars, self.cars["id"])):
+            self._resize_cars(cars)
+
+        # fill whole columns at once, per-element writes into structured arrays are slow
+        # (an empty list can't be broadcast into the vector columns, so skip them without cars)
+        if cars:
+            car_states = [car.get_state() for car in cars]
+            cars_data = self.cars
+            cars_data["pos"] = [car_state.pos.as_tuple() for car_state in car_states]
+            cars_data["vel"] = [car_state.vel.as_tuple() for car_state in car_states]
+            cars_data["ang_vel"] = [car_state.ang_vel.as_tuple() for car_state in car_states]
+            cars_data["angles"] = [(angles.yaw, angles.pitch, angles.roll)
+                                   for angles in (car_state.angles for car_state in car_states)]
+            cars_data["boost"] = [car_state.boost for car_state in car_states]
+            cars_data["is_supersonic"] = [car_state.is_supersonic for car_state in car_states]
+            cars_data["is_on_ground"] = [car_state.is_on_ground for car_state in car_states]
+            cars_data["controls"] = [(c.throttle, c.steer, c.pitch, c.yaw, c.roll, c.jump, c.boost, c.handbrake)
+                                     for c in (car_state.last_controls for car_state in car_states)]
+
+            angles_to_rot(cars_data["angles"], out=cars_data["rot"])
+
+        pads = arena.get_boost_pads()
+        if len(pads) != len(self.pads):
+            self._resize_pads(pads)
+
+        pad_states = [pad.get_state() for pad in pads]
+        self.pads["is_active"] = [pad_state.is_active for pad_state in pad_states]
+        self.pads["cooldown"] = [pad_state.cooldown for pad_state in pad_states]
@@ -0,0 +1,237 @@
+from rocketsimvisualizer.snapshot import ArenaSnapshot, ball_dtype, car_dtype, pad_dtype
+
+from multiprocessing import shared_memory
+import numpy as np
+import os
+
+FEED_MAGIC = b"RSVFEED"
+FEED_VERSION = 2
+
+header_dtype = np.dtype([
+    ("magic", "S8"),
+    ("version", np.uint32),
+    ("n_slots", np.uint32),
+    ("max_cars", np.uint32),
+    ("n_pads", np.uint32),
+    ("write_count", np.uint64),
+    ("is_closed", np.bool_),
+    ("pid", np.uint32),  # of the publisher, to tell a segment left over from a crash apart from a live feed
+], align=True)
+
+
+def slot_dtype(max_cars, n_pads):
+    return np.dtype([
+        ("seq", np.uint64),  # odd while the slot is being written
+        ("tick_count", np.uint64),
+        ("n_cars", np.uint32),
+        ("ball", ball_dtype),
+        ("cars", car_dtype, (max_cars,)),
+        ("pads", pad_dtype, (n_pads,)),
+    ], align=True)
+
+
+def _slots_offset():
+    # keep the slots 64 byte aligned, away from the header's cache line
+    return -(-header_dtype.itemsize // 64) * 64
+
+
+def _attach(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # before python 3.13 attaching registers the segment with the resource tracker,
+        # which would unlink it from under the publisher when this process exits
+        shm = shared_memory.SharedMemory(name=name)
+        if os.name == "posix":
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+def _is_running(pid):
+    if os.name != "posix":
+        # os.kill can't probe a process without terminating it, assume it's alive
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _publisher_pid(shm):
+    """The pid of the live publisher writing to `shm`, None if it isn't a feed, was closed or its publisher died."""
+    if shm.size < header_dtype.itemsize:
+        return None
+    header = np.ndarray((), dtype=header_dtype, buffer=shm.buf)
+    is_feed = header["magic"] == FEED_MAGIC and header["version"] == FEED_VERSION and not header["is_closed"]
+    pid = int(header["pid"])
+    del header
+    return pid if is_feed and _is_running(pid) else None
+
+
+class StatePublisher:
+    """
+    Writes arena state into a shared memory ring buffer that a visualizer in another process can read.
+
+    Each write is one copy of a snapshot into the next slot of the ring, guarded by a per-slot
+    sequence counter (a seqlock) so readers never block the writer and can detect torn reads.
+
+    The feed holds up to `max_cars` cars, by default 8 or as many as the arena has if that's more.
+    A feed of the same `name` is only replaced if its publisher closed it or died, otherwise this raises
+    FileExistsError.
+    """
+
+    def __init__(self, arena, name="rocketsimvisualizer", max_cars=None, n_slots=4):
+        self.snapshot = ArenaSnapshot()
+        self.snapshot.update(arena)
+
+        if max_cars is None:
+            max_cars = max(8, len(self.snapshot.cars))
+        n_pads = len(self.snapshot.pads)
+        self.slot_dtype = slot_dtype(max_cars, n_pads)
+
+        size = _slots_offset() + n_slots * self.slot_dtype.itemsize
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            existing = _attach(name)
+            pid = _publisher_pid(existing)
+            existing.close()
+            if pid is not None:
+                raise FileExistsError(f"The state feed {name!r} is in use by the publisher in process {pid}, "
+                                      f"pass another name") from None
+            # left over from a publisher that didn't close, take it over
+            existing.unlink()
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.name = self.shm.name
+
+        self.header = np.ndarray((), dtype=header_dtype, buffer=self.shm.buf)
+        self.slots = np.ndarray(n_slots, dtype=self.slot_dtype, buffer=self.shm.buf, offset=_slots_offset())
+        self.slots["seq"] = 0
+        self.header["magic"] = FEED_MAGIC
+        self.header["version"] = FEED_VERSION
+        self.header["n_slots"] = n_slots
+        self.header["max_cars"] = max_cars
+        self.header["n_pads"] = n_pads
+        self.header["write_count"] = 0
+        self.header["is_closed"] = False
+        self.header["pid"] = os.getpid()
+
+    def publish(self, arena):
+        """Reads the arena state and writes it to the feed, call this once per step."""
+        self.snapshot.update(arena)
+        self.write(self.snapshot)
+
+    def write(self, snapshot):
+        write_count = int(self.header["write_count"])
+        slot = self.slots[write_count % len(self.slots)]
+        n_cars = len(snapshot.cars)
+        if n_cars > len(slot["cars"]):
+            raise ValueError(f"The snapshot has {n_cars} cars but the feed holds at most {len(slot['cars'])}, "
+                             f"pass a larger max_cars to StatePublisher")
+
+        seq = int(slot["seq"])
+        slot["seq"] = seq + 1
+        slot["tick_count"] = snapshot.tick_count
+        slot["n_cars"] = n_cars
+        slot["ball"] = snapshot.ball
+        slot["cars"][:n_cars] = snapshot.cars[:n_cars]
+        slot["pads"] = snapshot.pads
+        slot["seq"] = seq + 2
+
+        self.header["write_count"] = write_count + 1
+
+    def close(self):
+        self.header["is_closed"] = True
+        del self.header, self.slots
+        self.shm.close()
+        self.shm.unlink()
+
+
+class SharedMemorySource:
+    """
+    Reads the latest state written by a StatePublisher.
+
+    The source attaches to the feed lazily and detaches when the publisher closes it,
+    so a visualizer can be started before, after or in between training runs.
+    """
+
+    def __init__(self, name="rocketsimvisualizer", max_retries=8):
+        self.name = name
+        self.max_retries = max_retries
+        self.shm = None
+        self.last_write_count = 0
+
+    @property
+    def is_attached(self):
+        return self.shm is not None
+
+    def attach(self):
+        if self.shm is not None:
+            return True
+        try:
+            shm = _attach(self.name)
+        except FileNotFoundError:
+            return False
+
+        header = np.ndarray((), dtype=header_dtype, buffer=shm.buf)
+        if header["magic"] != FEED_MAGIC or header["version"] != FEED_VERSION or header["is_closed"]:
+            del header
+            shm.close()
+            return False
+
+        self.shm = shm
+        self.header = header
+        n_slots, max_cars, n_pads = int(header["n_slots"]), int(header["max_cars"]), int(header["n_pads"])
+        self.slots = np.ndarray(n_slots, dtype=slot_dtype(max_cars, n_pads), buffer=shm.buf, offset=_slots_offset())
+        self.last_write_count = 0
+        return True
+
+    def detach(self):
+        if self.shm is None:
+            return
+        del self.header, self.slots
+        self.shm.close()
+        self.shm = None
+
+    def read(self, snapshot):
+        """
+        Copies the latest published state into `snapshot`.
+        Returns True if it was updated, False if there's no new state or no publisher.
+        """
+        if not self.attach():
+            return False
+        if self.header["is_closed"]:
+            self.detach()
+            return False
+
+        write_count = int(self.header["write_count"])
+        if write_count == self.last_write_count:
+            return False
+
+        for _ in range(self.max_retries):
+            slot = self.slots[(write_count - 1) % len(self.slots)]
+            seq = int(slot["seq"])
+            if seq % 2 == 0:
+                n_cars = int(slot["n_cars"])
+                if len(snapshot.cars) != n_cars:
+                    snapshot.cars = np.zeros(n_cars, dtype=car_dtype)
+                if len(snapshot.pads) != len(slot["pads"]):
+                    snapshot.pads = np.zeros(len(slot["pads"]), dtype=pad_dtype)
+
+                snapshot.tick_count = int(slot["tick_count"])
+                np.copyto(snapshot.ball, slot["ball"])
+                np.copyto(snapshot.cars, slot["cars"][:n_cars])
+                np.copyto(snapshot.pads, slot["pads"])
+
+                # the writer didn't touch the slot while we copied it
+                if int(slot["seq"]) == seq:
+                    self.last_write_count = write_count
+                    return True
+
+            # slot being overwritten, retry with the newest one
+            write_count = int(self.header["write_count"])
+        return False
@@ -0,0 +1,102 @@
+from rocketsimvisualizer.events import EVENT_KINDS
+
+from pyqtgraph.Qt import QtCore, QtGui, QtWidgets
+
+import numpy as np
+
+# marker color and height (as a fraction of the bar) of every event kind
+EVENT_STYLES = {
+    "goal": ((255, 220, 60), 1.0),
+    "touch": ((255, 255, 255), 0.6),
+    "demo": ((255, 60, 60), 0.8),
+    "pickup": ((80, 200, 80), 0.3),
+    "supersonic_start": ((120, 180, 255), 0.4),
+    "supersonic_end": ((60, 90, 160), 0.4),
+}
+
+TIMELINE_HEIGHT = 28
+TIMELINE_MARGIN = 10
+
+# pixels from a marker within which a click snaps to its event
+SNAP_DISTANCE = 4
+
+
+class EventTimeline(QtWidgets.QWidget):
+    """
+    A bar along the bottom of a view with a marker for every event of an EventIndex and a cursor
+    at the current tick. Clicking it emits the tick under the mouse, or the tick of the event
+    marker next to it.
+
+    Only the events in the shown range are read, and every kind draws one line per pixel column
+    however many events fall into it.
+    """
+    sigSeek = QtCore.pyqtSignal(int)
+
+    def __init__(self, parent, index=None):
+        super().__init__(parent)
+        self.index = index
+        self.first_tick = 0
+        self.last_tick = 1
+        self.cursor_tick = 0
+        parent.installEventFilter(self)
+        self.fit()
+
+    def fit(self):
+        parent = self.parentWidget()
+        self.setGeometry(TIMELINE_MARGIN, parent.height() - TIMELINE_HEIGHT - TIMELINE_MARGIN,
+                         parent.width() - 2 * TIMELINE_MARGIN, TIMELINE_HEIGHT)
+
+    def eventFilter(self, obj, event):
+        if obj is self.parentWidget() and event.type() == QtCore.QEvent.Type.Resize:
+            self.fit()
+        return False
+
+    def setData(self, index=None, first_tick=None, last_tick=None, cursor_tick=None):
+        if index is not None:
+            self.index = index
+        if first_tick is not None:
+            self.first_tick = first_tick
+        if last_tick is not None:
+            self.last_tick = max(last_tick, self.first_tick + 1)
+        if cursor_tick is not None:
+            self.cursor_tick = cursor_tick
+        self.update()
+
+    def tick_to_x(self, ticks):
+        return (np.asarray(ticks) - self.first_tick) * (self.width() - 1) / (self.last_tick - self.first_tick)
+
+    def x_to_tick(self, x):
+        return round(self.first_tick + x / max(self.width() - 1, 1) * (self.last_tick - self.first_tick))
+
+    def paintEvent(self, event):
+        painter = QtGui.QPainter(self)
+        painter.fillRect(self.rect(), QtGui.QColor(0, 0, 0, 150))
+        height = self.height()
+
+        if self.index is not None:
+            events = self.index.between(self.first_tick, self.last_tick + 1)
+            columns = self.tick_to_x(events["tick"]).astype(np.int64)
+            for i, kind in enumerate(EVENT_KINDS):
+                color, marker_height = EVENT_STYLES[kind]
+                xs = np.unique(columns[events["kind"] == i])
+                if not len(xs):
+                    continue
+                painter.setPen(QtGui.QPen(QtGui.QColor(*color)))
+                top = round(height * (1 - marker_height))
+                painter.drawLines([QtCore.QLine(x, top, x, height) for x in xs.tolist()])
+
+        painter.setPen(QtGui.QPen(QtGui.QColor(255, 255, 255), 2))
+        x = int(self.tick_to_x(self.cursor_tick))
+        painter.drawLine(x, 0, x, height)
+        painter.end()
+
+    def mousePressEvent(self, event):
+        x = event.pos().x()
+        tick = self.x_to_tick(x)
+        if self.index is not None and len(self.index):
+            # snap to the closest event if its marker is right there
+            span = SNAP_DISTANCE * (self.last_tick - self.first_tick) / max(self.width() - 1, 1)
+            nearby = self.index.between(tick - span, tick + span + 1)
+            if len(nearby):
+                tick = int(nearby["tick"][np.argmin(np.abs(nearby["tick"] - tick))])
+        self.sigSeek.emit(tick)
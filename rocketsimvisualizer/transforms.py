@@ -0,0 +1,54 @@
+from pyqtgraph.Qt import QtGui
+
+import numpy as np
+
+# the visualizer mirrors RocketSim's x axis, positions map as (-x, y, z)
+# and rotations as M @ R @ M with M = diag(-1, 1, 1)
+MIRROR = np.array([-1, 1, 1], dtype=np.float32)
+ROT_MIRROR = np.outer(MIRROR, MIRROR)
+
+
+def to_display(pos):
+    return pos * MIRROR
+
+
+def model_matrices(pos, rot, out=None):
+    """
+    Builds (N, 4, 4) display model matrices from (N, 3) RocketSim positions
+    and (N, 3, 3) rotation matrices whose rows are forward, right, up.
+    """
+    if out is None:
+        out = np.zeros(pos.shape[:-1] + (4, 4), dtype=np.float32)
+    out[..., :3, :3] = np.swapaxes(rot, -1, -2) * ROT_MIRROR
+    out[..., :3, 3] = pos * MIRROR
+    out[..., 3, :3] = 0
+    out[..., 3, 3] = 1
+    return out
+
+
+def to_qmatrix(matrix):
+    return QtGui.QMatrix4x4(*matrix.ravel().tolist())
+
+
+def screen_to_ground(view, x, y, height=0):
+    """
+    Returns the display space point at `height` under pixel (x, y) of a GLViewWidget,
+    or None if the ray through it doesn't hit that plane in front of the camera.
+    """
+    width, view_height = view.width(), view.height()
+    viewport = (0, 0, width, view_height)
+    view_proj = view.projectionMatrix(viewport, viewport) * view.viewMatrix()
+    inverse = np.linalg.inv(np.array(view_proj.copyDataTo(), dtype=np.float64).reshape(4, 4))
+
+    ndc_x, ndc_y = 2 * x / width - 1, 1 - 2 * y / view_height
+    near = inverse @ (ndc_x, ndc_y, -1, 1)
+    far = inverse @ (ndc_x, ndc_y, 1, 1)
+    near, far = near[:3] / near[3], far[:3] / far[3]
+
+    direction = far - near
+    if abs(direction[2]) < 1e-9:
+        return None
+    t = (height - near[2]) / direction[2]
+    if t < 0:
+        return None
+    return near + t * direction
@@ -0,0 +1,185 @@
+from rocketsimvisualizer.transforms import MIRROR
+
+from pyqtgraph.Qt import QtCore
+import pyqtgraph as pg
+import pyqtgraph.opengl as gl
+
+import numpy as np
+import math
+import time
+
+VIEWPORT_KINDS = ("chase", "overhead", "ball")
+CHASE, OVERHEAD, BALL = range(len(VIEWPORT_KINDS))
+
+# the opts of the main view a viewport swaps its own into while it paints
+CAMERA_OPTS = ("center", "distance", "elevation", "azimuth", "fov")
+
+# below this speed a chase or ball cam keeps its heading, the direction of a near 0 velocity is noise
+MIN_HEADING_SPEED = 50
+
+# the ball cam orbits further out than the chase cam, looking a little down
+BALL_CAM_DISTANCE = 1200
+BALL_CAM_ELEVATION = 15
+
+# half the extent of the field the overhead view fits, goals included, with a margin
+OVERHEAD_HALF_EXTENT = np.array([4096 + 300, 6000 + 300], dtype=np.float64)
+
+
+class Viewport:
+    """
+    One extra view of the scene: which camera, which car it follows (an index into the snapshot's
+    cars, chase cams only), where it sits in the main window as (x, y, width, height) fractions
+    and how many frames per second it repaints at.
+    """
+
+    def __init__(self, kind, car=0, rect=(0.74, 0.02, 0.24, 0.24), fps=30):
+        if kind not in VIEWPORT_KINDS:
+            raise ValueError(f"Unknown viewport kind {kind!r}, expected one of {VIEWPORT_KINDS}")
+        self.kind = kind
+        self.car = car
+        self.rect = rect
+        self.fps = fps
+
+
+# shown by the viewports key when none were configured
+DEFAULT_VIEWPORTS = (
+    Viewport("overhead", rect=(0.74, 0.02, 0.24, 0.24), fps=20),
+    Viewport("ball", rect=(0.74, 0.28, 0.24, 0.24), fps=30),
+)
+
+
+class ViewportCameras:
+    """
+    Camera parameters of every view, the main one included, computed in one pass over the snapshot.
+
+    Rows hold the center, distance, azimuth and elevation of each camera. Chase and ball cams turn
+    to face where their subject is going, and keep their heading while it's (nearly) standing still.
+    """
+
+    def __init__(self, kinds, cars, cam_dict):
+        self.kinds = np.array([VIEWPORT_KINDS.index(kind) for kind in kinds], dtype=np.int64)
+        self.cars = np.array(cars, dtype=np.int64)
+        self.is_chase = self.kinds == CHASE
+        self.is_ball = self.kinds == BALL
+        self.is_overhead = self.kinds == OVERHEAD
+        self.has_overhead = self.is_overhead.any()
+        self.fov = cam_dict["FOV"]
+        self.height = cam_dict["HEIGHT"]
+
+        n = len(self.kinds)
+        self.centers = np.zeros((n, 3), dtype=np.float64)
+        self.distances = np.where(self.is_ball, BALL_CAM_DISTANCE, cam_dict["DISTANCE"]).astype(np.float64)
+        self.base_elevations = np.select([self.is_overhead, self.is_ball],
+                                         [90, BALL_CAM_ELEVATION], cam_dict["ANGLE"]).astype(np.float64)
+        self.elevations = self.base_elevations.copy()
+        # the overhead view has the length of the field across the screen
+        self.azimuths = np.where(self.is_overhead, 0, -90).astype(np.float64)
+
+    def update(self, snapshot, aspects):
+        """
+        Moves every camera to the snapshot, `aspects` are the width / height of each view.
+        Returns which cameras turned to a new heading this frame.
+        """
+        is_chase, is_ball, is_overhead = self.is_chase, self.is_ball, self.is_overhead
+
+        # position and velocity of what every camera follows
+        cars = snapshot.cars
+        pos = np.zeros((len(self.kinds), 3), dtype=np.float64)
+        vel = np.zeros((len(self.kinds), 3), dtype=np.float64)
+        if len(cars):
+            rows = self.cars[is_chase] % len(cars)
+            pos[is_chase] = cars["pos"][rows]
+            vel[is_chase] = cars["vel"][rows]
+            has_subject = is_chase | is_ball
+        else:
+            has_subject = is_ball
+        pos[is_ball] = snapshot.ball["pos"]
+        vel[is_ball] = snapshot.ball["vel"]
+
+        self.centers[has_subject] = pos[has_subject] * MIRROR
+        self.centers[is_chase & has_subject, 2] += self.height
+
+        speed = np.hypot(vel[:, 0], vel[:, 1])
+        is_turning = has_subject & (speed > MIN_HEADING_SPEED)
+        self.azimuths[is_turning] = -np.degrees(np.arctan2(vel[is_turning, 1], vel[is_turning, 0]))
+        self.elevations[is_turning] = self.base_elevations[is_turning]
+
+        # far enough up that the whole field fits, the fov is horizontal
+        if self.has_overhead:
+            half_width = math.tan(math.radians(self.fov) / 2)
+            aspects = np.asarray(aspects, dtype=np.float64)[is_overhead]
+            self.distances[is_overhead] = np.maximum(OVERHEAD_HALF_EXTENT[1] / half_width,
+                                                     OVERHEAD_HALF_EXTENT[0] * aspects / half_width)
+        return is_turning
+
+    def apply(self, view, i):
+        view.opts["center"] = pg.Vector(*self.centers[i])
+        view.opts["distance"] = float(self.distances[i])
+        view.opts["azimuth"] = float(self.azimuths[i])
+        view.opts["elevation"] = float(self.elevations[i])
+
+
+class ViewportWidget(gl.GLViewWidget):
+    """
+    An inset of the main view, showing its items from another camera at its own frame rate.
+
+    Nothing is uploaded twice: the inset is a child of the main view, so their GL contexts share
+    buffers and shaders, and painting swaps the inset's camera into the main view for the
+    duration of painting the main view's items. `hidden_items` are left out, e.g. text items,
+    which paint on the main widget itself.
+    """
+
+    def __init__(self, main_view, viewport, hidden_items=(), profiler=None):
+        super().__init__(parent=main_view)
+        self.main_view = main_view
+        self.viewport = viewport
+        self.hidden_items = hidden_items
+        self.profiler = profiler
+        self.opts["fov"] = main_view.opts["fov"]
+
+        # input stays with the main view
+        self.setAttribute(QtCore.Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+        self.setFocusPolicy(QtCore.Qt.FocusPolicy.NoFocus)
+        main_view.installEventFilter(self)
+        self.fit()
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.timeout.connect(self.update)
+        self.timer.start(round(1000 / viewport.fps))
+
+    def aspect(self):
+        return self.width() / max(self.height(), 1)
+
+    def fit(self):
+        x, y, width, height = self.viewport.rect
+        size = self.main_view.size()
+        self.setGeometry(round(x * size.width()), round(y * size.height()),
+                         round(width * size.width()), round(height * size.height()))
+
+    def eventFilter(self, obj, event):
+        if obj is self.main_view and event.type() == QtCore.QEvent.Type.Resize:
+            self.fit()
+        return False
+
+    def paintGL(self):
+        paint_start = time.perf_counter()
+        main = self.main_view
+        main_opts = {key: main.opts[key] for key in CAMERA_OPTS}
+        main_vao = main.default_vao
+        hidden_items = [item for item in self.hidden_items if item.visible()]
+
+        main.opts.update({key: self.opts[key] for key in CAMERA_OPTS})
+        # vertex array objects aren't shared between contexts, bind ours
+        main.default_vao = self.default_vao
+        for item in hidden_items:
+            item.setVisible(False)
+        try:
+            region = self.getViewport()
+            main.paint(region=region, viewport=region)
+        finally:
+            main.opts.update(main_opts)
+            main.default_vao = main_vao
+            for item in hidden_items:
+                item.setVisible(True)
+        if self.profiler is not None:
+            self.profiler.add("viewports", time.perf_counter() - paint_start)
@@ -1,31 +1,187 @@
-from rocketsimvisualizer.models import obj
+from rocketsimvisualizer import collision, glitems
+from rocketsimvisualizer.glcontext import offscreen_context
+from rocketsimvisualizer.models import mesh, obj
+from rocketsimvisualizer.events import EventDetector, EventIndex, detect_replay
+from rocketsimvisualizer.heatmap import FIELD_MIN, FieldStats
+from rocketsimvisualizer.inputqueue import InputQueue, controls_from_gamepad, make_controls
+from rocketsimvisualizer.pacing import FramePacer
+from rocketsimvisualizer.prediction import BallPredictor
+from rocketsimvisualizer.profiler import FrameProfiler
+from rocketsimvisualizer.replay import ReplayRecorder, ReplaySource
+from rocketsimvisualizer.simloop import SimulationThread
+from rocketsimvisualizer.snapshot import ArenaSnapshot
+from rocketsimvisualizer.timeline import EventTimeline
+from rocketsimvisualizer.transforms import model_matrices, to_display, to_qmatrix
+from rocketsimvisualizer.viewports import DEFAULT_VIEWPORTS, ViewportCameras, ViewportWidget
 import RocketSim
 
-from pyqtgraph.Qt import QtCore
+from pyqtgraph.Qt import QtCore, QtWidgets
 import pyqtgraph as pg
 import pyqtgraph.opengl as gl
 
 import numpy as np
 import math
 
-from controller import XboxController
-
-from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import os
 import pathlib
-import tomli
+import threading
+import time
 
 current_dir = pathlib.Path(__file__).parent
 
-with open(current_dir / "rsvconfig-default.toml", "rb") as file:
-    default_config_dict = tomli.load(file)
+# seconds for a picked up boost pad to respawn
+BIG_PAD_COOLDOWN = 10
+SMALL_PAD_COOLDOWN = 4
+
+# max opacity of a respawning pad, reached right before it's active again
+PAD_TIMER_ALPHA = 0.3
+# steps a respawning pad fades in over, its color is only updated when it reaches the next one
+PAD_TIMER_STEPS = 16
+
+# faces of the stadium meeting at less than this many degrees are drawn without the edge between them
+STADIUM_FEATURE_ANGLE = 5
+
+# ground grid, the field is 8192 x 10240 plus the goals
+GRID_SIZE = (8192, 10240 + 880 * 2)
+GRID_SPACING = 100
+GRID_COLOR = (1, 1, 1, 0.3)
+
+# grid cell size used to build the coarse car mesh
+CAR_LOD_CELL_SIZE = 12
+
+# replay playback controls
+REPLAY_SEEK_SECONDS = 5
+REPLAY_SPEED_FACTOR = 2
+REPLAY_MIN_SPEED = 1 / 16
+REPLAY_MAX_SPEED = 16
+
+# stages of a frame timed by the profiler
+PROFILER_STAGES = ("scene", "controls", "step", "snapshot", "record", "stats", "events", "pads", "ball", "cars", "camera",
+                   "text", "heatmap", "timeline", "hud", "paint", "viewports", "export")
+
+# seconds between refreshes of the performance overlay
+HUD_REFRESH_INTERVAL = 0.25
+
+# what the heatmap key cycles through, layers of FieldStats summed together
+HEATMAP_VIEWS = (None, ("blue", "orange"), ("blue",), ("orange",), ("ball",))
+HEATMAP_REFRESH_INTERVAL = 0.5
+
+# jumping to an event in a replay lands this many seconds before it, to see it coming
+EVENT_SEEK_LEAD = 1.0
+TIMELINE_REFRESH_INTERVAL = 0.1
+
+
+@lru_cache(maxsize=None)
+def default_config():
+    import tomli
+
+    with open(current_dir / "rsvconfig-default.toml", "rb") as file:
+        return tomli.load(file)
+
+
+@lru_cache(maxsize=None)
+def qt_key_names():
+    """Qt key codes to the names used in the config, e.g. Qt.Key_Space -> "Space"."""
+    return {getattr(QtCore.Qt, attr): attr[4:] for attr in dir(QtCore.Qt) if attr.startswith("Key_")}
+
+
+def key_name(key):
+    return qt_key_names().get(key, "unknown")
+
+
+def load_car_meshes():
+    """Vertices, faces and edges of the car from finest to coarsest, plain arrays so any thread can load them."""
+    car_object = obj.OBJ(current_dir / "models/Octane_decimated.obj")
+    coarse_car = obj.cached(car_object.filename, "lod",
+                            lambda: mesh.decimate(car_object.vertices, car_object.faces, CAR_LOD_CELL_SIZE),
+                            key={"cell_size": CAR_LOD_CELL_SIZE})
+    car_meshes = [{"vertices": car_object.vertices, "faces": car_object.faces}, dict(coarse_car)]
+    for car_mesh in car_meshes:
+        car_mesh["edges"] = mesh.unique_edges(car_mesh["faces"])
+    return car_meshes
+
+
+def car_lod_meshes(car_meshes=None):
+    """Car meshes from finest to coarsest. GL buffers belong to one context, so every view needs its own."""
+    if car_meshes is None:
+        car_meshes = load_car_meshes()
+    return [glitems.MeshBuffers(m["vertices"], m["faces"], m["edges"]) for m in car_meshes]
+
+
+def stadium_edges():
+    """Display space vertices and (E, 2) outline edges of the stadium, cached next to the model."""
+    stadium_object = obj.OBJ(current_dir / "models/field_simplified.obj")
+    return obj.cached(stadium_object.filename, "edges",
+                      lambda: mesh.feature_edges(stadium_object.vertices @ mesh.rotation_z(90).T,
+                                                 stadium_object.faces, STADIUM_FEATURE_ANGLE),
+                      key={"angle": STADIUM_FEATURE_ANGLE, "rotation_z": 90})
+
 
-# Get key mappings from Qt namespace
-qt_keys = (
-    (getattr(QtCore.Qt, attr), attr[4:])
-    for attr in dir(QtCore.Qt)
-    if attr.startswith("Key_")
-)
-keys_mapping = defaultdict(lambda: "unknown", qt_keys)
+def load_scene_meshes():
+    """Everything in the scene read from model files, slow on a cold start. Runs on a background thread."""
+    return {"cars": load_car_meshes(), "stadium": stadium_edges()}
+
+
+def static_scene_item(edge_color=(1, 1, 1, 1), stadium=None):
+    """The stadium outline and the ground grid as one item, drawn in a single call."""
+    if stadium is None:
+        stadium = stadium_edges()
+    grid_vertices = mesh.grid_lines(*GRID_SIZE, GRID_SPACING)
+    grid_edges = np.arange(len(grid_vertices), dtype=np.uint32).reshape(-1, 2) + len(stadium["vertices"])
+
+    vertices = np.concatenate([stadium["vertices"], grid_vertices])
+    edges = np.concatenate([stadium["edges"], grid_edges])
+    colors = np.empty((len(vertices), 4), dtype=np.float32)
+    colors[:len(stadium["vertices"])] = edge_color
+    colors[len(stadium["vertices"]):] = GRID_COLOR
+    return glitems.GLStaticLinesItem(vertices, edges, colors)
+
+
+def boost_pad_lines(pads_data):
+    """(P, 2E, 3) display space line segments outlining each pad."""
+    big_pad_md = gl.MeshData.cylinder(rows=1, cols=4, length=64, radius=160)
+    small_pad_md = gl.MeshData.cylinder(rows=1, cols=4, length=64, radius=144)
+    big_pad_lines = mesh.edge_lines(big_pad_md.vertexes(), big_pad_md.faces())
+    small_pad_lines = mesh.edge_lines(small_pad_md.vertexes(), small_pad_md.faces())
+
+    pad_lines = np.where(pads_data["is_big"][:, None, None], big_pad_lines, small_pad_lines)
+    return pad_lines @ mesh.rotation_z(45).T + to_display(pads_data["pos"])[:, None, :]
+
+
+def boost_pads_item():
+    """A single line item for the outlines of any number of pads."""
+    return glitems.GLLinesItem(mode="lines", glOptions="translucent")
+
+
+def set_boost_pad_lines(item, pad_lines, color):
+    """
+    Uploads (P, 2E, 3) pad outlines to `item`, all in `color`. Returns the (P, 2E, 4) colors,
+    one per line vertex grouped per pad, so a pad can be recolored with a slice and set again.
+    """
+    pad_colors = np.empty(pad_lines.shape[:2] + (4,), dtype=np.float32)
+    pad_colors[:] = color
+    item.setData(pos=pad_lines.reshape(-1, 3), color=pad_colors.reshape(-1, 4))
+    item.setVisible(len(pad_lines) > 0)
+    return pad_colors
+
+
+def car_hitbox_mesh():
+    """Unit hitbox, scaled and offset per car by its hitbox matrix."""
+    dia_conv = 1 / math.sqrt(2)
+    car_hitbox_md = gl.MeshData.cylinder(rows=1, cols=4, radius=(dia_conv, dia_conv))
+    hitbox_vertices = car_hitbox_md.vertexes() @ mesh.rotation_z(45).T
+    hitbox_vertices[:, 2] -= 0.5  # by default cylinder origin z loc is at 0.5 length
+    return glitems.MeshBuffers(hitbox_vertices, edges=mesh.unique_edges(car_hitbox_md.faces()))
+
+
+def ball_meshes(radius):
+    """The ball and its ground projection, a flat circle of the same radius."""
+    ball_md = gl.MeshData.sphere(rows=8, cols=16, radius=radius)
+    proj_md = gl.MeshData.cylinder(rows=1, cols=16, length=0, radius=round(radius))
+    return (glitems.MeshBuffers(ball_md.vertexes(), ball_md.faces(), mesh.unique_edges(ball_md.faces())),
+            glitems.MeshBuffers(proj_md.vertexes(), edges=mesh.unique_edges(proj_md.faces())))
 
 
 class KeyPressWindow(gl.GLViewWidget):
@@ -34,6 +190,13 @@ class KeyPressWindow(gl.GLViewWidget):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self.profiler = None
+
+    def paintGL(self):
+        paint_start = time.perf_counter()
+        super().paintGL()
+        if self.profiler is not None:
+            self.profiler.add("paint", time.perf_counter() - paint_start)
 
     def keyPressEvent(self, event):
         if event.isAutoRepeat():
@@ -47,124 +210,202 @@ class KeyPressWindow(gl.GLViewWidget):
 
 
 class Visualizer:
-    def __init__(self, arena,
+    def __init__(self, arena=None,
                  tick_rate=120, tick_skip=2,
                  step_arena=False, overwrite_controls=False,
-                 config_dict=None, kbm=True):
+                 config_dict=None, kbm=True, show_pad_timers=False,
+                 car_lod_distances=(2500, 6000), threaded_sim=False, max_sim_lag=0.25,
+                 source=None, record_path=None, headless=False, window_size=(1280, 720),
+                 show_hud=False, profile_path=None, show_ball_prediction=False, ball_prediction_time=4.0,
+                 show_collision_mesh=False, collision_sections=collision.SECTIONS, pacing="fixed", max_fps=60,
+                 collect_stats=False, stats_path=None, viewports=(), detect_events=False, show_timeline=False):
+        if arena is None and source is None:
+            raise ValueError("Visualizer needs either an arena or a source to read the arena state from")
+        if source is not None and (step_arena or threaded_sim):
+            raise ValueError("step_arena and threaded_sim need an arena, not a source")
+
         self.arena = arena
+        self.source = source
+        self.replay = source if isinstance(source, ReplaySource) else None
+        # seeks of the replay seen so far, see update_state
+        self.replay_seeks = 0 if self.replay is None else self.replay.n_seeks
         self.tick_rate = tick_rate
         self.tick_skip = tick_skip
         self.step_arena = step_arena
         self.overwrite_controls = overwrite_controls
         self.kbm = kbm
+        self.show_pad_timers = show_pad_timers
         self.y_pressed = False
         self.start_pressed = False
         self.back_pressed = False
+        # car controls from the keyboard or controller, applied at the tick they happened in
+        self.input_queue = InputQueue()
         if kbm == False:
-            self.joy = XboxController()
+            # gamepad support pulls in the inputs package, only load it when it's used
+            from controller import XboxController
+
+            self.joy = XboxController(on_event=self.on_gamepad_event)
 
         if config_dict is None:
             print("Using default configs")
-            config_dict = default_config_dict
+            config_dict = default_config()
 
         self.input_dict = config_dict["INPUT"]
         self.cam_dict = config_dict["CAMERA"]
 
+        # per-frame state of the arena, everything drawn is read from here
+        self.snapshot = ArenaSnapshot()
+        if self.arena is not None:
+            self.snapshot.update(self.arena)
+        else:
+            self.source.read(self.snapshot)
+
+        # held by anything touching the arena while the simulation thread may be stepping it
+        self.arena_lock = threading.RLock()
+
+        # per-stage frame timings, written to profile_path on exit
+        self.profiler = FrameProfiler(PROFILER_STAGES)
+        self.profile_path = profile_path
+
+        # every new state shown is appended to the replay file at record_path
+        self.recorder = None
+        if record_path is not None:
+            self.recorder = ReplayRecorder(record_path, tick_rate=self.tick_rate)
+
+        # where everything spends its time plus per car stats, saved to stats_path on exit
+        self.stats_path = stats_path
+        self.field_stats = None
+        if collect_stats or stats_path is not None:
+            self.field_stats = FieldStats(tick_rate=self.tick_rate)
+
+        # how many ticks update() steps, see pacing.py
+        self.pacer = FramePacer(self.tick_rate, self.tick_skip, mode=pacing, max_fps=max_fps, max_lag=max_sim_lag)
+
+        # in threaded mode the arena is stepped in real time on its own thread instead of in update()
+        self.sim_thread = None
+        if threaded_sim:
+            self.sim_thread = SimulationThread(self.arena, self.tick_rate, max_lag=max_sim_lag,
+                                               pre_step=self.apply_controls, arena_lock=self.arena_lock,
+                                               on_tick=None if self.recorder is None else self.recorder.record)
+
+        if headless:
+            # has to be set before the QApplication is created, the offscreen platform needs no display
+            os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
         self.app = pg.mkQApp()
 
+        # headless, the window is never shown and frames are only rendered by export() under a context of
+        # their own, Qt's offscreen platform can't make one without a display. see glcontext.py
+        self.gl_context = offscreen_context() if headless else None
+
         # window settings
         self.w = KeyPressWindow()
         self.w.setWindowTitle("pyqtgraph visualizer")
-        self.w.setGeometry(0, 50, 1280, 720)
+        self.w.setGeometry(0, 50, *window_size)
+        self.w.profiler = self.profiler
 
         # initial camera settings
         self.target_cam = False
         self.w.opts["fov"] = self.cam_dict["FOV"]
         self.w.opts["distance"] = self.cam_dict["DISTANCE"]
-        self.w.show()
-
-        # Add ground grid
-        grid_item = gl.GLGridItem()
-        grid_item.setSize(8192, 10240 + 880 * 2, 1)
-        grid_item.setSpacing(100, 100, 100)
-        self.w.addItem(grid_item)
+        if not headless:
+            self.w.show()
 
         # text info
         self.text_item = gl.GLTextItem(pos=(0, 0, 60))
+        self.w.addItem(self.text_item)
+
+        # performance overlay
+        self.hud_label = QtWidgets.QLabel(self.w)
+        self.hud_label.setStyleSheet("color: white; background-color: rgba(0, 0, 0, 150); "
+                                     "font-family: monospace; padding: 4px;")
+        self.hud_label.move(10, 10)
+        self.hud_label.setVisible(show_hud)
+        self.hud_refresh_time = 0
+
+        # goals, touches, demos, pickups and supersonic changes, found from the snapshots as they're shown,
+        # or for a replay over the whole file up front on a worker thread. see events.py
+        self.events = None
+        self.event_detector = None
+        self.event_loader = None
+        self.pending_events = None
+        self.first_tick = self.snapshot.tick_count
+        if detect_events or show_timeline:
+            self.start_event_detection()
+
+        # clickable timeline of the events along the bottom of the window
+        self.timeline = EventTimeline(self.w)
+        self.timeline.setVisible(show_timeline)
+        self.timeline.sigSeek.connect(self.seek_timeline)
+        self.timeline_refresh_time = 0
+
+        # extra views from other cameras, inset in the main window, see viewports.py
+        self.viewports = list(viewports)
+        self.viewport_widgets = []
+        self.build_viewports()
 
         self.default_edge_color = (1, 1, 1, 1)
 
-        # Create stadium 3d model
-        stadium_object = obj.OBJ(current_dir / "models/field_simplified.obj")
-        stadium_md = gl.MeshData(vertexes=stadium_object.vertices, faces=stadium_object.faces)
-        stadium_mi = gl.GLMeshItem(meshdata=stadium_md, smooth=False, drawFaces=False, drawEdges=True,
-                                   edgeColor=self.default_edge_color)
-        stadium_mi.rotate(90, 0, 0, 1)
-        self.w.addItem(stadium_mi)
-
-        # Create ball geometry
-        ball_radius = self.arena.ball.get_radius() * 50
-        ball_md = gl.MeshData.sphere(rows=8, cols=16, radius=ball_radius)
-        self.ball_mi = gl.GLMeshItem(meshdata=ball_md, smooth=False, drawFaces=True, drawEdges=True,
-                                     edgeColor=self.default_edge_color, color=(0.1, 0.1, 0.1, 1))
+        # the stadium and car models load in the background while the first frames are shown,
+        # cars are drawn as hitboxes until then. see update_scene
+        self.scene_loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="SceneLoader")
+        self.pending_scene = self.scene_loader.submit(load_scene_meshes)
+
+        # occupancy heatmap on the floor, created the first time it's shown
+        self.heatmap_mi = None
+        self.heatmap_view = 0
+        self.heatmap_refresh_time = 0
+
+        # physics meshes of the field, loaded the first time they're shown
+        self.show_collision_mesh = False
+        self.collision_sections = set(collision_sections)
+        self.collision_items = None
+        if show_collision_mesh:
+            self.toggle_collision_mesh()
+
+        # everything in the scene is drawn by glitems, pyqtgraph's own items only draw under a context Qt made
+        # and a headless one may not be
+        # Create ball geometry, the meshes are (re)built once the ball radius is known
+        self.ball_radius = None
+        self.ball_mi = glitems.GLInstancedMeshItem(None)
+        self.ball_mi.setData(colors=np.array([(0.1, 0.1, 0.1, 1)], dtype=np.float32),
+                             edge_colors=np.array([self.default_edge_color], dtype=np.float32))
         self.w.addItem(self.ball_mi)
 
         # Create ground projection for the ball
-        ball_proj_md = gl.MeshData.cylinder(rows=1, cols=16, length=0, radius=round(ball_radius))
-        self.ball_proj = gl.GLMeshItem(meshdata=ball_proj_md, smooth=False, drawFaces=False,
-                                       drawEdges=True, edgeColor=self.default_edge_color)
+        self.ball_proj = glitems.GLInstancedMeshItem(None, draw_faces=False)
+        self.ball_proj.setData(edge_colors=np.array([self.default_edge_color], dtype=np.float32))
         self.w.addItem(self.ball_proj)
 
-        # Create boost geometry
-        big_pad_md = gl.MeshData.cylinder(rows=1, cols=4, length=64, radius=160)
-        small_pad_md = gl.MeshData.cylinder(rows=1, cols=4, length=64, radius=144)
-
-        self.pads_mi = []
-        for pad in arena.get_boost_pads():
-            pad_pos = pad.get_pos()
-            pad_md = big_pad_md if pad.is_big else small_pad_md
-            pad_mi = gl.GLMeshItem(meshdata=pad_md, drawFaces=False, drawEdges=True,
-                                   edgeColor=self.default_edge_color)
-            pad_mi.rotate(45, 0, 0, 1)
-            pad_mi.translate(-pad_pos.x, pad_pos.y, pad_pos.z)
-            self.pads_mi.append(pad_mi)
-            self.w.addItem(pad_mi)
-
-        # Create car geometry
-        car_object = obj.OBJ(current_dir / "models/Octane_decimated.obj")
-        car_md = gl.MeshData(vertexes=car_object.vertices, faces=car_object.faces)
-
+        # predicted ball path, computed on a worker thread started the first time it's shown
+        self.show_ball_prediction = show_ball_prediction
+        self.ball_prediction_time = ball_prediction_time
+        self.ball_predictor = None
+        self.ball_path_mi = glitems.GLLinesItem(mode="line_strip", color=(1, 1, 0.3, 0.8), width=2,
+                                                glOptions="translucent")
+        self.ball_path_mi.setVisible(False)
+        self.w.addItem(self.ball_path_mi)
+
+        # Create boost geometry, all pads are drawn by a single line item
+        self.pads_mi = boost_pads_item()
+        self.w.addItem(self.pads_mi)
+        self.build_boost_pad_geometry()
+
+        # Create car geometry, uploaded once and shared by every car
         self.blue_color = (0, 0.4, 0.8, 1)
         self.orange_color = (1, 0.2, 0.1, 1)
 
-        self.cars_mi = []
-        for car in arena.get_cars():
-
-            car_color = self.blue_color if car.team == 0 else self.orange_color
-
-            car_mi = gl.GLMeshItem(meshdata=car_md, smooth=False,
-                                   drawFaces=True, drawEdges=True,
-                                   color=car_color, edgeColor=self.default_edge_color)
-
-            self.cars_mi.append(car_mi)
-            self.w.addItem(car_mi)
+        self.car_lod_distances = car_lod_distances
+        self.cars_mi = glitems.GLCarsItem([], car_hitbox_mesh(), ())
+        self.cars_mi.setData(hitbox_color=self.default_edge_color)
+        self.w.addItem(self.cars_mi)
 
-            # hitbox
-            car_config = car.get_config()
-            hitbox_size = car_config.hitbox_size
-            dia_conv = 1 / math.sqrt(2)
-            hitbox_offset = car_config.hitbox_pos_offset
-            car_hitbox_md = gl.MeshData.cylinder(rows=1, cols=4, radius=(dia_conv, dia_conv))
-
-            hitbox_mi = gl.GLMeshItem(meshdata=car_hitbox_md, smooth=False,
-                                      drawFaces=False, drawEdges=True,
-                                      edgeColor=self.default_edge_color)
-
-            hitbox_mi.rotate(45, 0, 0, 1)
-            hitbox_mi.translate(0, 0, -0.5)  # by default cylinder origin z loc is at 0.5 length
-            hitbox_mi.scale(hitbox_size.x, hitbox_size.y, hitbox_size.z, local=False)
-            hitbox_mi.translate(-hitbox_offset.x, hitbox_offset.y, hitbox_offset.z, local=False)
-            hitbox_mi.setParentItem(car_mi)
+        # model matrices, rebuilt from the snapshot every frame
+        self.ball_matrix = np.eye(4, dtype=np.float32)
+        self.ball_proj_matrix = np.eye(4, dtype=np.float32)
+        self.car_matrices = np.zeros((0, 4, 4), dtype=np.float32)
+        self.car_hitbox_matrices = np.zeros((0, 4, 4), dtype=np.float32)
+        self.car_colors = np.zeros((0, 4), dtype=np.float32)
+        self.car_edge_colors = np.zeros((0, 4), dtype=np.float32)
 
         # index of the car we control/spectate
         self.car_index = 0
@@ -182,10 +423,10 @@ class Visualizer:
         self.update()
 
     def get_cam_targets(self):
-        if not self.cars_mi:
-            return [self.ball_mi]
-        targets = self.cars_mi + [self.ball_mi]
-        targets.pop(self.car_index)
+        # display positions of the ball and every car except ours
+        targets = np.concatenate([self.car_matrices[:, :3, 3], self.ball_matrix[None, :3, 3]])
+        if len(self.car_matrices):
+            targets = np.delete(targets, self.car_index, axis=0)
         return targets
 
     def get_cam_target(self):
@@ -196,46 +437,37 @@ class Visualizer:
     def reset_controls(self):
         for key in self.is_pressed_dict.keys():
             self.is_pressed_dict[key] = False
-        self.controls = RocketSim.CarControls()
+        if self.arena is not None:
+            self.input_queue.push(RocketSim.CarControls())
 
     def release_controls(self, event):
         self.update_controls(event, is_pressed=False)
 
     def update_controls(self, event, is_pressed=True):
-        if self.kbm == True:
-            key = keys_mapping[event.key()]
-            if key in self.input_dict.keys():
-                self.is_pressed_dict[self.input_dict[key]] = is_pressed
-
-            if self.input_dict.get(key, None) == "SWITCH_CAR" and is_pressed:
-                if self.overwrite_controls:  # reset car controls before switching cars
-                    self.arena.get_cars()[self.car_index].set_controls(RocketSim.CarControls())
-                self.car_index = (self.car_index + 1) % len(self.cars_mi)
+        if event is not None:
+            key = key_name(event.key())
+            # the view, overlays and replay answer to the keyboard whatever is driving the car
+            if is_pressed:
+                self.update_hotkeys(self.input_dict.get(key, None))
 
-            if self.input_dict.get(key, None) == "TARGET_CAM" and is_pressed:
-                self.target_cam = not self.target_cam
-
-            if self.input_dict.get(key, None) == "CYCLE_TARGETS" and is_pressed:
-                self.target_index = (self.target_index + 1) % len(self.get_cam_targets())
-
-            self.controls.throttle = self.is_pressed_dict["FORWARD"] - self.is_pressed_dict["BACKWARD"]
-            self.controls.steer = self.is_pressed_dict["RIGHT"] - self.is_pressed_dict["LEFT"]
-            self.controls.roll = self.is_pressed_dict["ROLL_RIGHT"] - self.is_pressed_dict["ROLL_LEFT"]
-            self.controls.pitch = -self.controls.throttle
-            self.controls.yaw = self.controls.steer
-            self.controls.jump = self.is_pressed_dict["JUMP"]
-            self.controls.handbrake = self.is_pressed_dict["POWERSLIDE"]
-            self.controls.boost = self.is_pressed_dict["BOOST"]
-        else:
+            if self.kbm == True and key in self.input_dict.keys():
+                self.is_pressed_dict[self.input_dict[key]] = is_pressed
+                if self.arena is not None:
+                    throttle = self.is_pressed_dict["FORWARD"] - self.is_pressed_dict["BACKWARD"]
+                    steer = self.is_pressed_dict["RIGHT"] - self.is_pressed_dict["LEFT"]
+                    self.input_queue.push(make_controls(
+                        throttle=throttle,
+                        steer=steer,
+                        roll=self.is_pressed_dict["ROLL_RIGHT"] - self.is_pressed_dict["ROLL_LEFT"],
+                        pitch=-throttle,
+                        yaw=steer,
+                        jump=self.is_pressed_dict["JUMP"],
+                        handbrake=self.is_pressed_dict["POWERSLIDE"],
+                        boost=self.is_pressed_dict["BOOST"],
+                    ))
+        elif self.kbm == False:
+            # car controls come in through on_gamepad_event, only the view is controlled from here
             controls = self.joy.read()
-            self.controls.throttle = controls['RT'] or -controls['LT']
-            self.controls.steer = controls["leftX"]
-            self.controls.roll = controls['RB'] or -controls['LB']
-            self.controls.pitch = -controls["leftY"]
-            self.controls.yaw = controls["leftX"]
-            self.controls.jump = controls["A"]
-            self.controls.handbrake = controls["X"]
-            self.controls.boost = controls["B"]
             if controls['Y'] and self.y_pressed == False:
                 self.target_cam = not self.target_cam
                 self.y_pressed = True
@@ -244,72 +476,281 @@ class Visualizer:
                 self.start_pressed = True
             if controls['BACK'] and self.back_pressed == False:
                 self.back_pressed = True
-                if self.overwrite_controls:  # reset car controls before switching cars
-                    self.arena.get_cars()[self.car_index].set_controls(RocketSim.CarControls())
-                self.car_index = (self.car_index + 1) % len(self.cars_mi)
+                if self.overwrite_controls and self.arena is not None:  # reset car controls before switching cars
+                    with self.arena_lock:
+                        self.arena.get_cars()[self.car_index].set_controls(RocketSim.CarControls())
+                self.car_index = (self.car_index + 1) % max(len(self.snapshot.cars), 1)
             
             if controls['START'] == False and self.start_pressed == True:
                 self.start_pressed = False     
             if controls['BACK'] == False and self.back_pressed == True:
-                self.back_pressed == False
+                self.back_pressed = False
             if controls['Y'] == False and self.y_pressed == True:
                 self.y_pressed = False
 
-    def update_boost_pad_data(self):
-        for i, pad in enumerate(self.arena.get_boost_pads()):
-            pad_state = pad.get_state()
-            self.pads_mi[i].show() if pad_state.is_active else self.pads_mi[i].hide()
+    def update_hotkeys(self, action):
+        if action == "SWITCH_CAR":
+            if self.overwrite_controls and self.arena is not None:  # reset car controls before switching cars
+                with self.arena_lock:
+                    self.arena.get_cars()[self.car_index].set_controls(RocketSim.CarControls())
+            self.car_index = (self.car_index + 1) % max(len(self.snapshot.cars), 1)
+        elif action == "TARGET_CAM":
+            self.target_cam = not self.target_cam
+        elif action == "CYCLE_TARGETS":
+            self.target_index = (self.target_index + 1) % len(self.get_cam_targets())
+        elif action == "TOGGLE_HUD":
+            self.hud_label.setVisible(not self.hud_label.isVisible())
+        elif action == "TOGGLE_BALL_PREDICTION":
+            self.show_ball_prediction = not self.show_ball_prediction
+            self.ball_path_mi.setVisible(False)
+        elif action == "TOGGLE_TIMELINE":
+            self.start_event_detection()
+            self.timeline.setVisible(not self.timeline.isVisible())
+        elif action == "TOGGLE_VIEWPORTS":
+            self.toggle_viewports()
+        elif action == "CYCLE_HEATMAP":
+            self.cycle_heatmap()
+        elif action == "TOGGLE_COLLISION_MESH":
+            self.toggle_collision_mesh()
+        elif action is not None and action.startswith("TOGGLE_COLLISION_"):
+            self.toggle_collision_mesh(action[len("TOGGLE_COLLISION_"):].lower())
+        elif self.replay is not None:
+            self.update_replay_controls(action)
+
+    def build_boost_pad_geometry(self):
+        pads_data = self.snapshot.pads
+        self.pad_colors = set_boost_pad_lines(self.pads_mi, boost_pad_lines(pads_data), self.default_edge_color)
+        # fade step of every pad, PAD_TIMER_STEPS + 1 while it's active
+        self.pad_levels = np.full(len(pads_data), PAD_TIMER_STEPS + 1, dtype=np.int64)
+        self.pad_max_cooldowns = np.where(pads_data["is_big"], BIG_PAD_COOLDOWN, SMALL_PAD_COOLDOWN)
+
+    def build_ball_geometry(self):
+        self.ball_radius = float(self.snapshot.ball["radius"])
+        ball_radius = self.ball_radius * 50
+        ball_mesh, ball_proj_mesh = ball_meshes(ball_radius)
+        self.ball_mi.setData(mesh=ball_mesh)
+        self.ball_proj.setData(mesh=ball_proj_mesh)
+
+    def build_viewports(self):
+        for widget in self.viewport_widgets:
+            widget.timer.stop()
+            widget.deleteLater()
+        self.viewport_widgets = [ViewportWidget(self.w, viewport, hidden_items=[self.text_item], profiler=self.profiler)
+                                 for viewport in self.viewports]
+        for widget in self.viewport_widgets:
+            widget.show()
+        # the main view is the first camera, a chase cam of the car we control/spectate
+        self.cameras = ViewportCameras(["chase"] + [viewport.kind for viewport in self.viewports],
+                                       [0] + [viewport.car for viewport in self.viewports], self.cam_dict)
+
+    def toggle_viewports(self):
+        """Shows or hides the insets, the default ones if none were given."""
+        if not self.viewports:
+            self.viewports = list(DEFAULT_VIEWPORTS)
+            self.build_viewports()
+            return
+        for widget in self.viewport_widgets:
+            widget.setVisible(not widget.isVisible())
+
+    def cycle_heatmap(self):
+        """Shows the next of HEATMAP_VIEWS, starts collecting stats if they weren't."""
+        if self.field_stats is None:
+            self.field_stats = FieldStats(tick_rate=self.tick_rate)
+        self.heatmap_view = (self.heatmap_view + 1) % len(HEATMAP_VIEWS)
+        self.heatmap_refresh_time = 0
+        if self.heatmap_mi is not None:
+            self.heatmap_mi.setVisible(HEATMAP_VIEWS[self.heatmap_view] is not None)
+
+    def update_heatmap_data(self):
+        layers = HEATMAP_VIEWS[self.heatmap_view]
+        now = time.perf_counter()
+        if layers is None or now - self.heatmap_refresh_time < HEATMAP_REFRESH_INTERVAL:
+            return
+        self.heatmap_refresh_time = now
+
+        # the texture is re-uploaded on every refresh, so it's throttled rather than done per frame
+        image = self.field_stats.image(layers)
+        if self.heatmap_mi is None:
+            # one quad just under the ground grid, a texel per histogram cell
+            self.heatmap_mi = glitems.GLTextureItem(image, glOptions="translucent")
+            self.heatmap_mi.scale(self.field_stats.bin_size, self.field_stats.bin_size, 1)
+            self.heatmap_mi.translate(FIELD_MIN[0], FIELD_MIN[1], -2)
+            self.w.addItem(self.heatmap_mi)
+        else:
+            self.heatmap_mi.setData(image)
+
+    def toggle_collision_mesh(self, section=None):
+        """Shows or hides the collision mesh overlay, or one section of it (which also shows the overlay)."""
+        if self.collision_items is None:
+            self.collision_items = collision.collision_mesh_items()
+            for item in self.collision_items.values():
+                item.setVisible(False)
+                self.w.addItem(item)
+
+        if section is None:
+            self.show_collision_mesh = not self.show_collision_mesh
+        else:
+            self.collision_sections ^= {section}
+            self.show_collision_mesh = True
+        for name, item in self.collision_items.items():
+            item.setVisible(self.show_collision_mesh and name in self.collision_sections)
+
+    def update_replay_controls(self, action):
+        if action == "PAUSE":
+            self.replay.toggle_pause()
+        elif action == "STEP_FORWARD":
+            self.replay.step(1)
+        elif action == "STEP_BACK":
+            self.replay.step(-1)
+        elif action == "SEEK_FORWARD":
+            self.replay.skip(REPLAY_SEEK_SECONDS)
+        elif action == "SEEK_BACK":
+            self.replay.skip(-REPLAY_SEEK_SECONDS)
+        elif action == "SPEED_UP":
+            self.replay.speed = min(self.replay.speed * REPLAY_SPEED_FACTOR, REPLAY_MAX_SPEED)
+        elif action == "SLOW_DOWN":
+            self.replay.speed = max(self.replay.speed / REPLAY_SPEED_FACTOR, REPLAY_MIN_SPEED)
+        elif action in ("NEXT_EVENT", "PREVIOUS_EVENT") and self.events is not None:
+            lead = round(EVENT_SEEK_LEAD * self.replay.replay.tick_rate)
+            find = self.events.next if action == "NEXT_EVENT" else self.events.previous
+            event = find(round(self.replay.tick) + lead)
+            if event is not None:
+                self.replay.seek(int(event["tick"]) - lead)
+
+    def seek_timeline(self, tick):
+        # only replays can go back in time, a live arena's timeline is just for looking
+        if self.replay is None:
+            return
+        if self.events is not None and len(self.events.between(tick, tick + 1)):
+            tick -= round(EVENT_SEEK_LEAD * self.replay.replay.tick_rate)
+        self.replay.seek(tick)
 
-    def update_ball_data(self):
+    def start_event_detection(self):
+        if self.events is not None or self.pending_events is not None:
+            return
+        if self.replay is not None:
+            # read with a Replay of its own, the source's chunk cache isn't thread safe
+            self.event_loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="EventIndexer")
+            self.pending_events = self.event_loader.submit(detect_replay, self.replay.replay.filename)
+        else:
+            self.events = EventIndex()
+            self.event_detector = EventDetector(self.events, tick_rate=self.tick_rate)
+
+    def update_events(self):
+        if self.event_detector is not None:
+            self.event_detector.update(self.snapshot)
+        elif self.pending_events is not None and self.pending_events.done():
+            self.events = self.pending_events.result()
+            self.pending_events = None
+            self.event_loader.shutdown(wait=False)
+
+    def update_timeline_data(self):
+        now = time.perf_counter()
+        if not self.timeline.isVisible() or now - self.timeline_refresh_time < TIMELINE_REFRESH_INTERVAL:
+            return
+        self.timeline_refresh_time = now
+        if self.replay is not None:
+            self.timeline.setData(self.events, self.replay.replay.first_tick, self.replay.replay.last_tick,
+                                  round(self.replay.tick))
+        else:
+            self.timeline.setData(self.events, self.first_tick, self.snapshot.tick_count, self.snapshot.tick_count)
 
-        # plot ball data
-        ball_state = self.arena.ball.get_state()
+    def update_boost_pad_data(self):
+        pads_data = self.snapshot.pads
+        if len(pads_data) != len(self.pad_levels):
+            # a source may only know the pads once it's attached
+            self.build_boost_pad_geometry()
+        is_active = pads_data["is_active"]
+
+        # only touch pads that were picked up, respawned or, if timers are shown, faded in another step
+        if self.show_pad_timers:
+            respawn_progress = np.clip(1 - pads_data["cooldown"] / self.pad_max_cooldowns, 0, 1)
+            levels = (respawn_progress * PAD_TIMER_STEPS).astype(np.int64)
+        else:
+            levels = np.zeros(len(pads_data), dtype=np.int64)
+        levels[is_active] = PAD_TIMER_STEPS + 1
+        changed = levels != self.pad_levels
+        if not changed.any():
+            return
+        self.pad_levels[:] = levels
 
-        # approx ball spin
-        ball_angvel_np = np.array([ball_state.ang_vel.x, -ball_state.ang_vel.y, ball_state.ang_vel.z])
-        rot_angle = np.linalg.norm(ball_angvel_np)
-        rot_axis = ball_angvel_np / max(1e-9, rot_angle)
-        delta_rot_angle = rot_angle * self.tick_skip / self.tick_rate
+        inactive_alpha = PAD_TIMER_ALPHA / PAD_TIMER_STEPS * levels[changed]
+        self.pad_colors[changed, :, 3] = np.where(is_active[changed], self.default_edge_color[3], inactive_alpha)[:, None]
+        self.pads_mi.setData(color=self.pad_colors.reshape(-1, 4))
 
-        self.ball_mi.rotate(delta_rot_angle / math.pi * 180, *rot_axis, local=False)
+    def update_ball_data(self):
 
-        # location
-        ball_transform = self.ball_mi.transform()
-        ball_transform[0, 3] = -ball_state.pos.x
-        ball_transform[1, 3] = ball_state.pos.y
-        ball_transform[2, 3] = ball_state.pos.z
-        self.ball_mi.setTransform(ball_transform)
+        # plot ball data
+        ball_data = self.snapshot.ball
+        if ball_data["radius"] != self.ball_radius:
+            self.build_ball_geometry()
+        model_matrices(ball_data["pos"], ball_data["rot"], out=self.ball_matrix)
+        self.ball_mi.setData(matrices=self.ball_matrix[None])
 
         # ball ground projection
-        self.ball_proj.resetTransform()
-        self.ball_proj.translate(-ball_state.pos.x, ball_state.pos.y, 0)
+        self.ball_proj_matrix[:2, 3] = self.ball_matrix[:2, 3]
+        self.ball_proj.setData(matrices=self.ball_proj_matrix[None])
+
+        if self.show_ball_prediction:
+            self.update_ball_prediction_data()
+
+    def update_ball_prediction_data(self):
+        if self.ball_predictor is None:
+            game_mode = RocketSim.SOCCAR if self.arena is None else self.arena.game_mode
+            self.ball_predictor = BallPredictor(game_mode, self.tick_rate, duration=self.ball_prediction_time)
+            self.ball_predictor.start()
+
+        # usually just a check against the cached path, the worker only runs when the ball strays from it
+        tick_count = self.snapshot.tick_count
+        self.ball_predictor.submit(tick_count, self.snapshot.ball)
+        path = self.ball_predictor.path(tick_count)
+        if len(path) < 2:
+            self.ball_path_mi.setVisible(False)
+            return
+
+        # starts at the ball as drawn, which may be interpolated between ticks
+        path = to_display(path)
+        path[0] = self.ball_matrix[:3, 3]
+        self.ball_path_mi.setData(pos=path)
+        self.ball_path_mi.setVisible(True)
 
     def update_cars_data(self):
 
-        for i, car in enumerate(self.arena.get_cars()):
+        cars_data = self.snapshot.cars
+        if len(self.car_matrices) != len(cars_data):
+            self.car_matrices = np.zeros((len(cars_data), 4, 4), dtype=np.float32)
+            self.car_hitbox_matrices = np.zeros((len(cars_data), 4, 4), dtype=np.float32)
+            self.car_colors = np.zeros((len(cars_data), 4), dtype=np.float32)
+            self.car_edge_colors = np.zeros((len(cars_data), 4), dtype=np.float32)
+            self.car_index %= max(len(cars_data), 1)
 
-            car_state = car.get_state()
-            car_angles = car_state.angles
+        # all model matrices in one go, straight from the rotation matrices
+        model_matrices(cars_data["pos"], cars_data["rot"], out=self.car_matrices)
 
-            self.cars_mi[i].resetTransform()
+        hitbox_rot = cars_data["hitbox_size"][:, None, :] * np.eye(3, dtype=np.float32)
+        model_matrices(cars_data["hitbox_offset"], hitbox_rot, out=self.car_hitbox_matrices)
 
-            # location
-            self.cars_mi[i].translate(-car_state.pos.x, car_state.pos.y, car_state.pos.z)
+        self.car_colors[:] = np.where((cars_data["team"] == 0)[:, None], self.blue_color, self.orange_color)
 
-            # rotation
-            self.cars_mi[i].rotate(car_angles.yaw / math.pi * 180, 0, 0, -1, local=True)
-            self.cars_mi[i].rotate(car_angles.pitch / math.pi * 180, 0, 1, 0, local=True)
-            self.cars_mi[i].rotate(car_angles.roll / math.pi * 180, -1, 0, 0, local=True)
+        # visual indicator for going supersonic
+        self.car_edge_colors[:] = np.where(cars_data["is_supersonic"][:, None], (0, 0, 0, 1), self.default_edge_color)
 
-            # visual indicator for going supersonic
-            self.cars_mi[i].opts["edgeColor"] = (0, 0, 0, 1) if car_state.is_supersonic else self.default_edge_color
+        self.cars_mi.setData(matrices=self.car_matrices, hitbox_matrices=self.car_hitbox_matrices,
+                             colors=self.car_colors, edge_colors=self.car_edge_colors)
 
     def update_camera_data(self):
 
+        # all cameras in one pass, the main view keeps the heading it was turned to while the car stands still
+        cameras = self.cameras
+        cameras.cars[0] = self.car_index
+        cameras.azimuths[0], cameras.elevations[0] = self.w.opts["azimuth"], self.w.opts["elevation"]
+        aspects = [self.w.width() / max(self.w.height(), 1)] + [widget.aspect() for widget in self.viewport_widgets]
+        is_turning = cameras.update(self.snapshot, aspects)
+
         # calculate target cam values
         if self.target_cam:
             cam_pos = self.w.cameraPosition()
-            target_pos = self.get_cam_target().transform().matrix()[:3, 3]
+            target_pos = self.get_cam_target()
             rel_target_pos = -target_pos[0] + cam_pos[0], target_pos[1] - cam_pos[1], target_pos[2] - cam_pos[2]
             rel_target_pos_norm = np.linalg.norm(rel_target_pos)
 
@@ -324,50 +765,252 @@ class Visualizer:
             self.w.setCameraParams(azimuth=-target_azimuth / math.pi * 180,
                                    elevation=self.cam_dict["ANGLE"] - smaller_target_elevation / math.pi * 180)
 
-        if self.cars_mi:
-
-            car = self.arena.get_cars()[self.car_index]
-            car_state = car.get_state()
+        if len(self.snapshot.cars):
 
             # center camera around the car
-            self.w.opts["center"] = pg.Vector(-car_state.pos.x, car_state.pos.y, car_state.pos.z + self.cam_dict["HEIGHT"])
+            self.w.opts["center"] = pg.Vector(*cameras.centers[0])
+
+            if not self.target_cam and is_turning[0]:
+                # non-target_cam cam, facing where the car is going
+                self.w.setCameraParams(azimuth=cameras.azimuths[0], elevation=cameras.elevations[0])
 
-            if not self.target_cam:
-                # non-target_cam cam
-                car_vel_2d_norm = math.sqrt(car_state.vel.y ** 2 + car_state.vel.x ** 2)
-                if car_vel_2d_norm > 50:  # don't be sensitive to near 0 vel dir changes
-                    car_vel_azimuth = math.atan2(car_state.vel.y, car_state.vel.x)
-                    self.w.setCameraParams(azimuth=-car_vel_azimuth / math.pi * 180,
-                                           elevation=self.cam_dict["ANGLE"])
+        # the insets only take the new parameters, they repaint on their own timers
+        for i, widget in enumerate(self.viewport_widgets, 1):
+            cameras.apply(widget, i)
 
     def update_text_data(self):
-        if self.cars_mi:
-            car_state = self.arena.get_cars()[self.car_index].get_state()
-            self.text_item.text = f"{car_state.boost=:.1f}"
-            self.text_item.setParentItem(self.cars_mi[self.car_index])
+        if len(self.snapshot.cars):
+            boost = self.snapshot.cars["boost"][self.car_index]
+            self.text_item.text = f"{boost=:.1f}"
+            # follows the car as if it was parented to it
+            self.text_item.setTransform(to_qmatrix(self.car_matrices[self.car_index]))
+
+    def update_hud_data(self):
+        now = time.perf_counter()
+        if self.hud_label.isVisible() and now - self.hud_refresh_time > HUD_REFRESH_INTERVAL:
+            self.hud_refresh_time = now
+            summary = self.profiler.summary()
+            if self.step_arena and self.sim_thread is None:
+                summary += f"\npacing {self.pacer.mode}, dropped ticks {self.pacer.dropped_ticks}"
+            latency = self.input_queue.latency_stats()
+            if latency:
+                summary += f"\ninput to physics ms p50 {latency['p50']:5.2f} p95 {latency['p95']:5.2f}"
+            self.hud_label.setText(summary)
+            self.hud_label.adjustSize()
 
     def update_plot_data(self):
+        profiler = self.profiler
         self.update_boost_pad_data()
+        profiler.lap("pads")
         self.update_ball_data()
+        profiler.lap("ball")
         self.update_cars_data()
+        profiler.lap("cars")
         self.update_camera_data()
+        profiler.lap("camera")
         self.update_text_data()
-
-    def update(self):
-
+        profiler.lap("text")
+        if self.field_stats is not None:
+            self.update_heatmap_data()
+            profiler.lap("heatmap")
+        self.update_timeline_data()
+        profiler.lap("timeline")
+
+    def on_gamepad_event(self, timestamp, state):
+        # called on the controller's thread, without an arena there's nothing to control
+        if self.arena is not None:
+            self.input_queue.push(controls_from_gamepad(state), timestamp)
+
+    def apply_controls(self, tick_time=None):
+        """Takes the newest controls queued up to `tick_time` (defaults to now) and sets them on our car."""
+        controls = self.input_queue.pop_until(time.perf_counter() if tick_time is None else tick_time)
+        if controls is not None:
+            self.controls = controls
         # only set car controls if overwrite_controls is true and there's at least one car
-        if self.overwrite_controls and self.cars_mi:
+        if self.overwrite_controls and self.arena is not None and len(self.snapshot.cars):
             self.arena.get_cars()[self.car_index].set_controls(self.controls)
 
-        # only call arena.step() if running in standalone mode
-        if self.step_arena:
-            self.arena.step(self.tick_skip)
+    def step_arena_ticks(self, n_ticks):
+        """
+        Steps `n_ticks` ticks, taken to span the wall time up to now, and applies every queued input
+        before the first tick at or after the time it happened. Ticks between inputs are stepped in one go.
+        """
+        tick_time = 1 / self.tick_rate
+        start_time = time.perf_counter() - n_ticks * tick_time
+        i = 0
+        while i < n_ticks:
+            self.apply_controls(start_time + i * tick_time)
+            next_time = self.input_queue.next_time()
+            next_i = n_ticks if next_time is None else math.ceil((next_time - start_time) / tick_time)
+            next_i = min(max(next_i, i + 1), n_ticks)
+            self.step_arena_observed(next_i - i)
+            i = next_i
+
+    def step_arena_observed(self, n_ticks):
+        """
+        Steps the arena, snapshotting it after every tick while recording so the replay has every tick,
+        and after at most `tick_skip` ticks while detecting events live, however many ticks a frame steps.
+        """
+        if self.recorder is None and self.event_detector is None:
+            self.arena.step(n_ticks)
+            return
+        step_ticks = 1 if self.recorder is not None else self.tick_skip
+        while n_ticks > 0:
+            ticks = min(n_ticks, step_ticks)
+            self.arena.step(ticks)
+            n_ticks -= ticks
+            self.profiler.lap("step")
+            self.snapshot.update(self.arena)
+            self.profiler.lap("snapshot")
+            if self.recorder is not None:
+                self.recorder.record(self.snapshot)
+                self.profiler.lap("record")
+            if self.event_detector is not None:
+                self.event_detector.update(self.snapshot)
+                self.profiler.lap("events")
+
+    def update_scene(self, wait=False):
+        """Adds the stadium and car models once they're loaded, with `wait` blocks until they are."""
+        if self.pending_scene is None or not (wait or self.pending_scene.done()):
+            return
+        meshes = self.pending_scene.result()
+        self.pending_scene = None
+        self.scene_loader.shutdown(wait=False)
+
+        # stadium outline and ground grid, baked into one line buffer
+        self.w.addItem(static_scene_item(self.default_edge_color, meshes["stadium"]))
+        self.cars_mi.setData(lods=car_lod_meshes(meshes["cars"]), lod_distances=self.car_lod_distances)
+
+    def update(self):
+        self.profiler.begin_frame(self.snapshot.tick_count)
+        self.update_scene()
+        self.profiler.lap("scene")
+        self.update_state(*self.pacer.begin_frame())
         if self.kbm == False:
             self.update_controls(None)
+            self.profiler.lap("controls")
         self.update_plot_data()
+        self.update_hud_data()
+        self.profiler.lap("hud")
+
+    def update_state(self, n_ticks, step_until=None):
+        """Steps the arena `n_ticks` ticks, or `n_ticks` at a time until `step_until` if it's set."""
+
+        if self.sim_thread is not None:
+            # the sim thread steps and applies controls, render its state interpolated to now
+            self.sim_thread.read_interpolated(self.snapshot)
+        elif self.source is not None:
+            # the arena lives in another process, show the latest state it published
+            self.source.read(self.snapshot)
+        else:
+            # only call arena.step() if running in standalone mode
+            if self.step_arena and n_ticks:
+                self.step_arena_ticks(n_ticks)
+                while step_until is not None and time.perf_counter() < step_until:
+                    self.apply_controls()
+                    self.step_arena_observed(n_ticks)
+            else:
+                self.apply_controls()
+            self.pacer.end_stepping()
+            self.profiler.lap("step")
+            self.snapshot.update(self.arena)
+        self.profiler.lap("snapshot")
+
+        # ticks stepped here and on the sim thread are recorded as they're stepped, this records
+        # an arena stepped by someone else or a feed once per frame
+        if self.recorder is not None and self.sim_thread is None:
+            self.recorder.record(self.snapshot)
+            self.profiler.lap("record")
+
+        # nothing happened between the frames on either side of a jump in a replay
+        if self.replay is not None and self.replay.n_seeks != self.replay_seeks:
+            self.replay_seeks = self.replay.n_seeks
+            if self.field_stats is not None:
+                self.field_stats.reset()
+
+        if self.field_stats is not None:
+            self.field_stats.add(self.snapshot)
+            self.profiler.lap("stats")
+
+        if self.events is not None or self.pending_events is not None:
+            self.update_events()
+            self.profiler.lap("events")
+
+    def export(self, writer, fps=60, n_frames=None):
+        """
+        Renders frames at a fixed simulated frame rate and hands them to `writer` (see export.py),
+        as fast as they can be rendered rather than in real time.
+        Arenas are stepped tick_rate / fps ticks per frame and replays advance by as much times their speed.
+        Renders `n_frames` frames, or until the end of a replay.
+        """
+        if self.sim_thread is not None:
+            raise ValueError("Can't export with threaded_sim, the simulation has to follow the frames")
+        if n_frames is None and self.replay is None:
+            raise ValueError("n_frames is needed unless exporting a replay")
+
+        self.update_scene(wait=True)
+        renderer = glitems.OffscreenRenderer(self.w, context=self.gl_context)
+        size = (self.w.width(), self.w.height())
+        if self.replay is not None:
+            self.replay.is_paused = True
+            replay_ticks_per_frame = self.replay.replay.tick_rate / fps * self.replay.speed
+
+        ticks = 0.0
+        frame_index = 0
+        try:
+            while n_frames is None or frame_index < n_frames:
+                if self.replay is not None and frame_index:
+                    if self.replay.tick >= self.replay.replay.last_tick:
+                        break
+                    self.replay.advance(replay_ticks_per_frame)
+
+                # whole ticks only, the remainder carries over to the next frame
+                ticks += self.tick_rate / fps
+                n_ticks = int(ticks)
+                ticks -= n_ticks
+                self.profiler.begin_frame(self.snapshot.tick_count)
+                self.update_state(n_ticks)
+                self.update_plot_data()
+
+                buffer = writer.acquire(size)
+                self.profiler.lap("export")
+                renderer.render(buffer, hidden_items=[self.text_item])
+                self.profiler.lap("paint")
+                writer.submit(buffer)
+                self.profiler.lap("export")
+                frame_index += 1
+        finally:
+            writer.close()
 
     def animation(self):
         timer = QtCore.QTimer()
         timer.timeout.connect(self.update)
-        timer.start(16)
+        refresh_rate = self.app.primaryScreen().refreshRate()
+        if self.sim_thread is not None:
+            # physics runs on its own clock, render at the display's refresh rate
+            timer.setTimerType(QtCore.Qt.TimerType.PreciseTimer)
+            timer.start(round(1000 / refresh_rate))
+            self.sim_thread.start()
+        else:
+            if self.pacer.mode != "fixed":
+                timer.setTimerType(QtCore.Qt.TimerType.PreciseTimer)
+            timer.start(self.pacer.timer_interval(refresh_rate))
+        self.app.aboutToQuit.connect(self.close)
         self.app.exec()
+
+    def close(self):
+        self.scene_loader.shutdown(wait=False, cancel_futures=True)
+        if self.event_loader is not None:
+            self.event_loader.shutdown(wait=False, cancel_futures=True)
+        if self.ball_predictor is not None:
+            self.ball_predictor.stop()
+        if self.sim_thread is not None:
+            self.sim_thread.stop()
+            if self.sim_thread.is_alive():
+                self.sim_thread.join()
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.profile_path is not None:
+            self.profiler.dump(self.profile_path)
+        if self.stats_path is not None:
+            self.field_stats.save(self.stats_path)
@@ -1,30 +1,30 @@
 import RocketSim
 
-from rocketsimvisualizer import Visualizer
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import random
+import time
 
-import tomli
+# name of the shared memory feed a streamed headless worker publishes to
+STREAM_NAME = "run_standalone"
 
-with open("rsvconfig.toml", "rb") as file:
-    config_dict = tomli.load(file)
 
-
-def main():
+def setup_arena(tick_rate, n_cars):
 
     # setup rocketsim arena
-    tick_rate = 120
-    tick_skip = 2
     arena = RocketSim.Arena(RocketSim.SOCCAR, tick_rate)
-    print(f"Arena tick rate: {arena.tick_rate}")
 
     # setup ball initial state
     ball_state = arena.ball.get_state()
     ball_state.pos = RocketSim.Vec(500, 500, 1500)
     ball_state.vel = RocketSim.Vec(0, 0, 0.1)
     arena.ball.set_state(ball_state)
-    print("Set ball state")
 
     # setup rocketsim cars
-    for i in range(2):
+    for i in range(n_cars):
         team = RocketSim.BLUE if i % 2 else RocketSim.ORANGE
         car = arena.add_car(team)
         car_state = car.get_state()
@@ -33,14 +33,160 @@ def main():
         car_state.vel = RocketSim.Vec(100, 100, 100)
         car_state.ang_vel = RocketSim.Vec(0, 0, 5.5)
         car.set_state(car_state)
-        print(f"Car added to team {team} with id {car.id}")
+    return arena
+
+
+def random_controls(controls, rng, tick_count):
+    controls.throttle = rng.uniform(-1, 1)
+    controls.steer = rng.uniform(-1, 1)
+    controls.pitch = rng.uniform(-1, 1)
+    controls.yaw = rng.uniform(-1, 1)
+    controls.roll = rng.uniform(-1, 1)
+    controls.jump = rng.random() < 0.1
+    controls.boost = rng.random() < 0.3
+    controls.handbrake = rng.random() < 0.1
+
+
+def scripted_controls(controls, rng, tick_count):
+    # drive in circles, boosting and jumping now and then, the same every run
+    t = tick_count / 120
+    controls.throttle = 1
+    controls.steer = math.sin(t)
+    controls.boost = int(t) % 4 == 0
+    controls.jump = tick_count % 240 < 8
+
+
+CONTROL_MODES = {"random": random_controls, "scripted": scripted_controls}
+
+
+def init_worker(barrier):
+    global start_barrier
+    start_barrier = barrier
+
+
+def run_worker(worker_index, args):
+    """Steps one arena for args.ticks ticks as fast as it can, returns how long it took."""
+    arena = setup_arena(args.tick_rate, args.cars)
+    cars = arena.get_cars()
+    car_controls = [RocketSim.CarControls() for _ in cars]
+    set_controls = CONTROL_MODES[args.controls]
+    rng = random.Random(args.seed * 1000 + worker_index)
+
+    publisher = None
+    if args.stream and worker_index == args.stream_worker:
+        from rocketsimvisualizer.statefeed import StatePublisher
+
+        publisher = StatePublisher(arena, name=STREAM_NAME)
+
+    # every worker starts stepping at once, arena creation isn't part of the measurement
+    start_barrier.wait()
+    start_wall = time.time()
+    start = time.perf_counter()
+
+    tick = 0
+    while tick < args.ticks:
+        for car, controls in zip(cars, car_controls):
+            set_controls(controls, rng, tick)
+            car.set_controls(controls)
+        n_ticks = min(args.control_interval, args.ticks - tick)
+        arena.step(n_ticks)
+        tick += n_ticks
+        if publisher is not None:
+            publisher.publish(arena)
+
+    seconds = time.perf_counter() - start
+    end_wall = time.time()
+    if publisher is not None:
+        publisher.close()
+    return {"worker": worker_index, "ticks": tick, "seconds": seconds, "tps": tick / seconds,
+            "start_wall": start_wall, "end_wall": end_wall}
+
 
-    v = Visualizer(arena, tick_rate=tick_rate, tick_skip=tick_skip,
+def run_batch(n_workers, args):
+    context = multiprocessing.get_context()
+    barrier = context.Barrier(n_workers)
+    with context.Pool(n_workers, initializer=init_worker, initargs=(barrier,)) as pool:
+        pending = pool.starmap_async(run_worker, [(i, args) for i in range(n_workers)])
+        if args.stream:
+            watch_stream()
+        workers = pending.get()
+
+    # the batch lasts from the first worker starting to the last one finishing
+    wall_seconds = max(w["end_wall"] for w in workers) - min(w["start_wall"] for w in workers)
+    total_ticks = sum(w["ticks"] for w in workers)
+    return {"workers": n_workers, "total_ticks": total_ticks, "wall_seconds": wall_seconds,
+            "aggregate_tps": total_ticks / wall_seconds, "tps_per_worker": total_ticks / wall_seconds / n_workers,
+            "worker_results": workers}
+
+
+def watch_stream():
+    from rocketsimvisualizer import Visualizer
+    from rocketsimvisualizer.statefeed import SharedMemorySource
+
+    v = Visualizer(source=SharedMemorySource(STREAM_NAME))
+    v.animation()
+
+
+def run_headless(args):
+    print(f"{args.cars} cars, {args.ticks} ticks per worker, {args.controls} controls every "
+          f"{args.control_interval} ticks, {os.cpu_count()} cpus")
+    runs = []
+    for n_workers in args.workers:
+        run = run_batch(n_workers, args)
+        # scaling compared to the per worker throughput of the smallest batch
+        run["scaling_efficiency"] = run["tps_per_worker"] / (runs[0] if runs else run)["tps_per_worker"]
+        runs.append(run)
+        print(f"{n_workers:3d} workers: {run['aggregate_tps']:12.0f} tps, {run['tps_per_worker']:10.0f} tps per worker, "
+              f"scaling efficiency {run['scaling_efficiency']:6.1%}")
+        # only stream the first batch
+        args.stream = False
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"args": {k: v for k, v in vars(args).items() if k != "stream"}, "runs": runs}, file, indent=2)
+
+
+def run_interactive(args):
+    from rocketsimvisualizer import Visualizer
+
+    import tomli
+
+    with open("rsvconfig.toml", "rb") as file:
+        config_dict = tomli.load(file)
+
+    tick_skip = 2
+    arena = setup_arena(args.tick_rate, args.cars)
+    print(f"Arena tick rate: {arena.tick_rate}, {args.cars} cars")
+
+    v = Visualizer(arena, tick_rate=args.tick_rate, tick_skip=tick_skip,
                    step_arena=True,  # set to False in case tick updates happen elsewhere
+                   pacing="adaptive",  # keep the game in real time, "fixed" steps tick_skip ticks every frame
                    overwrite_controls=True,
                    config_dict=config_dict, kbm=True) #kbm flag manages if visualizer is controlled with keyboard or controller (xbox controller only)
     v.animation()
 
 
+def main():
+    parser = argparse.ArgumentParser(description="Runs an arena in the visualizer, or measures headless simulation throughput.")
+    parser.add_argument("--headless", action="store_true", help="step arenas in a process pool as fast as possible")
+    parser.add_argument("--tick-rate", type=int, default=120)
+    parser.add_argument("--cars", type=int, default=2)
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, os.cpu_count()}),
+                        help="process counts to run headless batches with, one after another")
+    parser.add_argument("--ticks", type=int, default=100_000, help="ticks per worker")
+    parser.add_argument("--controls", choices=CONTROL_MODES, default="random")
+    parser.add_argument("--control-interval", type=int, default=8, help="ticks between controls updates")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stream", action="store_true", help="watch one worker of the first batch in the visualizer")
+    parser.add_argument("--stream-worker", type=int, default=0)
+    parser.add_argument("--output", help="file to write the headless results to as json")
+    args = parser.parse_args()
+
+    if args.headless:
+        run_headless(args)
+    else:
+        run_interactive(args)
+
+
 if __name__ == "__main__":
     main()